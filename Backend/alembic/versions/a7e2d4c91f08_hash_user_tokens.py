@@ -0,0 +1,52 @@
+"""store user_tokens as keyed digests (token_hash) + indexes
+
+Revision ID: a7e2d4c91f08
+Revises: 3f1c9a7d2b64
+Create Date: 2026-10-18 11:40:08.551932
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e2d4c91f08'
+down_revision: Union[str, Sequence[str], None] = '3f1c9a7d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_tokens', sa.Column('token_hash', sa.String(length=64), nullable=True))
+    # token_hash is an HMAC keyed by TOKEN_HASH_SECRET (app.core.token_store.hash_token), which the
+    # migration can't compute: outstanding raw tokens are revoked, users request a new link / OTP
+    op.execute("UPDATE user_tokens SET token_hash = 'revoked-' || id, used_at = COALESCE(used_at, NOW())")
+    op.alter_column('user_tokens', 'token_hash', nullable=False)
+    op.drop_column('user_tokens', 'token')
+
+    op.create_index('ix_user_tokens_token_hash_type', 'user_tokens', ['token_hash', 'type'], unique=False)
+    op.create_index(
+        'ix_user_tokens_unused',
+        'user_tokens',
+        ['user_id', 'type'],
+        unique=False,
+        postgresql_where=sa.text('used_at IS NULL'),
+    )
+    op.create_index('ix_user_tokens_expires_at', 'user_tokens', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # raw tokens can't be recovered from digests: outstanding tokens become invalid
+    op.drop_index('ix_user_tokens_expires_at', table_name='user_tokens')
+    op.drop_index('ix_user_tokens_unused', table_name='user_tokens', postgresql_where=sa.text('used_at IS NULL'))
+    op.drop_index('ix_user_tokens_token_hash_type', table_name='user_tokens')
+
+    op.add_column('user_tokens', sa.Column('token', sa.String(length=255), nullable=True))
+    op.execute("UPDATE user_tokens SET token = 'revoked-' || id, used_at = COALESCE(used_at, NOW())")
+    op.alter_column('user_tokens', 'token', nullable=False)
+    op.create_unique_constraint('user_tokens_token_key', 'user_tokens', ['token'])
+    op.drop_column('user_tokens', 'token_hash')
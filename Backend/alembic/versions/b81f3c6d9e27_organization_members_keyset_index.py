@@ -0,0 +1,33 @@
+"""organization_members (organization_id, user_id, id) index for join-request pagination
+
+Revision ID: b81f3c6d9e27
+Revises: a7e2d4c91f08
+Create Date: 2026-10-18 16:05:12.304117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81f3c6d9e27'
+down_revision: Union[str, Sequence[str], None] = 'a7e2d4c91f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_organization_members_org_user',
+        'organization_members',
+        ['organization_id', 'user_id', 'id'],
+        unique=False,
+        postgresql_include=['status'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_organization_members_org_user', table_name='organization_members')
@@ -0,0 +1,50 @@
+"""organization_members unique (organization_id, user_id) for idempotent joins
+
+Revision ID: c4a9e2f17b30
+Revises: b81f3c6d9e27
+Create Date: 2026-10-18 17:20:44.918203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a9e2f17b30'
+down_revision: Union[str, Sequence[str], None] = 'b81f3c6d9e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing duplicates are NOT deleted here: credit_wallet rows hang off organization_members.id
+    # (ON DELETE CASCADE), so dropping a membership silently drops its wallet and balance.
+    # Stop and list them; merge them by hand (re-point credit_wallet to the membership you keep).
+    duplicates = op.get_bind().execute(sa.text("""
+        SELECT organization_id, user_id, array_agg(id ORDER BY id) AS member_ids
+        FROM organization_members
+        GROUP BY organization_id, user_id
+        HAVING count(*) > 1
+        ORDER BY organization_id, user_id
+    """)).all()
+    if duplicates:
+        listing = "\n".join(
+            f"  organization_id={org_id} user_id={user_id} organization_members.id={list(ids)}"
+            for org_id, user_id, ids in duplicates
+        )
+        raise RuntimeError(
+            f"{len(duplicates)} duplicate (organization_id, user_id) memberships, merge them before upgrading:\n"
+            + listing
+        )
+
+    op.create_unique_constraint(
+        'uq_organization_members_org_user', 'organization_members', ['organization_id', 'user_id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_organization_members_org_user', 'organization_members', type_='unique')
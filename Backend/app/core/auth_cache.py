@@ -0,0 +1,49 @@
+import itertools
+import os
+import threading
+
+from app.core.cache import TTLCache
+
+
+# user_id -> (id, email, full_name, system_role, is_email_verified, token_version)
+# Invalidated explicitly on this worker by every path that changes those fields;
+# other workers pick up the change within AUTH_CACHE_TTL_S (a revoked token keeps working there until then).
+AUTH_CACHE_TTL_S = float(os.getenv("AUTH_CACHE_TTL_S", "30"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+_cache = TTLCache(max_entries=AUTH_CACHE_MAX_ENTRIES, ttl_seconds=AUTH_CACHE_TTL_S)
+
+# A request that read the row BEFORE a password change / delete committed must not put that stale row
+# back AFTER the invalidation: loads take a stamp first, and invalidate_user records the stamp at which
+# each user was last invalidated; set_auth_state drops rows read before that.
+_stamps = itertools.count(1)
+_stamp_lock = threading.Lock()
+_invalidated_at = TTLCache(max_entries=AUTH_CACHE_MAX_ENTRIES, ttl_seconds=max(AUTH_CACHE_TTL_S, 60))
+
+
+def get_auth_state(user_id: int):
+    return _cache.get(user_id)
+
+
+def load_stamp() -> int:
+    """Taken before reading a user's row from the DB, passed back to set_auth_state."""
+    with _stamp_lock:
+        return next(_stamps)
+
+
+def set_auth_state(user_id: int, row, stamp: int) -> None:
+    with _stamp_lock:
+        # invalidated while the row was being read -> it may be the old one, don't cache it
+        if (_invalidated_at.get(user_id) or 0) > stamp:
+            return
+        _cache.set(user_id, tuple(row))
+
+
+def invalidate_user(user_id: int) -> None:
+    with _stamp_lock:
+        _invalidated_at.set(user_id, next(_stamps))
+        _cache.pop(user_id)
+
+
+def get_auth_cache_stats() -> dict:
+    return _cache.stats()
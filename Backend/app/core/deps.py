@@ -1,16 +1,40 @@
-from fastapi import Depends, HTTPException
+import os
+
+from fastapi import Depends, Header, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.jwt import decode_access_token
-from app.db.session import get_db  # <-- عدّل المسار لو مختلف عندك
+from app.core.auth_cache import get_auth_state, load_stamp, set_auth_state
+from app.core.security import ops_token_matches
+from app.db.queries import query, run
+from app.db.session import AsyncSessionLocal  # <-- عدّل المسار لو مختلف عندك
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
-def get_current_user(
+_AUTH_STATE = query(
+    "auth.state",
+    """
+    SELECT id, email, full_name, system_role, is_email_verified, token_version
+    FROM users
+    WHERE id = :id
+    """,
+    prepare=True,
+)
+
+async def _load_auth_state(db: AsyncSession, user_id: int):
+    # stamp قبل القراية: لو اليوزر اتعمله invalidate واحنا بنقرا، الصف القديم مايترجعش للكاش
+    stamp = load_stamp()
+    result = await run(db, _AUTH_STATE, {"id": user_id})
+    row = result.first()
+
+    if row:
+        set_auth_state(user_id, row, stamp)
+    return row
+
+
+async def get_current_user(
     creds: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-    db: Session = Depends(get_db),
 ):
     # 1) لازم يبقى فيه Authorization header
     if not creds or creds.scheme.lower() != "bearer":
@@ -27,17 +51,15 @@ def get_current_user(
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
-    # 3) هات اليوزر من DB
-    row = db.execute(
-        text(
-            """
-            SELECT id, email, full_name, system_role, is_email_verified, token_version
-            FROM users
-            WHERE id = :id
-            """
-        ),
-        {"id": int(user_id)},
-    ).first()
+    # 3) هات اليوزر من الكاش، ولو مش موجود من DB
+    # توكين أحدث من الكاش (token_version أكبر) معناه إن الكاش قديم -> نقرا من DB تاني
+    row = get_auth_state(int(user_id))
+    if row is None or row[5] < token_version:
+        # session قصيرة على الـ primary تتقفل هنا قبل ما الـ route يشتغل:
+        #  - الـ request مايمسكش connection تانية من الـ pool وهو مستني الـ session بتاعة الـ route
+        #  - الـ revocation (token_version) يتقري من مكان ما اتكتب، مش من replica متأخرة
+        async with AsyncSessionLocal() as db:
+            row = await _load_auth_state(db, int(user_id))
 
     if not row:
         raise HTTPException(status_code=401, detail="User not found")
@@ -53,3 +75,13 @@ def get_current_user(
 
     # رجّع dict بسيط
     return {"id": uid, "email": email, "full_name": full_name, "system_role": system_role}
+
+
+def require_ops_token(x_ops_token: str | None = Header(default=None)):
+    # endpoints داخلية (stats / metrics) محمية بـ header ثابت من env
+    expected = os.getenv("OPS_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    if not ops_token_matches(x_ops_token):
+        raise HTTPException(status_code=403, detail="Access denied")
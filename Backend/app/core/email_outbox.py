@@ -0,0 +1,140 @@
+import os
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+from app.db.queries import query, run
+
+
+# Emails are written to email_outbox in the same transaction as the business change,
+# then delivered by the worker (python -m app.workers.email_outbox).
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "12"))
+OUTBOX_BACKOFF_BASE_S = int(os.getenv("OUTBOX_BACKOFF_BASE_S", "30"))
+OUTBOX_BACKOFF_MAX_S = int(os.getenv("OUTBOX_BACKOFF_MAX_S", "3600"))
+# a row stuck in "sending" longer than this (crashed worker) is picked up again
+OUTBOX_LOCK_TIMEOUT_S = int(os.getenv("OUTBOX_LOCK_TIMEOUT_S", "600"))
+
+
+_ENQUEUE = query(
+    "outbox.enqueue",
+    """
+    INSERT INTO email_outbox (to_email, subject, body_text, body_html)
+    VALUES (:to, :subject, :body, :html)
+    """,
+)
+
+
+async def enqueue_email(
+    db: AsyncSession,
+    *,
+    to: str,
+    subject: str,
+    body: str,
+    html: str | None = None,
+) -> None:
+    """
+    Queue an email. Does NOT commit: the caller commits it together with its own changes,
+    so the email exists if and only if the change it describes was saved.
+    """
+    await run(db, _ENQUEUE, {"to": to, "subject": subject, "body": body, "html": html})
+
+
+_ENQUEUE_MANY = query(
+    "outbox.enqueue_many",
+    """
+    INSERT INTO email_outbox (to_email, subject, body_text, body_html)
+    SELECT * FROM unnest(
+        CAST(:to AS varchar[]), CAST(:subject AS varchar[]), CAST(:body AS text[]), CAST(:html AS text[])
+    )
+    """,
+)
+
+
+async def enqueue_emails(db: AsyncSession, emails: list[dict]) -> None:
+    """
+    enqueue_email for many at once (one INSERT): dicts with to / subject / body / html.
+    Same rule: the caller commits.
+    """
+    if not emails:
+        return
+    await run(
+        db,
+        _ENQUEUE_MANY,
+        {
+            "to": [e["to"] for e in emails],
+            "subject": [e["subject"] for e in emails],
+            "body": [e["body"] for e in emails],
+            "html": [e.get("html") for e in emails],
+        },
+    )
+
+
+def claim_batch(db: Session, *, limit: int):
+    """
+    Lock up to `limit` due emails for this worker (SKIP LOCKED so several workers can run).
+    Returns rows (id, to_email, subject, body_text, body_html, attempts).
+    """
+    rows = db.execute(
+        text("""
+            UPDATE email_outbox
+            SET status = 'sending',
+                attempts = attempts + 1,
+                locked_at = NOW()
+            WHERE id IN (
+                SELECT id
+                FROM email_outbox
+                WHERE (status = 'pending' AND next_attempt_at <= NOW())
+                   OR (status = 'sending' AND locked_at < NOW() - make_interval(secs => :lock_timeout))
+                ORDER BY next_attempt_at
+                LIMIT :limit
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, to_email, subject, body_text, body_html, attempts
+        """),
+        {"limit": limit, "lock_timeout": OUTBOX_LOCK_TIMEOUT_S},
+    ).all()
+    db.commit()
+    return rows
+
+
+def mark_sent(db: Session, *, outbox_ids: list[int]) -> None:
+    if not outbox_ids:
+        return
+
+    db.execute(
+        text("""
+            UPDATE email_outbox
+            SET status = 'sent', sent_at = NOW(), locked_at = NULL, last_error = NULL
+            WHERE id = ANY(:ids)
+        """),
+        {"ids": outbox_ids},
+    )
+    db.commit()
+
+
+def backoff_seconds(attempts: int) -> int:
+    # 30s, 60s, 120s, ... capped
+    return min(OUTBOX_BACKOFF_MAX_S, OUTBOX_BACKOFF_BASE_S * (2 ** max(0, attempts - 1)))
+
+
+def mark_failed(db: Session, *, outbox_id: int, attempts: int, error: str) -> None:
+    # after OUTBOX_MAX_ATTEMPTS the row stays as 'failed' (kept for inspection / manual requeue)
+    final = attempts >= OUTBOX_MAX_ATTEMPTS
+    db.execute(
+        text("""
+            UPDATE email_outbox
+            SET status = :status,
+                locked_at = NULL,
+                last_error = :error,
+                next_attempt_at = NOW() + make_interval(secs => :delay)
+            WHERE id = :id
+        """),
+        {
+            "status": "failed" if final else "pending",
+            "error": error[:2000],
+            "delay": backoff_seconds(attempts),
+            "id": outbox_id,
+        },
+    )
+    db.commit()
@@ -0,0 +1,67 @@
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, Template, select_autoescape
+
+
+# Email bodies live in app/templates/emails/<name>.txt (+ optional <name>.html),
+# html templates extend the shared emails/_layout.html.
+# Everything is compiled once (warm_email_templates() at startup) and reused for every send.
+_TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+
+EMAIL_LOGO_URL = os.getenv(
+    "EMAIL_LOGO_URL",
+    "https://raw.githubusercontent.com/EslamMDahy/Learnova-Smart-Study-Companion/refs/heads/backend/Backend/assets/logo.ico",
+)
+EMAIL_SUPPORT_EMAIL = os.getenv("EMAIL_SUPPORT_EMAIL", "support@learnova.com")
+
+_env = Environment(
+    loader=FileSystemLoader(str(_TEMPLATES_DIR)),
+    autoescape=select_autoescape(["html"]),
+    undefined=StrictUndefined,
+    auto_reload=False,
+    cache_size=-1,
+)
+
+_compiled: dict[str, Template] = {}
+_compiled_lock = threading.Lock()
+
+
+def warm_email_templates() -> int:
+    """Compile every email template now. Returns how many were compiled."""
+    with _compiled_lock:
+        if not _compiled:
+            for name in _env.list_templates(filter_func=lambda n: n.startswith("emails/")):
+                if not Path(name).name.startswith("_"):
+                    _compiled[name] = _env.get_template(name)
+        return len(_compiled)
+
+
+def _brand() -> dict:
+    return {
+        "logo_url": EMAIL_LOGO_URL,
+        "support_email": EMAIL_SUPPORT_EMAIL,
+        "year": datetime.now().year,
+    }
+
+
+def render_email(name: str, **context) -> tuple[str, str | None]:
+    """
+    Render emails/<name>.txt and emails/<name>.html (if it exists).
+    Returns (text_body, html_body_or_None).
+    """
+    if not _compiled:
+        warm_email_templates()
+
+    text_template = _compiled.get(f"emails/{name}.txt")
+    if text_template is None:
+        raise RuntimeError(f"Unknown email template: {name}")
+
+    context = {"brand": _brand(), **context}
+    html_template = _compiled.get(f"emails/{name}.html")
+
+    text_body = text_template.render(context)
+    html_body = html_template.render(context) if html_template else None
+    return text_body, html_body
@@ -1,33 +1,61 @@
 import os
 import smtplib
+import threading
+import time
 from email.message import EmailMessage
 
 
-def send_email(
-    to: str,
-    subject: str,
-    body: str,
-    html: str | None = None,
-) -> None:
+# Connection-level failures: the session is gone, reconnect and try again once.
+_RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class SMTPUnavailable(Exception):
+    """Couldn't open a session (DNS, refused, timeout, STARTTLS / login): the server is unusable for now."""
+
+
+def _smtp_settings() -> dict:
     host = os.getenv("SMTP_HOST")
     port = int(os.getenv("SMTP_PORT", "587"))
+    timeout = float(os.getenv("SMTP_TIMEOUT_S", "30"))
     user = os.getenv("SMTP_USER")
     password = os.getenv("SMTP_PASS")
     sender = os.getenv("SMTP_FROM") or user
+    # local SMTP stand-ins (e.g. aiosmtpd) have no TLS / auth
+    use_tls = os.getenv("SMTP_STARTTLS", "1") != "0"
+    use_auth = os.getenv("SMTP_AUTH", "1") != "0"
 
-    missing = [k for k, v in {
-        "SMTP_HOST": host,
-        "SMTP_USER": user,
-        "SMTP_PASS": password,
-        "SMTP_FROM": sender,
-    }.items() if not v]
+    required = {"SMTP_HOST": host, "SMTP_FROM": sender}
+    if use_auth:
+        required.update({"SMTP_USER": user, "SMTP_PASS": password})
+
+    missing = [k for k, v in required.items() if not v]
 
     if missing:
         raise RuntimeError(f"Missing SMTP env vars: {', '.join(missing)}")
 
+    return {
+        "host": host,
+        "port": port,
+        "user": user,
+        "password": password,
+        "sender": sender,
+        "use_tls": use_tls,
+        "use_auth": use_auth,
+        "timeout": timeout,
+    }
+
+
+def build_message(
+    to: str,
+    subject: str,
+    body: str,
+    html: str | None = None,
+    *,
+    sender: str | None = None,
+) -> EmailMessage:
     msg = EmailMessage()
     msg["Subject"] = subject
-    msg["From"] = sender
+    msg["From"] = sender or _smtp_settings()["sender"]
     msg["To"] = to
 
     # ✅ Plain text fallback
@@ -37,7 +65,172 @@ def send_email(
     if html:
         msg.add_alternative(html, subtype="html")
 
-    with smtplib.SMTP(host, port) as smtp:
-        smtp.starttls()
-        smtp.login(user, password)
+    return msg
+
+
+class SMTPConnectionPool:
+    """
+    Keeps authenticated SMTP sessions open between sends instead of paying
+    connect + STARTTLS + login for every message.
+
+    - idle sessions older than `idle_timeout_s` are closed instead of reused
+      (servers drop idle clients anyway)
+    - a session is recycled after `max_messages` sends
+    - a dropped session is replaced and the message retried once
+    """
+
+    def __init__(self, *, max_idle: int, idle_timeout_s: float, max_messages: int):
+        self.max_idle = max_idle
+        self.idle_timeout_s = idle_timeout_s
+        self.max_messages = max_messages
+        self._idle: list[tuple[smtplib.SMTP, float, int]] = []  # (conn, last_used, sent_count)
+        self._lock = threading.Lock()
+        self.connects = 0
+
+    def _connect(self) -> tuple[smtplib.SMTP, float, int]:
+        cfg = _smtp_settings()
+        try:
+            smtp = smtplib.SMTP(cfg["host"], cfg["port"], timeout=cfg["timeout"])
+        except (OSError, smtplib.SMTPException) as e:  # gaierror / refused / timeout are OSErrors
+            raise SMTPUnavailable(repr(e)) from e
+        try:
+            if cfg["use_tls"]:
+                smtp.starttls()
+            if cfg["use_auth"]:
+                smtp.login(cfg["user"], cfg["password"])
+        except (OSError, smtplib.SMTPException) as e:
+            self._close(smtp)
+            raise SMTPUnavailable(repr(e)) from e
+
+        with self._lock:
+            self.connects += 1
+        return smtp, time.monotonic(), 0
+
+    @staticmethod
+    def _close(smtp: smtplib.SMTP) -> None:
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _acquire(self) -> tuple[smtplib.SMTP, float, int]:
+        now = time.monotonic()
+        stale = []
+        entry = None
+        with self._lock:
+            while self._idle:
+                candidate = self._idle.pop()
+                if now - candidate[1] > self.idle_timeout_s:
+                    stale.append(candidate[0])
+                    continue
+                entry = candidate
+                break
+
+        for smtp in stale:
+            self._close(smtp)
+
+        return entry or self._connect()
+
+    def _release(self, entry: tuple[smtplib.SMTP, float, int]) -> None:
+        smtp, _, sent = entry
+        if sent < self.max_messages:
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append((smtp, time.monotonic(), sent))
+                    return
+        self._close(smtp)
+
+    def _send_on(self, entry, msg: EmailMessage):
+        smtp, last_used, sent = entry
         smtp.send_message(msg)
+        return smtp, last_used, sent + 1
+
+    def send_many(self, messages: list[EmailMessage]) -> list[Exception | None]:
+        """
+        Send messages over one session. Returns one result per message:
+        None when sent, otherwise the exception for that message.
+        If no session can be opened, the batch stops there: the message and every one after it
+        get the SMTPUnavailable error (left for the caller to retry) instead of each one waiting
+        for its own connect timeout.
+        """
+        results: list[Exception | None] = []
+        entry = None
+        try:
+            for i, msg in enumerate(messages):
+                try:
+                    if entry is not None and entry[2] >= self.max_messages:
+                        self._close(entry[0])
+                        entry = None
+                    if entry is None:
+                        entry = self._acquire()
+                    try:
+                        entry = self._send_on(entry, msg)
+                    except _RECONNECT_ERRORS:
+                        self._close(entry[0])
+                        entry = None
+                        entry = self._connect()
+                        entry = self._send_on(entry, msg)
+                    results.append(None)
+                except SMTPUnavailable as e:
+                    results.extend([e] * (len(messages) - i))
+                    break
+                except _RECONNECT_ERRORS as e:
+                    # the fresh session died too: don't reuse it for the next message
+                    if entry is not None:
+                        self._close(entry[0])
+                        entry = None
+                    results.append(e)
+                except Exception as e:
+                    # message-level rejection (bad recipient, ...): the session is still usable
+                    results.append(e)
+        finally:
+            if entry is not None:
+                self._release(entry)
+
+        return results
+
+    def send(self, msg: EmailMessage) -> None:
+        error = self.send_many([msg])[0]
+        if error is not None:
+            raise error
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for smtp, _, _ in idle:
+            self._close(smtp)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"idle": len(self._idle), "connects": self.connects}
+
+
+_pool = SMTPConnectionPool(
+    max_idle=int(os.getenv("SMTP_POOL_MAX_IDLE", "4")),
+    idle_timeout_s=float(os.getenv("SMTP_POOL_IDLE_TIMEOUT_S", "60")),
+    max_messages=int(os.getenv("SMTP_POOL_MAX_MESSAGES", "100")),
+)
+
+
+def send_email(
+    to: str,
+    subject: str,
+    body: str,
+    html: str | None = None,
+) -> None:
+    _pool.send(build_message(to, subject, body, html))
+
+
+def send_emails(messages: list[EmailMessage]) -> list[Exception | None]:
+    return _pool.send_many(messages)
+
+
+def close_smtp_pool() -> None:
+    _pool.close_all()
+
+
+def get_smtp_pool_stats() -> dict:
+    return _pool.stats()
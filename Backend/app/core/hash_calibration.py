@@ -0,0 +1,74 @@
+"""
+Benchmark this host and pick password-hash parameters for a latency budget.
+
+    python -m app.core.hash_calibration --target-ms 250
+    python -m app.core.hash_calibration --algorithm scrypt --target-ms 100
+
+Prints env lines to paste into `.env`. Existing users are moved to the new
+setting transparently the next time they log in (see `needs_rehash`).
+"""
+import argparse
+import statistics
+import time
+
+from app.core.security import Pbkdf2Sha256Hasher, ScryptHasher
+
+
+def _measure_ms(hasher, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        hasher.hash("calibration-password")
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def calibrate_pbkdf2(target_ms: float, rounds: int) -> tuple[dict, float]:
+    # PBKDF2 cost is linear in iterations: measure a probe then scale
+    probe = 50_000
+    probe_ms = _measure_ms(Pbkdf2Sha256Hasher(probe), rounds)
+    iterations = max(10_000, int(probe * target_ms / probe_ms) // 1000 * 1000)
+    measured = _measure_ms(Pbkdf2Sha256Hasher(iterations), rounds)
+    return {"PBKDF2_ITERATIONS": iterations}, measured
+
+
+def calibrate_scrypt(target_ms: float, rounds: int, r: int, p: int, max_mem_mb: int) -> tuple[dict, float]:
+    # scrypt N must be a power of two: keep doubling while we stay inside the budget
+    n = 2 ** 12
+    measured = _measure_ms(ScryptHasher(n, r, p), rounds)
+    while True:
+        next_n = n * 2
+        if 128 * r * next_n > max_mem_mb * 1024 * 1024:
+            break
+        next_ms = _measure_ms(ScryptHasher(next_n, r, p), rounds)
+        if next_ms > target_ms:
+            break
+        n, measured = next_n, next_ms
+    return {"SCRYPT_N": n, "SCRYPT_R": r, "SCRYPT_P": p}, measured
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Calibrate password hashing cost for this host")
+    parser.add_argument("--algorithm", choices=["pbkdf2_sha256", "scrypt"], default="pbkdf2_sha256")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="latency budget for one hash")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--scrypt-r", type=int, default=8)
+    parser.add_argument("--scrypt-p", type=int, default=1)
+    parser.add_argument("--scrypt-max-mem-mb", type=int, default=64)
+    args = parser.parse_args()
+
+    if args.algorithm == "pbkdf2_sha256":
+        params, measured = calibrate_pbkdf2(args.target_ms, args.rounds)
+    else:
+        params, measured = calibrate_scrypt(
+            args.target_ms, args.rounds, args.scrypt_r, args.scrypt_p, args.scrypt_max_mem_mb
+        )
+
+    print(f"# measured {measured:.1f} ms per hash (~{1000 / measured:.1f} hashes/sec per core)")
+    print(f"PASSWORD_HASHER={args.algorithm}")
+    for key, value in params.items():
+        print(f"{key}={value}")
+
+
+if __name__ == "__main__":
+    main()
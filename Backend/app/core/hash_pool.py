@@ -0,0 +1,158 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from app.core.metrics import HASH_IN_FLIGHT, HASH_JOBS, HASH_QUEUE_WAIT, HASH_SECONDS
+from app.core.security import hash_password, verify_password
+
+
+# Password hashing (PBKDF2) is CPU heavy, so it runs on its own bounded executor
+# instead of the AnyIO threadpool that serves every sync endpoint.
+#   HASH_POOL_KIND        thread | process
+#   HASH_POOL_WORKERS     number of hashing workers
+#   HASH_POOL_MAX_PENDING jobs allowed to wait in the queue (beyond the running ones)
+#   HASH_POOL_TIMEOUT_S   max time a caller waits for its hash
+HASH_POOL_KIND = os.getenv("HASH_POOL_KIND", "thread").strip().lower()
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_POOL_MAX_PENDING = int(os.getenv("HASH_POOL_MAX_PENDING", "16"))
+HASH_POOL_TIMEOUT_S = float(os.getenv("HASH_POOL_TIMEOUT_S", "10"))
+HASH_POOL_RETRY_AFTER_S = int(os.getenv("HASH_POOL_RETRY_AFTER_S", "1"))
+
+
+_executor: Executor | None = None
+_executor_lock = threading.Lock()
+
+# running + queued jobs; when full new jobs are rejected immediately (503)
+_slots = threading.BoundedSemaphore(HASH_POOL_WORKERS + HASH_POOL_MAX_PENDING)
+
+_stats_lock = threading.Lock()
+_stats = {
+    "submitted": 0,
+    "completed": 0,
+    "rejected": 0,
+    "timed_out": 0,
+    "in_flight": 0,
+    "queue_wait_seconds_total": 0.0,
+    "queue_wait_seconds_max": 0.0,
+    "hash_seconds_total": 0.0,
+    "hash_seconds_max": 0.0,
+}
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                if HASH_POOL_KIND == "process":
+                    _executor = ProcessPoolExecutor(max_workers=HASH_POOL_WORKERS)
+                elif HASH_POOL_KIND == "thread":
+                    _executor = ThreadPoolExecutor(
+                        max_workers=HASH_POOL_WORKERS,
+                        thread_name_prefix="hash-pool",
+                    )
+                else:
+                    raise RuntimeError(f"Invalid HASH_POOL_KIND: {HASH_POOL_KIND}")
+    return _executor
+
+
+def _timed_call(fn, args, submitted_at: float):
+    # time.time() (not perf_counter) so the numbers stay comparable across processes
+    started_at = time.time()
+    result = fn(*args)
+    return result, started_at - submitted_at, time.time() - started_at
+
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Server is busy, please try again",
+        headers={"Retry-After": str(HASH_POOL_RETRY_AFTER_S)},
+    )
+
+
+def _release_slot(_future=None) -> None:
+    with _stats_lock:
+        _stats["in_flight"] -= 1
+    HASH_IN_FLIGHT.add(-1)
+    _slots.release()
+
+
+async def _run(fn, *args):
+    # 1) admission control: fail fast instead of queueing forever
+    if not _slots.acquire(blocking=False):
+        with _stats_lock:
+            _stats["rejected"] += 1
+        HASH_JOBS.inc("rejected")
+        raise _busy()
+
+    with _stats_lock:
+        _stats["submitted"] += 1
+        _stats["in_flight"] += 1
+    HASH_IN_FLIGHT.add(1)
+
+    # 2) hand the job to the hashing workers
+    # the slot is released when the job really finishes (even if the caller gave up)
+    try:
+        future = _get_executor().submit(_timed_call, fn, args, time.time())
+    except Exception:
+        _release_slot()
+        raise
+    future.add_done_callback(_release_slot)
+
+    # 3) wait for the result without blocking the event loop
+    try:
+        result, queue_wait, hash_time = await asyncio.wait_for(
+            asyncio.wrap_future(future),
+            HASH_POOL_TIMEOUT_S,
+        )
+    except asyncio.TimeoutError:
+        future.cancel()
+        with _stats_lock:
+            _stats["timed_out"] += 1
+        HASH_JOBS.inc("timed_out")
+        raise _busy()
+
+    # 4) metrics
+    with _stats_lock:
+        _stats["completed"] += 1
+        _stats["queue_wait_seconds_total"] += queue_wait
+        _stats["queue_wait_seconds_max"] = max(_stats["queue_wait_seconds_max"], queue_wait)
+        _stats["hash_seconds_total"] += hash_time
+        _stats["hash_seconds_max"] = max(_stats["hash_seconds_max"], hash_time)
+    # same numbers for Prometheus (/metrics)
+    HASH_JOBS.inc("completed")
+    HASH_QUEUE_WAIT.observe(queue_wait)
+    HASH_SECONDS.observe(hash_time)
+
+    return result
+
+
+async def pooled_hash_password(password: str) -> str:
+    return await _run(hash_password, password)
+
+
+async def pooled_verify_password(password: str, stored: str) -> bool:
+    return await _run(verify_password, password, stored)
+
+
+def get_hash_pool_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+
+    stats["kind"] = HASH_POOL_KIND
+    stats["workers"] = HASH_POOL_WORKERS
+    stats["max_pending"] = HASH_POOL_MAX_PENDING
+    return stats
+
+
+def shutdown_hash_pool() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,28 @@
+import os
+
+from app.core.cache import TTLCache
+
+
+# invite_code -> (organization_id, organization name)
+# Invalidated on this worker when the owner rotates the code;
+# other workers stop accepting the old code within INVITE_CACHE_TTL_S.
+INVITE_CACHE_TTL_S = float(os.getenv("INVITE_CACHE_TTL_S", "60"))
+INVITE_CACHE_MAX_ENTRIES = int(os.getenv("INVITE_CACHE_MAX_ENTRIES", "10000"))
+
+_cache = TTLCache(max_entries=INVITE_CACHE_MAX_ENTRIES, ttl_seconds=INVITE_CACHE_TTL_S)
+
+
+def get_invite(code: str):
+    return _cache.get(code)
+
+
+def set_invite(code: str, organization_id: int, name: str) -> None:
+    _cache.set(code, (organization_id, name))
+
+
+def invalidate_invite(code: str) -> None:
+    _cache.pop(code)
+
+
+def get_invite_cache_stats() -> dict:
+    return _cache.stats()
@@ -1,12 +1,21 @@
 import os
+import time
+import hashlib
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
 from fastapi import HTTPException
 
+from app.core.cache import TTLCache
+
 JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_ALG = os.getenv("JWT_ALG", "HS256")
 JWT_EXPIRE_MIN = int(os.getenv("JWT_EXPIRE_MIN", "15"))
 
+# verified claims per token (keyed by sha256 of the token) until the token's exp
+JWT_CACHE_MAX_ENTRIES = int(os.getenv("JWT_CACHE_MAX_ENTRIES", "20000"))
+
+_claims_cache = TTLCache(max_entries=JWT_CACHE_MAX_ENTRIES, ttl_seconds=JWT_EXPIRE_MIN * 60)
+
 def create_access_token(*, subject: str, extra: dict | None = None) -> str:
     """
     subject: غالبًا user_id كنص
@@ -30,10 +39,28 @@ def decode_access_token(token: str) -> dict:
     if not JWT_SECRET:
         raise RuntimeError("JWT_SECRET is missing")
 
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    cached = _claims_cache.get(key)
+    if cached is not None:
+        payload, exp = cached
+        # الكاش بيتمسح لوحده عند exp، بس نتأكد تاني بالساعة الحقيقية
+        if exp > time.time():
+            return dict(payload)
+        _claims_cache.pop(key)
+
     try:
         # jose بيتحقق من exp تلقائيًا أثناء decode
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
-        return payload
     except JWTError:
         # 401 عشان التوكين invalid أو expired
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
\ No newline at end of file
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        _claims_cache.set(key, (dict(payload), exp), ttl_seconds=exp - time.time())
+
+    return payload
+
+
+def get_jwt_cache_stats() -> dict:
+    return _claims_cache.stats()
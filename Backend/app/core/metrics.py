@@ -0,0 +1,202 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+
+# Prometheus metrics (text exposition format, no client library needed), per worker process:
+#   GET /metrics   (X-Ops-Token like /system/*)
+#
+#   METRICS_ENABLED   0 = the middleware passes requests straight through
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+DB_SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+HASH_SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items(), key=lambda item: tuple(map(str, item[0])))
+            lines.extend(self._render_series(key, value) for key, value in items)
+        return lines
+
+    def _render_series(self, key: tuple, value) -> str:
+        return f"{self.name}{_labels(self.label_names, key)} {_fmt(value)}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def add(self, amount: float, *labels) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = (), *, buckets: tuple):
+        super().__init__(name, help_text, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels) -> None:
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # [per-bucket counts (+Inf last), sum]
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def _render_series(self, key: tuple, value) -> str:
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float("inf")), counts):
+            cumulative += count
+            le = _labels(self.label_names, key, f'le="{_fmt(bound)}"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+        series = _labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{series} {_fmt(total)}")
+        lines.append(f"{self.name}_count{series} {cumulative}")
+        return "\n".join(lines)
+
+
+HTTP_REQUESTS = Counter(
+    "learnova_http_requests_total", "HTTP requests by route and status code.", ("method", "route", "status")
+)
+HTTP_LATENCY = Histogram(
+    "learnova_http_request_duration_seconds", "HTTP request latency.", ("method", "route"), buckets=LATENCY_BUCKETS
+)
+HTTP_IN_FLIGHT = Gauge("learnova_http_requests_in_flight", "HTTP requests currently being served.")
+HTTP_IN_FLIGHT.add(0)  # exported as 0 before the first request
+DB_STATEMENTS_PER_REQUEST = Histogram(
+    "learnova_http_request_db_statements", "DB statements executed per HTTP request.",
+    ("method", "route"), buckets=DB_STATEMENT_BUCKETS,
+)
+DB_SECONDS_PER_REQUEST = Histogram(
+    "learnova_http_request_db_seconds", "Time spent in DB statements per HTTP request.",
+    ("method", "route"), buckets=DB_SECONDS_BUCKETS,
+)
+DB_STATEMENTS = Counter("learnova_db_statements_total", "DB statements executed (requests, workers, scripts).")
+
+# password hashing pool (app.core.hash_pool): admission rejections / timeouts are the 503s to alert on
+HASH_JOBS = Counter(
+    "learnova_hash_pool_jobs_total", "Password hashing jobs by outcome (completed, rejected, timed_out).", ("outcome",)
+)
+for _outcome in ("completed", "rejected", "timed_out"):
+    HASH_JOBS.inc(_outcome, amount=0)  # exported as 0 before the first job
+HASH_IN_FLIGHT = Gauge("learnova_hash_pool_in_flight", "Hashing jobs running or queued.")
+HASH_IN_FLIGHT.add(0)
+HASH_QUEUE_WAIT = Histogram(
+    "learnova_hash_pool_queue_wait_seconds", "Time a hashing job waited for a worker.", buckets=HASH_SECONDS_BUCKETS
+)
+HASH_SECONDS = Histogram(
+    "learnova_hash_pool_hash_seconds", "Time spent computing a hash / verification.", buckets=HASH_SECONDS_BUCKETS
+)
+
+_METRICS = (
+    HTTP_REQUESTS, HTTP_LATENCY, HTTP_IN_FLIGHT, DB_STATEMENTS_PER_REQUEST, DB_SECONDS_PER_REQUEST, DB_STATEMENTS,
+    HASH_JOBS, HASH_IN_FLIGHT, HASH_QUEUE_WAIT, HASH_SECONDS,
+)
+
+# [statements, seconds] of the request being served (None outside requests);
+# sync routes run in the threadpool with a copy of the context, so they share the same list
+_request_db: ContextVar[list | None] = ContextVar("request_db", default=None)
+
+
+def record_db_statement(seconds: float) -> None:
+    # called from the engine's cursor events (app.db.session)
+    DB_STATEMENTS.inc()
+    current = _request_db.get()
+    if current is not None:
+        current[0] += 1
+        current[1] += seconds
+
+
+def _route_label(scope) -> str:
+    # the path template ("/organizations/{organization_id}/join-requests"), never the raw path:
+    # ids in label values would create a new series per id
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware): latency, status, in-flight and DB usage per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        db_usage = [0, 0.0]
+        token = _request_db.set(db_usage)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.add(1)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            HTTP_IN_FLIGHT.add(-1)
+            _request_db.reset(token)
+
+            method = scope["method"]
+            route = _route_label(scope)
+            HTTP_REQUESTS.inc(method, route, status)
+            HTTP_LATENCY.observe(elapsed, method, route)
+            DB_STATEMENTS_PER_REQUEST.observe(db_usage[0], method, route)
+            DB_SECONDS_PER_REQUEST.observe(db_usage[1], method, route)
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in _METRICS for line in metric.render()) + "\n"
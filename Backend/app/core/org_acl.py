@@ -0,0 +1,73 @@
+import os
+from typing import NamedTuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.db.queries import query, run
+
+
+# (user_id, organization_id) -> OrgAccess: what a user is in an organization, cached so the permission
+# check in front of every organization endpoint is a memory lookup.
+# Invalidated on this worker by every path that changes it (membership status updates, joins,
+# organization creation); other workers pick up the change within ORG_ACL_CACHE_TTL_S,
+# so keep it short: a suspended member keeps access on other workers for up to that long.
+# Only positive decisions (owner / accepted member) are cached: a "no access" read right after a join
+# or an approval - possibly from a lagging replica - must not stick for the whole TTL.
+ORG_ACL_CACHE_TTL_S = float(os.getenv("ORG_ACL_CACHE_TTL_S", "30"))
+ORG_ACL_CACHE_MAX_ENTRIES = int(os.getenv("ORG_ACL_CACHE_MAX_ENTRIES", "50000"))
+
+_cache = TTLCache(max_entries=ORG_ACL_CACHE_MAX_ENTRIES, ttl_seconds=ORG_ACL_CACHE_TTL_S)
+
+# one membership per (organization, user): uq_organization_members_org_user
+_ORG_ACCESS = query(
+    "acl.org_access",
+    """
+    SELECT o.owner_id = :user_id, om.id, om.role, om.status
+    FROM organizations o
+    LEFT JOIN organization_members om
+           ON om.organization_id = o.id AND om.user_id = :user_id
+    WHERE o.id = :org_id
+    """,
+    prepare=True,
+)
+
+
+class OrgAccess(NamedTuple):
+    exists: bool  # False: no such organization
+    is_owner: bool
+    org_member_id: int | None
+    member_role: str | None
+    member_status: str | None
+
+    @property
+    def is_member(self) -> bool:
+        return self.member_status == "accepted"
+
+
+_NO_ORG = OrgAccess(False, False, None, None, None)
+
+
+async def get_org_access(db: AsyncSession, user_id: int, org_id: int) -> OrgAccess:
+    key = (user_id, org_id)
+    access = _cache.get(key)
+    if access is not None:
+        return access
+
+    row = (await run(db, _ORG_ACCESS, {"user_id": user_id, "org_id": org_id})).first()
+    if row is None:
+        access = _NO_ORG
+    else:
+        status = (row[3] or "").strip().lower() or None
+        access = OrgAccess(True, bool(row[0]), row[1], row[2], status)
+    if access.is_owner or access.is_member:
+        _cache.set(key, access)
+    return access
+
+
+def invalidate_org_access(user_id: int, org_id: int) -> None:
+    _cache.pop((user_id, org_id))
+
+
+def get_org_acl_cache_stats() -> dict:
+    return _cache.stats()
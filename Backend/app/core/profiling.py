@@ -0,0 +1,194 @@
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import secrets
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from starlette.routing import Match
+
+from app.core.security import ops_token_matches
+from app.db.queries import current_call
+
+
+logger = logging.getLogger("learnova.profiling")
+
+# On-demand profiling of single requests on a live worker (no redeploy):
+#   - header:  X-Profile: 1  +  X-Ops-Token   -> this request is profiled
+#   - toggle:  POST /system/profiling/arm     -> the next N requests to a route are profiled
+# Each profile is written to PROFILE_DIR as <id>.prof (pstats / snakeviz) and <id>.txt
+# (request summary, every DB statement with its timing, top functions by cumulative time);
+# the response carries X-Profile-Id: <id>.
+#
+#   PROFILING_ENABLED   0 = ignore the header and the armed routes
+#   PROFILE_DIR         where profiles are written
+#   PROFILE_TOP_N       functions listed in the .txt report
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "1") != "0"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "logs/profiles")
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "40"))
+
+# one profiler per worker at a time (cProfile is per thread and can't nest);
+# requests arriving while one runs are served normally
+_busy = threading.Lock()
+
+_armed_lock = threading.Lock()
+_armed: dict[tuple[str, str], int] = {}  # (method, route template) -> requests left
+
+_recent: deque[dict] = deque(maxlen=20)
+
+# [(seconds, query name, caller, sql)] of the request being profiled
+_profile_statements: ContextVar[list | None] = ContextVar("profile_statements", default=None)
+
+
+def profile_statement(statement: str, seconds: float) -> None:
+    # called from the engine's after_cursor_execute listener (app.db.session)
+    statements = _profile_statements.get()
+    if statements is not None:
+        call = current_call()
+        name, caller = call if call is not None else ("-", "-")
+        statements.append((seconds, name, caller, " ".join(statement.split())))
+
+
+def arm(method: str, route: str, count: int) -> None:
+    with _armed_lock:
+        _armed[(method, route)] = count
+
+
+def disarm_all() -> None:
+    with _armed_lock:
+        _armed.clear()
+
+
+def _header(scope, name: bytes) -> str | None:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _armed_route(scope) -> str | None:
+    # the router hasn't run yet: match the path against the app's routes ourselves
+    with _armed_lock:
+        if not _armed:
+            return None
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                key = (scope["method"], route.path)
+                left = _armed.get(key, 0)
+                if left <= 0:
+                    return None
+                if left == 1:
+                    del _armed[key]
+                else:
+                    _armed[key] = left - 1
+                return route.path
+    return None
+
+
+def _trigger(scope) -> str | None:
+    if _header(scope, b"x-profile") == "1" and ops_token_matches(_header(scope, b"x-ops-token")):
+        return "header"
+    if _armed_route(scope) is not None:
+        return "armed"
+    return None
+
+
+def _write_profile(profile_id: str, profiler: cProfile.Profile, summary: dict, statements: list) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, profile_id)
+    profiler.dump_stats(base + ".prof")
+
+    report = io.StringIO()
+    report.write(
+        f"{summary['method']} {summary['path']} (route {summary['route']}) -> {summary['status']}"
+        f" in {summary['ms']:.1f} ms, trigger: {summary['trigger']}\n"
+    )
+    report.write(f"DB: {summary['db_statements']} statements, {summary['db_ms']:.1f} ms\n")
+    for seconds, name, caller, sql in statements:
+        report.write(f"  {seconds * 1000:8.1f} ms  [{name}] {caller}: {sql[:200]}\n")
+    report.write(
+        "\nNote: cProfile sees the whole event loop thread, so other requests served concurrently"
+        " may appear below. Password hashing runs in the hash pool processes and is not included.\n\n"
+    )
+    pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(report.getvalue())
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware: profiles the requests picked by _trigger(), passes every other one through."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        trigger = _trigger(scope)
+        if trigger is None or not _busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{secrets.token_hex(3)}"
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        statements: list = []
+        token = _profile_statements.set(statements)
+        profiler = cProfile.Profile()
+        t0 = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profiler.disable()
+        finally:
+            elapsed = time.perf_counter() - t0
+            _profile_statements.reset(token)
+            _busy.release()
+
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            summary = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route,
+                "status": status,
+                "ms": elapsed * 1000,
+                "db_statements": len(statements),
+                "db_ms": sum(s[0] for s in statements) * 1000,
+                "trigger": trigger,
+            }
+            try:
+                await asyncio.to_thread(_write_profile, profile_id, profiler, summary, statements)
+                _recent.append(summary)
+            except OSError as e:
+                # the response is already sent: a full disk must not turn it into an error
+                logger.warning("could not write profile %s: %s", profile_id, e)
+
+
+def get_profiling_state() -> dict:
+    with _armed_lock:
+        armed = [{"method": m, "route": r, "remaining": n} for (m, r), n in _armed.items()]
+    return {
+        "enabled": PROFILING_ENABLED,
+        "dir": PROFILE_DIR,
+        "armed": armed,
+        "recent": list(_recent),
+    }
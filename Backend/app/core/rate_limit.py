@@ -0,0 +1,260 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request
+
+try:  # optional: only needed for RATE_LIMIT_BACKEND=redis
+    import redis.asyncio as redis_asyncio
+except ImportError:  # pragma: no cover
+    redis_asyncio = None
+
+
+logger = logging.getLogger("learnova.rate_limit")
+
+# Sliding-window limits for the expensive endpoints (password hashing / emails).
+#   RATE_LIMIT_ENABLED            0 turns every limit off
+#   RATE_LIMIT_BACKEND            memory (per worker) | redis (shared between workers)
+#   RATE_LIMIT_REDIS_URL          used by the redis backend
+#   RATE_LIMIT_TRUST_FORWARDED    1 = client IP from X-Forwarded-For (only behind our own proxy)
+#   RATE_LIMIT_SHARDS / RATE_LIMIT_MAX_KEYS_PER_SHARD   memory store size
+# Limits are "<requests>/<seconds>", e.g. RATE_LIMIT_LOGIN_PER_IP=30/60
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").strip().lower()
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "0") == "1"
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", "16"))
+RATE_LIMIT_MAX_KEYS_PER_SHARD = int(os.getenv("RATE_LIMIT_MAX_KEYS_PER_SHARD", "5000"))
+
+
+_DEFAULT_LIMITS = {
+    "RATE_LIMIT_LOGIN_PER_IP": "30/60",
+    "RATE_LIMIT_LOGIN_PER_EMAIL": "10/300",
+    "RATE_LIMIT_REGISTER_PER_IP": "10/3600",
+    "RATE_LIMIT_REGISTER_PER_EMAIL": "3/3600",
+    "RATE_LIMIT_FORGOT_PER_IP": "10/3600",
+    "RATE_LIMIT_FORGOT_PER_EMAIL": "3/3600",
+}
+
+
+def _parse_limit(env_name: str, default: str) -> tuple[int, float]:
+    raw = os.getenv(env_name, default)
+    try:
+        count, seconds = raw.split("/", 1)
+        return int(count), float(seconds)
+    except ValueError:
+        raise RuntimeError(f"Invalid {env_name}: {raw!r} (expected <requests>/<seconds>)")
+
+
+class SlidingWindowMemoryStore:
+    """
+    Per-worker sliding-window counters (fixed windows weighted by overlap:
+    prev * (1 - elapsed/window) + current), split across shards so concurrent
+    requests for different keys don't serialize on one lock.
+    Each shard keeps at most `max_keys_per_shard` keys (least recently hit are dropped).
+    """
+
+    def __init__(self, *, shards: int, max_keys_per_shard: int):
+        self.max_keys_per_shard = max_keys_per_shard
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(max(1, shards))]
+
+    def hit(self, key: str, limit: int, window_s: float) -> tuple[bool, float]:
+        """Count one request for `key`. Returns (allowed, retry_after_seconds)."""
+        now = time.time()
+        window_id = int(now // window_s)
+        elapsed = now - window_id * window_s
+
+        lock, counters = self._shards[hash(key) % len(self._shards)]
+        with lock:
+            state = counters.get(key)
+            if state is None or state[0] < window_id - 1:
+                current, previous = 0, 0
+            elif state[0] == window_id - 1:
+                current, previous = 0, state[1]
+            else:
+                _, current, previous = state
+
+            allowed = previous * (1 - elapsed / window_s) + current < limit
+            if allowed:
+                current += 1
+
+            counters[key] = (window_id, current, previous)
+            counters.move_to_end(key)
+            while len(counters) > self.max_keys_per_shard:
+                counters.popitem(last=False)
+
+        if allowed:
+            return True, 0.0
+        return False, _retry_after(limit, window_s, elapsed, current, previous)
+
+    def keys(self) -> int:
+        total = 0
+        for lock, counters in self._shards:
+            with lock:
+                total += len(counters)
+        return total
+
+
+# check + increment atomically on the redis side (same weighting as the memory store)
+_REDIS_SLIDING_WINDOW = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[2]) + current >= tonumber(ARGV[1]) then
+    return {0, current, previous}
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return {1, current + 1, previous}
+"""
+
+
+class SlidingWindowRedisStore:
+    """
+    Shared counters in redis, so the limit holds across all workers / instances.
+    If redis is unreachable we fall back to the local memory store instead of
+    failing (or blocking) the auth endpoints.
+    """
+
+    def __init__(self, url: str, fallback: SlidingWindowMemoryStore):
+        if redis_asyncio is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis needs the `redis` package (pip install redis)")
+        self._client = redis_asyncio.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self._script = self._client.register_script(_REDIS_SLIDING_WINDOW)
+        self._fallback = fallback
+        self.errors = 0
+
+    async def hit(self, key: str, limit: int, window_s: float) -> tuple[bool, float]:
+        now = time.time()
+        window_id = int(now // window_s)
+        elapsed = now - window_id * window_s
+        # {key} hash tag keeps both windows on the same cluster slot
+        keys = [f"rl:{{{key}}}:{window_id}", f"rl:{{{key}}}:{window_id - 1}"]
+        try:
+            allowed, current, previous = await self._script(
+                keys=keys,
+                args=[limit, 1 - elapsed / window_s, math.ceil(window_s * 2)],
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning("rate limit redis error, using local counters: %s", e)
+            return self._fallback.hit(key, limit, window_s)
+
+        if allowed:
+            return True, 0.0
+        return False, _retry_after(limit, window_s, elapsed, int(current), int(previous))
+
+
+def _retry_after(limit: int, window_s: float, elapsed: float, current: int, previous: int) -> float:
+    # when does prev * (1 - t/window) + current drop below the limit again?
+    if current < limit and previous > 0:
+        needed = (1 - (limit - current) / previous) * window_s
+        return max(needed - elapsed, 1.0)
+    # the current window alone is full: wait for it to roll over
+    return max(window_s - elapsed, 1.0)
+
+
+_memory_store = SlidingWindowMemoryStore(
+    shards=RATE_LIMIT_SHARDS,
+    max_keys_per_shard=RATE_LIMIT_MAX_KEYS_PER_SHARD,
+)
+_redis_store: SlidingWindowRedisStore | None = None
+
+_stats_lock = threading.Lock()
+_stats: dict[str, dict[str, int]] = {}
+
+
+def _get_redis_store() -> SlidingWindowRedisStore:
+    global _redis_store
+    if _redis_store is None:
+        _redis_store = SlidingWindowRedisStore(RATE_LIMIT_REDIS_URL, _memory_store)
+    return _redis_store
+
+
+async def _hit(key: str, limit: int, window_s: float) -> tuple[bool, float]:
+    if RATE_LIMIT_BACKEND == "redis":
+        return await _get_redis_store().hit(key, limit, window_s)
+    if RATE_LIMIT_BACKEND == "memory":
+        return _memory_store.hit(key, limit, window_s)
+    raise RuntimeError(f"Invalid RATE_LIMIT_BACKEND: {RATE_LIMIT_BACKEND}")
+
+
+def _count(rule: str, allowed: bool) -> None:
+    with _stats_lock:
+        counters = _stats.setdefault(rule, {"allowed": 0, "rejected": 0})
+        counters["allowed" if allowed else "rejected"] += 1
+
+
+def _client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",", 1)[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+async def _body_email(request: Request) -> str | None:
+    # FastAPI already read the body for the route, request.json() reuses it
+    try:
+        body = await request.json()
+    except Exception:
+        return None
+    email = body.get("email") if isinstance(body, dict) else None
+    if not isinstance(email, str) or not email.strip():
+        return None
+    return email.strip().lower()
+
+
+def rate_limit(name: str, *, per_ip: str | None = None, per_email: str | None = None):
+    """
+    Route dependency: `@router.post(..., dependencies=[Depends(rate_limit("login", ...))])`.
+    `per_ip` / `per_email` are the env var names holding "<requests>/<seconds>".
+    Route-level dependencies run before the endpoint's own ones (get_db, ...), so a
+    rejected request never touches the DB or the hash pool.
+    """
+    rules = []
+    if per_ip:
+        rules.append(("ip", per_ip))
+    if per_email:
+        rules.append(("email", per_email))
+    limits = {scope: _parse_limit(env_name, _DEFAULT_LIMITS.get(env_name, "")) for scope, env_name in rules}
+
+    async def dependency(request: Request) -> None:
+        if not RATE_LIMIT_ENABLED:
+            return
+
+        for scope, (limit, window_s) in limits.items():
+            if scope == "ip":
+                subject = _client_ip(request)
+            else:
+                subject = await _body_email(request)
+                if subject is None:
+                    continue  # invalid body: validation rejects it anyway
+
+            rule = f"{name}:{scope}"
+            allowed, retry_after = await _hit(f"{rule}:{subject}", limit, window_s)
+            _count(rule, allowed)
+            if not allowed:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests, please try again later",
+                    headers={"Retry-After": str(math.ceil(retry_after))},
+                )
+
+    return dependency
+
+
+def get_rate_limit_stats() -> dict:
+    with _stats_lock:
+        rules = {rule: dict(counters) for rule, counters in _stats.items()}
+    stats = {
+        "enabled": RATE_LIMIT_ENABLED,
+        "backend": RATE_LIMIT_BACKEND,
+        "local_keys": _memory_store.keys(),
+        "rules": rules,
+    }
+    if _redis_store is not None:
+        stats["redis_errors"] = _redis_store.errors
+    return stats
@@ -4,26 +4,160 @@ import hmac
 import base64
 
 
-_ITERATIONS = 310_000  # رقم كويس حالياً
+# Stored format: <algorithm>$<params...>$<salt>$<hash>
+#   pbkdf2_sha256$310000$salt$hash
+#   scrypt$16384$8$1$salt$hash
+# Old rows (before the prefix was added) look like iterations$salt$hash and are read as pbkdf2_sha256.
+#
+# Cost is tuned per deployment from env (see `python -m app.core.hash_calibration`):
+#   PASSWORD_HASHER     pbkdf2_sha256 | scrypt  (used for new hashes)
+#   PBKDF2_ITERATIONS
+#   SCRYPT_N / SCRYPT_R / SCRYPT_P
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "pbkdf2_sha256").strip().lower()
+PBKDF2_ITERATIONS = int(os.getenv("PBKDF2_ITERATIONS", "310000"))  # رقم كويس حالياً
+SCRYPT_N = int(os.getenv("SCRYPT_N", "16384"))
+SCRYPT_R = int(os.getenv("SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("SCRYPT_P", "1"))
+
 _SALT_BYTES = 16
 _DKLEN = 32
 
 
+def _b64e(raw: bytes) -> str:
+    return base64.b64encode(raw).decode()
+
+
+def _b64d(value: str) -> bytes:
+    return base64.b64decode(value.encode())
+
+
+class Pbkdf2Sha256Hasher:
+    name = "pbkdf2_sha256"
+
+    def __init__(self, iterations: int):
+        self.iterations = iterations
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(_SALT_BYTES)
+        dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, self.iterations, dklen=_DKLEN)
+        return f"{self.name}${self.iterations}${_b64e(salt)}${_b64e(dk)}"
+
+    def verify(self, password: str, params: str) -> bool:
+        try:
+            it_str, salt_b64, dk_b64 = params.split("$", 2)
+            iterations = int(it_str)
+            salt = _b64d(salt_b64)
+            dk_expected = _b64d(dk_b64)
+        except Exception:
+            return False
+
+        dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations, dklen=len(dk_expected))
+        return hmac.compare_digest(dk, dk_expected)
+
+    def needs_update(self, params: str) -> bool:
+        try:
+            return int(params.split("$", 1)[0]) != self.iterations
+        except ValueError:
+            return True
+
+
+class ScryptHasher:
+    name = "scrypt"
+
+    def __init__(self, n: int, r: int, p: int):
+        self.n = n
+        self.r = r
+        self.p = p
+
+    @staticmethod
+    def _derive(password: str, salt: bytes, n: int, r: int, p: int, dklen: int) -> bytes:
+        # OpenSSL needs ~128 * r * (n + p) bytes; give it some headroom
+        maxmem = 128 * r * (n + p) * 2
+        return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p, maxmem=maxmem, dklen=dklen)
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(_SALT_BYTES)
+        dk = self._derive(password, salt, self.n, self.r, self.p, _DKLEN)
+        return f"{self.name}${self.n}${self.r}${self.p}${_b64e(salt)}${_b64e(dk)}"
+
+    def verify(self, password: str, params: str) -> bool:
+        try:
+            n_str, r_str, p_str, salt_b64, dk_b64 = params.split("$", 4)
+            n, r, p = int(n_str), int(r_str), int(p_str)
+            salt = _b64d(salt_b64)
+            dk_expected = _b64d(dk_b64)
+            dk = self._derive(password, salt, n, r, p, len(dk_expected))
+        except Exception:
+            return False
+
+        return hmac.compare_digest(dk, dk_expected)
+
+    def needs_update(self, params: str) -> bool:
+        try:
+            n_str, r_str, p_str, _ = params.split("$", 3)
+            return (int(n_str), int(r_str), int(p_str)) != (self.n, self.r, self.p)
+        except ValueError:
+            return True
+
+
+_HASHERS = {}
+
+
+def register_hasher(hasher) -> None:
+    _HASHERS[hasher.name] = hasher
+
+
+register_hasher(Pbkdf2Sha256Hasher(PBKDF2_ITERATIONS))
+register_hasher(ScryptHasher(SCRYPT_N, SCRYPT_R, SCRYPT_P))
+
+
+def get_hasher(name: str | None = None):
+    name = name or PASSWORD_HASHER
+    hasher = _HASHERS.get(name)
+    if hasher is None:
+        raise RuntimeError(f"Unknown password hasher: {name}")
+    return hasher
+
+
+def _split(stored: str):
+    # returns (hasher, params) or (None, None) for garbage
+    algorithm, sep, params = stored.partition("$")
+    if not sep:
+        return None, None
+
+    # legacy rows: iterations$salt$hash
+    if algorithm.isdigit():
+        return _HASHERS.get(Pbkdf2Sha256Hasher.name), stored
+
+    return _HASHERS.get(algorithm), params
+
+
 def hash_password(password: str) -> str:
-    salt = os.urandom(_SALT_BYTES)
-    dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, _ITERATIONS, dklen=_DKLEN)
-    # نخزنها في صيغة واحدة داخل string: iterations$salt$hash
-    return f"{_ITERATIONS}${base64.b64encode(salt).decode()}${base64.b64encode(dk).decode()}"
+    return get_hasher().hash(password)
 
 
 def verify_password(password: str, stored: str) -> bool:
-    try:
-        it_str, salt_b64, dk_b64 = stored.split("$", 2)
-        iterations = int(it_str)
-        salt = base64.b64decode(salt_b64.encode())
-        dk_expected = base64.b64decode(dk_b64.encode())
-    except Exception:
+    hasher, params = _split(stored or "")
+    if hasher is None:
         return False
+    return hasher.verify(password, params)
+
+
+def needs_rehash(stored: str) -> bool:
+    """
+    True when the stored hash wasn't produced by the current default hasher/params
+    (other algorithm, other cost, or the legacy un-prefixed format).
+    """
+    algorithm = (stored or "").partition("$")[0]
+    default = get_hasher()
+    if algorithm != default.name:
+        return True
+
+    _, params = _split(stored)
+    return default.needs_update(params)
+
 
-    dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations, dklen=len(dk_expected))
-    return hmac.compare_digest(dk, dk_expected)
+def ops_token_matches(value: str | None) -> bool:
+    # X-Ops-Token check shared by require_ops_token (app.core.deps) and the profiling middleware
+    expected = os.getenv("OPS_TOKEN")
+    return bool(expected) and bool(value) and hmac.compare_digest(value, expected)
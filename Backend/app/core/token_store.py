@@ -1,55 +1,138 @@
-from datetime import datetime, timezone
+import hashlib
+import hmac
+import os
+import secrets
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from fastapi import HTTPException
 
+from app.db.queries import query, run
 
-def get_valid_user_token(
-    db: Session,
+# token_hash = HMAC-SHA256(TOKEN_HASH_SECRET, token): without the key, a DB dump can't be used to
+# brute-force short tokens (6-hex OTPs). Falls back to JWT_SECRET when unset, so rotating the JWT
+# secret then also invalidates every outstanding verify / reset link and OTP (as does changing this key).
+TOKEN_HASH_SECRET = os.getenv("TOKEN_HASH_SECRET") or os.getenv("JWT_SECRET")
+
+_INSERT_TOKEN = query(
+    "tokens.insert",
+    """
+    INSERT INTO user_tokens (user_id, type, token_hash, expires_at, created_at)
+    VALUES (:user_id, :type, :token_hash, :expires_at, NOW())
+    """,
+)
+
+_CONSUME_SQL = """
+    UPDATE user_tokens
+    SET used_at = NOW()
+    WHERE token_hash = :token_hash
+      AND type = :type
+      AND used_at IS NULL
+      AND expires_at > NOW()
+      {user_clause}
+    RETURNING id, user_id
+"""
+# two fixed statements (not one built per call) so each can stay prepared
+_CONSUME = query("tokens.consume", _CONSUME_SQL.format(user_clause=""), prepare=True)
+_CONSUME_FOR_USER = query(
+    "tokens.consume_for_user",
+    _CONSUME_SQL.format(user_clause="AND user_id = :user_id"),
+    prepare=True,
+)
+
+
+def hash_token(token: str) -> str:
+    """
+    user_tokens never stores the raw token, only its keyed HMAC-SHA256 hex digest
+    (a DB leak doesn't leak usable verify/reset links or OTPs).
+    """
+    if not TOKEN_HASH_SECRET:
+        raise RuntimeError("TOKEN_HASH_SECRET / JWT_SECRET is missing")
+    return hmac.new(TOKEN_HASH_SECRET.encode("utf-8"), token.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+async def issue_user_token(
+    db: AsyncSession,
     *,
-    token: str,
+    user_id: int,
     token_type: str,
-):
-    """
-    Fetch a token row from user_tokens and validate it:
-    - correct type
-    - not used
-    - not expired
-
-    Returns: row tuple (id, user_id, token, expires_at, used_at)
-    Raises: HTTPException(400) if invalid/expired/used
-    """
-    row = db.execute(
-        text(
-            """
-            SELECT id, user_id, token, expires_at, used_at
-            FROM user_tokens
-            WHERE token = :token AND type = :type
-            """
-        ),
-        {"token": token, "type": token_type},
-    ).first()
+    ttl: timedelta,
+    token: str | None = None,
+) -> str:
+    """
+    Insert a one-time token (no commit) and return the RAW token to send to the user.
+    `token` lets callers pass their own format (e.g. short OTPs); default is a random url-safe token.
+    """
+    raw = token or secrets.token_urlsafe(32)
+    await run(
+        db,
+        _INSERT_TOKEN,
+        {
+            "user_id": user_id,
+            "type": token_type,
+            "token_hash": hash_token(raw),
+            "expires_at": datetime.now(timezone.utc) + ttl,
+        },
+    )
+    return raw
 
-    if not row:
-        raise HTTPException(status_code=400, detail="Invalid or expired token")
 
-    token_id, user_id, token_db, expires_at, used_at = row
+async def consume_token(
+    db: AsyncSession,
+    *,
+    token: str,
+    token_type: str,
+    user_id: int | None = None,
+    detail: str = "Invalid or expired token",
+) -> tuple[int, int]:
+    """
+    Validate AND mark a one-time token used in a single UPDATE ... RETURNING (no commit).
+    Two concurrent requests with the same token can't both pass: the row lock makes the
+    second one re-check `used_at IS NULL` and match nothing.
+    `user_id` restricts the match to that user's tokens (e.g. OTPs).
 
-    if used_at is not None:
-        raise HTTPException(status_code=400, detail="Invalid or expired token")
+    Returns: (token_id, user_id)
+    Raises: HTTPException(400, detail) if unknown/used/expired
+    """
+    params = {"token_hash": hash_token(token), "type": token_type}
+    if user_id is None:
+        result = await run(db, _CONSUME, params)
+    else:
+        result = await run(db, _CONSUME_FOR_USER, {**params, "user_id": user_id})
+    row = result.first()
 
-    now = datetime.now(timezone.utc)
-    if expires_at <= now:
-        raise HTTPException(status_code=400, detail="Invalid or expired token")
+    if not row:
+        raise HTTPException(status_code=400, detail=detail)
 
-    return row
+    return row[0], row[1]
 
 
-def mark_token_used(db: Session, *, token_id: int) -> None:
+def purge_expired_tokens(db: Session, *, retention: timedelta, batch_size: int) -> int:
     """
-    Marks a token as used (one-time token).
+    Delete tokens that expired more than `retention` ago, in chunks of `batch_size`
+    (one short transaction per chunk, so the purge never holds long locks).
+    Every token expires at most 24h after creation, so this also covers used tokens.
+    Returns the number of deleted rows.
     """
-    db.execute(
-        text("UPDATE user_tokens SET used_at = NOW() WHERE id = :id"),
-        {"id": token_id},
-    )
+    total = 0
+    while True:
+        deleted = db.execute(
+            text(
+                """
+                DELETE FROM user_tokens
+                WHERE id IN (
+                    SELECT id
+                    FROM user_tokens
+                    WHERE expires_at < NOW() - make_interval(secs => :retention)
+                    LIMIT :batch_size
+                )
+                """
+            ),
+            {"retention": retention.total_seconds(), "batch_size": batch_size},
+        ).rowcount
+        db.commit()
+
+        total += deleted
+        if deleted < batch_size:
+            return total
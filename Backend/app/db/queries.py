@@ -0,0 +1,137 @@
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+# Every statement the services run is declared ONCE at import time with a name:
+#
+#     _FIND_USER = query("auth.find_user", "SELECT ... WHERE email = :email", prepare=True)
+#     row = (await run(db, _FIND_USER, {"email": email})).first()
+#
+# prepare=True  -> psycopg prepares it server-side on its first execution on each connection
+#                  (others are prepared automatically after DB_PREPARE_THRESHOLD executions)
+# Per-query call counts / errors / latency histograms: GET /system/stats/queries
+#
+#   DB_PREPARE_THRESHOLD   psycopg auto-prepare threshold; "off" disables server-side prepared
+#                          statements completely (needed behind pgbouncer in transaction mode)
+DB_PREPARE_THRESHOLD = os.getenv("DB_PREPARE_THRESHOLD", "5").strip().lower()
+PREPARE_ENABLED = DB_PREPARE_THRESHOLD != "off"
+
+# latency histogram upper bounds (seconds), last bucket is +Inf
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def prepare_connect_args() -> dict:
+    # merged into the engines' connect_args (app.db.session)
+    return {"prepare_threshold": int(DB_PREPARE_THRESHOLD) if PREPARE_ENABLED else None}
+
+
+class NamedQuery:
+    __slots__ = ("name", "statement", "prepare", "_lock", "calls", "errors", "seconds_total", "buckets")
+
+    def __init__(self, name: str, sql: str, *, prepare: bool):
+        self.name = name
+        self.prepare = prepare and PREPARE_ENABLED
+        self.statement = text(sql).execution_options(prepare=self.prepare)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.seconds_total = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def record(self, seconds: float, *, failed: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            self.errors += int(failed)
+            self.seconds_total += seconds
+            self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "seconds_total": self.seconds_total,
+                "avg_ms": self.seconds_total / self.calls * 1000 if self.calls else 0.0,
+                "prepared": self.prepare,
+                "histogram": {
+                    **{f"le_{bound}": count for bound, count in zip(LATENCY_BUCKETS, self.buckets)},
+                    "le_inf": self.buckets[-1],
+                },
+            }
+
+
+_registry: dict[str, NamedQuery] = {}
+
+# (query, calling frame) of the statement being executed: the engine events (slow-query log)
+# run inside SQLAlchemy's greenlet, whose stack doesn't contain the service coroutine
+_current_call: ContextVar[tuple | None] = ContextVar("current_query_call", default=None)
+
+
+def query(name: str, sql: str, *, prepare: bool = False) -> NamedQuery:
+    if name in _registry:
+        raise RuntimeError(f"Query {name!r} is already registered")
+    q = NamedQuery(name, sql, prepare=prepare)
+    _registry[name] = q
+    return q
+
+
+async def run(db: AsyncSession, q: NamedQuery, params: dict | None = None):
+    token = _current_call.set((q, sys._getframe(1)))
+    t0 = time.perf_counter()
+    failed = True
+    try:
+        result = await db.execute(q.statement, params or {})
+        failed = False
+        return result
+    finally:
+        q.record(time.perf_counter() - t0, failed=failed)
+        _current_call.reset(token)
+
+
+async def stream(db: AsyncSession, q: NamedQuery, params: dict | None = None, *, batch: int = 500):
+    """
+    run() for large result sets: a server-side cursor, rows are fetched `batch` at a time while the
+    caller iterates (async for / .partitions()). Only opening the cursor is timed. Not prepared.
+    """
+    token = _current_call.set((q, sys._getframe(1)))
+    t0 = time.perf_counter()
+    failed = True
+    try:
+        result = await db.stream(q.statement.execution_options(prepare=False, yield_per=batch), params or {})
+        failed = False
+        return result
+    finally:
+        q.record(time.perf_counter() - t0, failed=failed)
+        _current_call.reset(token)
+
+
+def current_call() -> tuple[str, str] | None:
+    """(query name, "module.function" of its caller) while run() executes, else None."""
+    call = _current_call.get()
+    if call is None:
+        return None
+    q, frame = call
+    return q.name, f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}"
+
+
+@event.listens_for(Engine, "do_execute")
+def _execute_prepared(cursor, statement, parameters, context):
+    # hot queries: ask psycopg to prepare on first use instead of waiting for the threshold
+    if context.execution_options.get("prepare"):
+        cursor.execute(statement, parameters, prepare=True)
+        return True
+    return None
+
+
+def get_query_stats() -> dict:
+    # slowest (by total time) first: that's where optimisation pays off
+    stats = {name: q.stats() for name, q in _registry.items()}
+    return dict(sorted(stats.items(), key=lambda item: item[1]["seconds_total"], reverse=True))
@@ -0,0 +1,182 @@
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.session import (
+    AsyncSessionLocal,
+    TimedAsyncQueuePool,
+    pool_settings,
+    pool_stats,
+    route_statement_timeout,
+    wrote_recently,
+)
+
+logger = logging.getLogger("learnova.replicas")
+
+# Read-only endpoints can read from streaming replicas instead of the primary.
+#   DATABASE_REPLICA_URLS          comma separated; empty = every read goes to the primary
+#   REPLICA_MAX_LAG_S              replicas further behind than this are skipped
+#   REPLICA_LAG_CHECK_INTERVAL_S   how often each worker re-measures a replica's lag
+#   REPLICA_CONNECT_TIMEOUT_S      give up on an unreachable replica after this
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+REPLICA_MAX_LAG_S = float(os.getenv("REPLICA_MAX_LAG_S", "2"))
+REPLICA_LAG_CHECK_INTERVAL_S = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL_S", "2"))
+REPLICA_CONNECT_TIMEOUT_S = int(os.getenv("REPLICA_CONNECT_TIMEOUT_S", "2"))
+
+# caught up (everything received is replayed) -> 0, else age of the last replayed transaction;
+# a plain (non-standby) server counts as 0 so a second local Postgres works as a stand-in
+_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class ReplicaPool(TimedAsyncQueuePool):
+    stats_key = "replica"
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        # a dead replica must fail fast: requests wait on its lag check
+        settings = {**pool_settings, "connect_args": {**pool_settings["connect_args"], "connect_timeout": REPLICA_CONNECT_TIMEOUT_S}}
+        self.engine = create_async_engine(url, poolclass=ReplicaPool, **settings)
+        self.healthy = False
+        self.lag_s: float | None = None
+        self.checked_at = 0.0
+        self.reads = 0
+        self._lock = asyncio.Lock()
+
+    async def usable(self) -> bool:
+        if time.monotonic() - self.checked_at > REPLICA_LAG_CHECK_INTERVAL_S:
+            async with self._lock:
+                # another request may have refreshed it while we waited
+                if time.monotonic() - self.checked_at > REPLICA_LAG_CHECK_INTERVAL_S:
+                    await self._refresh()
+        return self.healthy and self.lag_s is not None and self.lag_s <= REPLICA_MAX_LAG_S
+
+    async def _refresh(self) -> None:
+        try:
+            async with self.engine.connect() as conn:
+                self.lag_s = float((await conn.execute(text(_LAG_SQL))).scalar())
+            self.healthy = True
+        except Exception as e:
+            if self.healthy:
+                logger.warning("replica %s unavailable, reading from primary: %s", self.name, e)
+            self.healthy = False
+        self.checked_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag_s": self.lag_s,
+            "checked_s_ago": round(time.monotonic() - self.checked_at, 1) if self.checked_at else None,
+            "reads": self.reads,
+            "pool": pool_stats(self.engine.pool),
+        }
+
+
+_replicas = [Replica(url) for url in DATABASE_REPLICA_URLS]
+_next_replica = itertools.count()
+
+_stats_lock = threading.Lock()
+_stats = {
+    "primary_reads": 0,
+    "read_your_writes": 0,
+    "lag_fallbacks": 0,
+}
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+async def _pick_replica() -> Replica | None:
+    # round-robin, skipping replicas that are down or too far behind
+    start = next(_next_replica)
+    for i in range(len(_replicas)):
+        replica = _replicas[(start + i) % len(_replicas)]
+        if await replica.usable():
+            return replica
+    return None
+
+
+def is_replica(db: AsyncSession) -> bool:
+    return "replica" in db.info
+
+
+@asynccontextmanager
+async def primary_for(db: AsyncSession):
+    """
+    The primary for this unit of work: `db` itself when it already is the primary,
+    otherwise a short-lived primary session (re-checks and writes from replica-backed endpoints).
+    """
+    if not is_replica(db):
+        yield db
+        return
+
+    primary = AsyncSessionLocal()
+    primary.info.update({k: v for k, v in db.info.items() if k != "replica"})
+    try:
+        yield primary
+    finally:
+        await primary.close()
+
+
+async def get_read_db(request: Request):
+    """
+    AsyncSession for read-only endpoints: a healthy replica within REPLICA_MAX_LAG_S,
+    or the primary when there is none / the same client committed something
+    in the last READ_YOUR_WRITES_S seconds (so it always sees its own changes).
+    """
+    replica = None
+    if _replicas:
+        if wrote_recently(request):
+            _count("read_your_writes")
+        else:
+            replica = await _pick_replica()
+            if replica is None:
+                _count("lag_fallbacks")
+
+    if replica is None:
+        _count("primary_reads")
+        db = AsyncSessionLocal()
+    else:
+        replica.reads += 1
+        db = AsyncSessionLocal(bind=replica.engine)
+        db.info["replica"] = replica.name
+
+    budget = route_statement_timeout(request)
+    if budget is not None:
+        db.info["statement_timeout_ms"] = budget
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+def get_replica_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["max_lag_s"] = REPLICA_MAX_LAG_S
+    stats["replicas"] = [r.stats() for r in _replicas]
+    return stats
+
+
+async def dispose_replica_engines() -> None:
+    for replica in _replicas:
+        await replica.engine.dispose()
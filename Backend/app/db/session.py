@@ -1,9 +1,103 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import hashlib
+import hmac
+import os
+import threading
+import time
+from contextvars import ContextVar
 
-DATABASE_URL = "postgresql+psycopg://postgres@localhost:5432/learnova"
+import psycopg
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine, event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
-engine = create_engine(DATABASE_URL)
+from app.core.metrics import record_db_statement
+from app.core.profiling import profile_statement
+from app.db.slow_queries import SLOW_QUERY_S, log_slow_statement
+from app.db.queries import prepare_connect_args
+
+# Pools are per worker process (one for the sync engine, one for the async engine):
+# DB connections per worker <= 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+#   DB_POOL_SIZE            connections kept open
+#   DB_MAX_OVERFLOW         extra connections opened under burst (closed when returned)
+#   DB_POOL_TIMEOUT_S       max wait for a free connection before failing with 503
+#   DB_POOL_RECYCLE_S       reopen connections older than this (-1 = never)
+#   DB_POOL_PRE_PING        1 = test a connection on checkout (survives DB restarts / idle kills)
+#   DB_STATEMENT_TIMEOUT_MS default statement_timeout for every query (0 = no limit);
+#                           routes can set their own budget with @statement_timeout(ms)
+DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+psycopg://postgres@localhost:5432/learnova")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "10"))
+DB_POOL_RECYCLE_S = int(os.getenv("DB_POOL_RECYCLE_S", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") != "0"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+#   READ_YOUR_WRITES_S      after a request commits, the same client reads from the primary for
+#                           this long (0 = off), see ReadYourWritesMiddleware / app/db/replicas.py
+READ_YOUR_WRITES_S = float(os.getenv("READ_YOUR_WRITES_S", "5"))
+#   READ_YOUR_WRITES_SECRET signs the marker so clients can't mint their own (defaults to JWT_SECRET;
+#                           neither set = markers are never accepted, every read may go to a replica)
+READ_YOUR_WRITES_SECRET = os.getenv("READ_YOUR_WRITES_SECRET") or os.getenv("JWT_SECRET") or ""
+
+
+_wait_lock = threading.Lock()
+_wait_stats: dict[str, dict] = {}
+
+
+class _TimedCheckoutMixin:
+    """Records how long callers wait for a connection (per engine kind: sync / async)."""
+
+    stats_key: str
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - t0
+            with _wait_lock:
+                stats = _wait_stats.setdefault(
+                    self.stats_key,
+                    {"checkouts": 0, "timeouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0},
+                )
+                stats["checkouts"] += 1
+                stats["timeouts"] += int(timed_out)
+                stats["wait_seconds_total"] += waited
+                stats["wait_seconds_max"] = max(stats["wait_seconds_max"], waited)
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    stats_key = "sync"
+
+
+class TimedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    stats_key = "async"
+
+
+connect_args = prepare_connect_args()
+if DB_STATEMENT_TIMEOUT_MS > 0:
+    # set once per connection at connect time, no extra round trip per request
+    connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+
+pool_settings = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT_S,
+    "pool_recycle": DB_POOL_RECYCLE_S,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+    "connect_args": connect_args,
+}
+
+# sync engine: workers, scripts, sync routes
+engine = create_engine(DATABASE_URL, poolclass=TimedQueuePool, **pool_settings)
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -11,9 +105,209 @@ SessionLocal = sessionmaker(
     bind=engine,
 )
 
-def get_db():
+# async engine (psycopg3 async driver, same URL): the API routes
+async_engine = create_async_engine(DATABASE_URL, poolclass=TimedAsyncQueuePool, **pool_settings)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+def statement_timeout(ms: int):
+    """
+    Per-route query budget (ms, 0 = no limit), read by get_db / get_async_db:
+
+        @router.delete("/delete/confirm")
+        @statement_timeout(30_000)
+        def confirm_delete_account(...): ...
+    """
+    def decorator(endpoint):
+        endpoint.statement_timeout_ms = ms
+        return endpoint
+    return decorator
+
+
+@event.listens_for(Session, "after_begin")  # sync sessions and the ones behind AsyncSession
+def _apply_statement_timeout(session, transaction, connection):
+    # SET LOCAL only lives until the end of this transaction, so the pooled
+    # connection goes back with the default budget
+    budget = session.info.get("statement_timeout_ms")
+    if budget is not None:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(budget)}")
+
+
+@event.listens_for(Session, "after_commit")
+def _flag_commit(session):
+    # primary commits only; [commit time] of the current request, sent back by ReadYourWritesMiddleware
+    marker = _last_write.get()
+    if marker is not None and "replica" not in session.info:
+        marker[0] = time.time()
+
+
+# DB statement count / time per HTTP request (/metrics), profiled requests and the slow-query log;
+# on the Engine class so the sync, async and replica engines are all covered
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info["statement_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("statement_started", None)
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        record_db_statement(elapsed)
+        profile_statement(statement, elapsed)
+        if SLOW_QUERY_S > 0 and elapsed >= SLOW_QUERY_S:
+            log_slow_statement(conn, statement, parameters, executemany, elapsed)
+
+
+@event.listens_for(Engine, "handle_error")
+def _record_failed_statement(context):
+    # statements cancelled by statement_timeout are the slowest of all
+    conn = context.connection
+    started = conn.info.pop("statement_started", None) if conn is not None else None
+    if started is not None and context.statement is not None:
+        elapsed = time.perf_counter() - started
+        if SLOW_QUERY_S > 0 and elapsed >= SLOW_QUERY_S:
+            executemany = bool(context.execution_context and context.execution_context.executemany)
+            log_slow_statement(
+                conn, context.statement, context.parameters, executemany, elapsed, error=context.original_exception
+            )
+
+
+# Read-your-writes: the "I just wrote" marker travels with the client, not in worker memory,
+# so it holds across workers / hosts and never mixes up clients behind the same NAT.
+# A request that commits on the primary gets back its commit time (unix seconds), signed, as
+#   Set-Cookie: learnova_lw=<ts>.<sig>   (browsers / cookie jars send it back on their own)
+#   X-Last-Write: <ts>.<sig>             (API clients echo it as an X-Last-Write request header)
+# and for READ_YOUR_WRITES_S after that, get_read_db sends its reads to the primary.
+# Unsigned / forged / future markers are ignored, so a client can't pin its reads to the primary.
+LAST_WRITE_COOKIE = "learnova_lw"
+LAST_WRITE_HEADER = "x-last-write"
+
+# mutable [commit time | None] per request; a list so commits inside the threadpool (sync routes) are seen too
+_last_write: ContextVar[list | None] = ContextVar("last_write", default=None)
+
+
+def _sign_marker(ts: str) -> str:
+    return hmac.new(READ_YOUR_WRITES_SECRET.encode("utf-8"), ts.encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+
+class ReadYourWritesMiddleware:
+    """Pure ASGI middleware: returns the request's primary commit time to the client (cookie + header)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or READ_YOUR_WRITES_S <= 0 or not READ_YOUR_WRITES_SECRET:
+            await self.app(scope, receive, send)
+            return
+
+        marker: list = [None]
+
+        async def send_wrapper(message):
+            # commits happen in the endpoint, before the response starts
+            if message["type"] == "http.response.start" and marker[0] is not None:
+                ts = f"{marker[0]:.3f}"
+                value = f"{ts}.{_sign_marker(ts)}".encode()
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (LAST_WRITE_HEADER.encode(), value),
+                    (
+                        b"set-cookie",
+                        b"%s=%s; Max-Age=%d; Path=/; HttpOnly; SameSite=Lax"
+                        % (LAST_WRITE_COOKIE.encode(), value, max(int(READ_YOUR_WRITES_S), 1)),
+                    ),
+                ]
+            await send(message)
+
+        token = _last_write.set(marker)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _last_write.reset(token)
+
+
+def wrote_recently(request: Request) -> bool:
+    value = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+    if not value or READ_YOUR_WRITES_S <= 0 or not READ_YOUR_WRITES_SECRET:
+        return False
+    ts, _, sig = value.rpartition(".")
+    if not hmac.compare_digest(sig.encode(), _sign_marker(ts).encode()):
+        return False
+    try:
+        age = time.time() - float(ts)
+    except ValueError:
+        return False
+    # a little clock skew between hosts is fine, a timestamp from the future is not
+    return -1.0 <= age < READ_YOUR_WRITES_S
+
+
+def route_statement_timeout(request: Request) -> int | None:
+    # only routes with their own budget pay for the extra SET LOCAL
+    budget = getattr(request.scope.get("endpoint"), "statement_timeout_ms", None)
+    if budget is not None and budget != DB_STATEMENT_TIMEOUT_MS:
+        return budget
+    return None
+
+
+def get_db(request: Request):
     db = SessionLocal()
+    budget = route_statement_timeout(request)
+    if budget is not None:
+        db.info["statement_timeout_ms"] = budget
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db(request: Request):
+    db = AsyncSessionLocal()
+    budget = route_statement_timeout(request)
+    if budget is not None:
+        db.info["statement_timeout_ms"] = budget
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+def db_overload_exception_handler(request: Request, exc: sa_exc.SQLAlchemyError):
+    # pool exhausted / statement_timeout hit -> 503 so clients back off, anything else stays a 500
+    if isinstance(exc, sa_exc.TimeoutError):
+        detail = "Database is busy, please try again"
+    elif isinstance(getattr(exc, "orig", None), psycopg.errors.QueryCanceled):
+        detail = "Database query timed out"
+    else:
+        raise exc
+    return JSONResponse(status_code=503, content={"detail": detail}, headers={"Retry-After": "1"})
+
+
+def pool_stats(pool) -> dict:
+    with _wait_lock:
+        wait = dict(_wait_stats.get(pool.stats_key, {}))
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        **wait,
+    }
+
+
+def get_db_pool_stats() -> dict:
+    return {
+        "statement_timeout_ms": DB_STATEMENT_TIMEOUT_MS,
+        "sync": pool_stats(engine.pool),
+        "async": pool_stats(async_engine.pool),
+    }
+
+
+async def dispose_async_engine() -> None:
+    await async_engine.dispose()
@@ -0,0 +1,176 @@
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from app.db.queries import current_call
+
+
+# Statements slower than SLOW_QUERY_MS are written to a rotating log file with the shape of
+# their parameters (types / lengths, never values), the service function that ran them and,
+# optionally, the EXPLAIN plan measured right after on the same connection / transaction.
+#   SLOW_QUERY_MS                   threshold (0 = off)
+#   SLOW_QUERY_LOG_FILE             rotating log file
+#   SLOW_QUERY_LOG_MAX_BYTES        rotate after this size
+#   SLOW_QUERY_LOG_BACKUPS          rotated files to keep
+#   SLOW_QUERY_EXPLAIN              1 = attach EXPLAIN (ANALYZE, BUFFERS) to SELECTs, plain EXPLAIN to writes
+#   SLOW_QUERY_EXPLAIN_SAMPLE_RATE  fraction of slow statements that get a plan (ANALYZE runs the query again)
+#   SLOW_QUERY_EXPLAIN_INTERVAL_S   at most one plan per statement per interval
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", "logs/slow_queries.log")
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "0") == "1"
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "1"))
+SLOW_QUERY_EXPLAIN_INTERVAL_S = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_S", "300"))
+
+SLOW_QUERY_S = SLOW_QUERY_MS / 1000
+
+logger = logging.getLogger("learnova.slow_queries")
+logger.propagate = False
+
+# plans print the bound values as literals ('o@x.io'::text) -> masked like the params
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+# statements containing any of these are never EXPLAIN ANALYZEd (data-modifying CTEs, FOR UPDATE locks)
+_WRITE_KEYWORD = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+_setup_lock = threading.Lock()
+_explain_lock = threading.Lock()
+_last_explain: dict[str, float] = {}
+
+_stats_lock = threading.Lock()
+_stats = {"slow": 0, "explained": 0, "explain_errors": 0}
+
+
+def _logger() -> logging.Logger:
+    # the file is opened on the first slow statement, not at import (scripts, alembic, ...)
+    if not logger.handlers:
+        with _setup_lock:
+            if not logger.handlers:
+                directory = os.path.dirname(SLOW_QUERY_LOG_FILE)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                handler = RotatingFileHandler(
+                    SLOW_QUERY_LOG_FILE,
+                    maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+                    backupCount=SLOW_QUERY_LOG_BACKUPS,
+                    encoding="utf-8",
+                )
+                handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                logger.addHandler(handler)
+                logger.setLevel(logging.INFO)
+    return logger
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def _shape(value) -> str:
+    # type + size only: parameters are emails, password hashes, tokens...
+    if value is None:
+        return "null"
+    if isinstance(value, (str, bytes, list, tuple, dict, set)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def parameter_shapes(parameters, executemany: bool) -> str:
+    if executemany and parameters:
+        return f"{len(parameters)} x {parameter_shapes(parameters[0], False)}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {_shape(value)}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(_shape(value) for value in parameters) + ")"
+    return _shape(parameters)
+
+
+def _caller() -> str:
+    # statements outside run() (workers, scripts): first app frame that isn't the DB layer
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.") and not module.startswith("app.db."):
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def _should_explain(statement: str) -> bool:
+    if not SLOW_QUERY_EXPLAIN or random.random() >= SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+        return False
+    now = time.monotonic()
+    with _explain_lock:
+        if now - _last_explain.get(statement, float("-inf")) < SLOW_QUERY_EXPLAIN_INTERVAL_S:
+            return False
+        if len(_last_explain) > 10_000:  # ad-hoc statements must not grow this forever
+            _last_explain.clear()
+        _last_explain[statement] = now
+    return True
+
+
+def _explain(conn, statement: str, parameters) -> str:
+    # only plain SELECTs are executed again (ANALYZE); anything that can write - including a WITH whose
+    # CTE inserts / updates, or SELECT ... FOR UPDATE - gets the plan alone, its side effects must not repeat
+    is_read = statement.lstrip()[:6].upper() == "SELECT" and not _WRITE_KEYWORD.search(statement)
+    prefix = "EXPLAIN (ANALYZE, BUFFERS) " if is_read else "EXPLAIN "
+
+    # savepoint around it, always rolled back: a failing EXPLAIN must not abort the caller's
+    # transaction, and whatever it did (locks aside) is undone
+    conn.info["explaining"] = True
+    try:
+        conn.exec_driver_sql("SAVEPOINT slow_query_explain")
+        try:
+            rows = conn.exec_driver_sql(prefix + statement, parameters).all()
+        finally:
+            conn.exec_driver_sql("ROLLBACK TO SAVEPOINT slow_query_explain")
+            conn.exec_driver_sql("RELEASE SAVEPOINT slow_query_explain")
+    finally:
+        conn.info.pop("explaining", None)
+    return "\n".join(_STRING_LITERAL.sub("'?'", row[0]) for row in rows)
+
+
+def log_slow_statement(
+    conn, statement: str, parameters, executemany: bool, seconds: float, *, error: BaseException | None = None
+) -> None:
+    """
+    Called by the engine listeners in app.db.session for statements over SLOW_QUERY_MS
+    (`error`: the statement failed, e.g. cancelled by statement_timeout).
+    """
+    if conn.info.get("explaining"):
+        return
+    _count("slow")
+
+    call = current_call()
+    name, caller = call if call is not None else ("-", _caller())
+
+    lines = [
+        f"slow query {seconds * 1000:.1f} ms [{name}] {caller}" + (f" FAILED {type(error).__name__}" if error else ""),
+        f"  params: {parameter_shapes(parameters, executemany)}",
+        "  sql: " + " ".join(statement.split()),
+    ]
+
+    # a failed statement aborted the transaction: nothing more can run on it
+    if error is None and not executemany and _should_explain(statement):
+        try:
+            plan = _explain(conn, statement, parameters)
+            _count("explained")
+            lines.append("  plan:")
+            lines.extend(f"    {line}" for line in plan.splitlines())
+        except Exception as e:
+            _count("explain_errors")
+            lines.append(f"  plan: unavailable ({type(e).__name__}: {e})")
+
+    _logger().info("\n".join(lines))
+
+
+def get_slow_query_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats.update(threshold_ms=SLOW_QUERY_MS, explain=SLOW_QUERY_EXPLAIN, log_file=SLOW_QUERY_LOG_FILE)
+    return stats
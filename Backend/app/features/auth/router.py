@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 
-from app.db.session import get_db
+from app.db.session import get_async_db
+from app.db.replicas import get_read_db
 from app.core.deps import get_current_user
+from app.core.rate_limit import rate_limit
 
 from .schemas import RegisterRequest
 from .schemas import LoginRequest
@@ -16,27 +18,38 @@ from . import service
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-@router.post("/register", status_code=201)
-def register(payload: RegisterRequest, db: Session = Depends(get_db)):
-    return service.register_user(payload, db)
+@router.post(
+    "/register",
+    status_code=201,
+    dependencies=[Depends(rate_limit("register", per_ip="RATE_LIMIT_REGISTER_PER_IP", per_email="RATE_LIMIT_REGISTER_PER_EMAIL"))],
+)
+async def register(payload: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
+    return await service.register_user(payload, db)
 
 @router.get("/verify-email")
-def verify_email(token: str = Query(...), db: Session = Depends(get_db)):
-    return service.verify_email_token(token, db)
+async def verify_email(token: str = Query(...), db: AsyncSession = Depends(get_async_db)):
+    return await service.verify_email_token(token, db)
 
-@router.post("/login")
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
-    return service.login_user(payload, db)
+@router.post(
+    "/login",
+    dependencies=[Depends(rate_limit("login", per_ip="RATE_LIMIT_LOGIN_PER_IP", per_email="RATE_LIMIT_LOGIN_PER_EMAIL"))],
+)
+async def login(payload: LoginRequest, db: AsyncSession = Depends(get_read_db)):
+    return await service.login_user(payload, db)
 
 @router.get("/me")
-def me(user = Depends(get_current_user)):
+async def me(user = Depends(get_current_user)):
     return {"user": user}
 
-@router.post("/forgot-password", response_model=ForgetPasswordResponse)
-def forget_password(payload:ForgetPasswordRequest, db: Session = Depends(get_db)):
-    return service.forget_password_request(payload, db)
+@router.post(
+    "/forgot-password",
+    response_model=ForgetPasswordResponse,
+    dependencies=[Depends(rate_limit("forgot_password", per_ip="RATE_LIMIT_FORGOT_PER_IP", per_email="RATE_LIMIT_FORGOT_PER_EMAIL"))],
+)
+async def forget_password(payload:ForgetPasswordRequest, db: AsyncSession = Depends(get_async_db)):
+    return await service.forget_password_request(payload, db)
 
 @router.post("/reset-password", response_model=ResetPasswordResponse)
-def reset_password(payload: ResetPasswordRequest, db: Session = Depends(get_db)):
-    return service.reset_password(payload, db)
+async def reset_password(payload: ResetPasswordRequest, db: AsyncSession = Depends(get_async_db)):
+    return await service.reset_password(payload, db)
 
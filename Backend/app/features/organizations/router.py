@@ -1,7 +1,11 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
+from app.db.session import get_async_db
+from app.db.replicas import get_read_db
 from app.core.deps import get_current_user
 
 from .schemas import CreateOrganizationRequest
@@ -9,41 +13,93 @@ from .schemas import CreateOrganizationResponse
 from .schemas import JoinRequestsResponse
 from .schemas import UpdateMemberStatusRequest
 from .schemas import UpdateMemberStatusResponse
+from .schemas import BulkUpdateMemberStatusRequest
+from .schemas import BulkUpdateMemberStatusResponse
+from .schemas import JoinOrganizationRequest
+from .schemas import JoinOrganizationResponse
+from .schemas import RotateInviteCodeResponse
 from . import service
 
 router = APIRouter(prefix="/organizations", tags=["Organizations"])
 
 
 @router.post("", response_model=CreateOrganizationResponse, status_code=201)
-def create_organization(
+async def create_organization(
     payload: CreateOrganizationRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_user),):
+    return await service.create_organization(payload, db, current_user)
+
+@router.post("/join", response_model=JoinOrganizationResponse)
+async def join_organization(
+    payload: JoinOrganizationRequest,
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(get_current_user),):
-    return service.create_organization(payload, db, current_user)
+    return await service.join_organization(
+        invite_code=payload.invite_code,
+        db=db,
+        current_user=current_user,)
+
+@router.post("/{organization_id}/invite-code/rotate", response_model=RotateInviteCodeResponse)
+async def rotate_invite_code(
+    organization_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_user),):
+    return await service.rotate_invite_code(
+        organization_id=organization_id,
+        db=db,
+        current_user=current_user,)
 
 @router.get("/{organization_id}/join-requests", response_model=JoinRequestsResponse)
-def list_join_requests(
+async def list_join_requests(
     organization_id: int,
     view: str = Query("pending", pattern="^(pending|accepted)$"),
-    db: Session = Depends(get_db),
+    limit: Optional[int] = Query(None, ge=1, le=service.JOIN_REQUESTS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, max_length=64),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_read_db),
     current_user=Depends(get_current_user),):
-    return service.list_join_requests(
+    # ndjson: every row (from cursor on) streamed line by line, total in X-Total-Count
+    if format == "ndjson":
+        total, lines = await service.stream_join_requests(
+            organization_id=organization_id,
+            view=view,
+            db=db,
+            current_user=current_user,
+            cursor=cursor,)
+        return StreamingResponse(lines, media_type="application/x-ndjson", headers={"X-Total-Count": str(total)})
+
+    return await service.list_join_requests(
         organization_id=organization_id,
         view=view,
         db=db,
-        current_user=current_user,)
+        current_user=current_user,
+        limit=limit,
+        cursor=cursor,)
 
 @router.patch("/{organization_id}/members/{org_member_id}/status", response_model=UpdateMemberStatusResponse)
-def update_member_status(
+async def update_member_status(
     organization_id: int,
     org_member_id: int,
     payload: UpdateMemberStatusRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(get_current_user),):
-    return service.update_member_status(
+    return await service.update_member_status(
         organization_id=organization_id,
         org_member_id=org_member_id,
         new_status=payload.new_status,
         db=db,
         current_user=current_user,)
 
+@router.patch("/{organization_id}/members/status", response_model=BulkUpdateMemberStatusResponse)
+async def bulk_update_member_status(
+    organization_id: int,
+    payload: BulkUpdateMemberStatusRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user=Depends(get_current_user),):
+    return await service.bulk_update_member_status(
+        organization_id=organization_id,
+        org_member_ids=payload.org_member_ids,
+        new_status=payload.new_status,
+        db=db,
+        current_user=current_user,)
@@ -32,8 +32,9 @@ class JoinRequestUser(BaseModel):
     status: str
 
 class JoinRequestsResponse(BaseModel):
-    count: int
+    count: int  # all matching members, not just this page
     users: List[JoinRequestUser]
+    next_cursor: Optional[str] = None  # ?cursor= of the next page, None on the last one
 
 
 
@@ -47,4 +48,36 @@ class UpdateMemberStatusResponse(BaseModel):
     user_id: int
     organization_id: int
     old_status: MembershipStatus
-    new_status: MembershipStatus
\ No newline at end of file
+    new_status: MembershipStatus
+
+
+class BulkUpdateMemberStatusRequest(BaseModel):
+    org_member_ids: List[int] = Field(min_length=1, max_length=500)
+    new_status: MembershipStatus
+
+class BulkMemberStatusResult(BaseModel):
+    org_member_id: int
+    outcome: Literal["updated", "unchanged", "invalid_transition", "not_found"]
+    user_id: Optional[int] = None
+    old_status: Optional[str] = None
+
+class BulkUpdateMemberStatusResponse(BaseModel):
+    organization_id: int
+    new_status: MembershipStatus
+    updated: int
+    results: List[BulkMemberStatusResult]
+
+
+class JoinOrganizationRequest(BaseModel):
+    invite_code: str = Field(min_length=1, max_length=100)
+
+class JoinOrganizationResponse(BaseModel):
+    organization_id: int
+    organization_name: str
+    org_member_id: int
+    status: str
+    created: bool  # False: the user had already joined (status tells where it stands)
+
+class RotateInviteCodeResponse(BaseModel):
+    organization_id: int
+    invite_code: str
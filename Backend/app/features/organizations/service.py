@@ -1,11 +1,207 @@
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple, AsyncIterator
+import base64
+import json
+import os
 import secrets
 
-from app.core.emailer import send_email
+from app.core.email_outbox import enqueue_email, enqueue_emails
+from app.core.email_templates import render_email
+from app.core.invite_cache import get_invite, invalidate_invite, set_invite
+from app.core.org_acl import get_org_access, invalidate_org_access
+from app.db.queries import query, run, stream
+
+
+# GET /organizations/{id}/join-requests
+#   JOIN_REQUESTS_PAGE_SIZE       page size when the client sends ?cursor= without ?limit=
+#                                 (neither of them: the whole list, as before pagination existed)
+#   JOIN_REQUESTS_MAX_PAGE_SIZE   largest ?limit= accepted (bigger lists: next_cursor or ?format=ndjson)
+#   JOIN_REQUESTS_STREAM_BATCH    rows fetched per round trip by the server-side cursor of ?format=ndjson
+JOIN_REQUESTS_PAGE_SIZE = int(os.getenv("JOIN_REQUESTS_PAGE_SIZE", "100"))
+JOIN_REQUESTS_MAX_PAGE_SIZE = int(os.getenv("JOIN_REQUESTS_MAX_PAGE_SIZE", "500"))
+JOIN_REQUESTS_STREAM_BATCH = int(os.getenv("JOIN_REQUESTS_STREAM_BATCH", "500"))
+
+
+# subscription_plan_id is not sent: the column has DEFAULT 1 (model: server_default="1")
+# invite_code collisions are left to the unique constraint: no row back -> new code, try again
+_INSERT_ORG = query(
+    "orgs.insert",
+    """
+    INSERT INTO organizations
+    (name, description, logo_url, owner_id, invite_code, subscription_status, created_at, updated_at)
+    VALUES
+    (:name, :desc, :logo, :owner_id, :invite_code, 'active', NOW(), NOW())
+    ON CONFLICT (invite_code) DO NOTHING
+    RETURNING
+    id, name, description, logo_url, owner_id, subscription_plan_id, invite_code, subscription_status
+    """,
+)
+
+# keyset pagination: (user_id, membership id) of the last row of the previous page; ids start at 1,
+# so (0, 0) is the first page. ix_organization_members_org_user (organization_id, user_id, id)
+# INCLUDE (status) serves both the ordered walk and the count without touching the heap.
+_JOIN_REQUESTS_SQL = """
+    SELECT
+        u.id,
+        u.full_name,
+        u.email,
+        u.avatar_url,
+        u.system_role,
+        om.status,
+        om.id
+    FROM organization_members om
+    JOIN users u ON u.id = om.user_id
+    WHERE om.organization_id = :org_id
+      AND om.status = ANY(:statuses)
+      AND (om.user_id, om.id) > (:after_user, :after_member)
+    ORDER BY om.user_id ASC, om.id ASC
+"""
+
+_JOIN_REQUESTS = query("orgs.join_requests", _JOIN_REQUESTS_SQL + " LIMIT :limit", prepare=True)
+
+_JOIN_REQUESTS_STREAM = query("orgs.join_requests_stream", _JOIN_REQUESTS_SQL)
+
+_JOIN_REQUESTS_COUNT = query(
+    "orgs.join_requests_count",
+    """
+    SELECT count(*)
+    FROM organization_members
+    WHERE organization_id = :org_id
+      AND status = ANY(:statuses)
+    """,
+    prepare=True,
+)
+
+_MEMBER_WITH_USER = query(
+    "orgs.member_with_user",
+    """
+    SELECT
+        om.id,
+        om.organization_id,
+        om.user_id,
+        om.status,
+        u.email,
+        u.full_name
+    FROM organization_members om
+    JOIN users u ON u.id = om.user_id
+    WHERE om.id = :om_id
+    """,
+)
+
+_ACCEPT_MEMBER = query(
+    "orgs.accept_member",
+    """
+    UPDATE organization_members
+    SET status = :new_status,
+        joined_at = COALESCE(joined_at, NOW())
+    WHERE id = :om_id
+    """,
+)
+
+_SET_MEMBER_STATUS = query(
+    "orgs.set_member_status",
+    """
+    UPDATE organization_members
+    SET status = :new_status
+    WHERE id = :om_id
+    """,
+)
+
+
+# membership status machine, shared by the single and the bulk update
+_ALLOWED_TRANSITIONS = {
+    "pending": {"accepted", "declinate"},
+    "accepted": {"suspended"},
+    "suspended": {"accepted"},
+    "declinate": set(),
+}
+
+# bulk status update in one statement: lock the requested rows of this organization, update the ones
+# whose current status may move to :new_status, and report every locked row (+ email / name of the updated)
+_BULK_SET_MEMBER_STATUS = query(
+    "orgs.bulk_set_member_status",
+    """
+    WITH target AS (
+        SELECT om.id, om.user_id, lower(btrim(om.status)) AS old_status
+        FROM organization_members om
+        WHERE om.id = ANY(:om_ids)
+          AND om.organization_id = :org_id
+        FOR UPDATE
+    ),
+    updated AS (
+        UPDATE organization_members om
+        SET status = :new_status,
+            joined_at = CASE
+                WHEN :accepting AND t.old_status = 'pending' THEN COALESCE(om.joined_at, NOW())
+                ELSE om.joined_at
+            END
+        FROM target t
+        WHERE om.id = t.id
+          AND t.old_status = ANY(:from_statuses)
+        RETURNING om.id
+    )
+    SELECT t.id, t.old_status, t.user_id, up.id IS NOT NULL, u.email, u.full_name
+    FROM target t
+    LEFT JOIN updated up ON up.id = t.id
+    LEFT JOIN users u ON u.id = t.user_id AND up.id IS NOT NULL
+    """,
+)
+
+
+_ORG_BY_INVITE_CODE = query(
+    "orgs.by_invite_code",
+    "SELECT id, name FROM organizations WHERE invite_code = :code",
+    prepare=True,
+)
+
+# idempotent join: a second request (double tap, retry) finds the existing membership instead of
+# adding a duplicate (unique organization_id + user_id); created tells the two apart
+_JOIN_ORG = query(
+    "orgs.join",
+    """
+    WITH ins AS (
+        INSERT INTO organization_members (organization_id, user_id, role, status, invited_at)
+        VALUES (:org_id, :user_id, :role, 'pending', NOW())
+        ON CONFLICT (organization_id, user_id) DO NOTHING
+        RETURNING id, status
+    )
+    SELECT id, status, true FROM ins
+    UNION ALL
+    SELECT id, status, false
+    FROM organization_members
+    WHERE organization_id = :org_id
+      AND user_id = :user_id
+      AND NOT EXISTS (SELECT 1 FROM ins)
+    """,
+    prepare=True,
+)
+
+_MEMBERSHIP = query(
+    "orgs.membership",
+    "SELECT id, status, false FROM organization_members WHERE organization_id = :org_id AND user_id = :user_id",
+)
+
+# old code from the locked row, new one from RETURNING (a collision raises: unique constraint)
+_ROTATE_INVITE_CODE = query(
+    "orgs.rotate_invite_code",
+    """
+    WITH old AS (
+        SELECT id, invite_code
+        FROM organizations
+        WHERE id = :org_id AND owner_id = :owner_id
+        FOR UPDATE
+    )
+    UPDATE organizations o
+    SET invite_code = :invite_code,
+        updated_at = NOW()
+    FROM old
+    WHERE o.id = old.id
+    RETURNING old.invite_code, o.invite_code
+    """,
+)
 
 
 def _generate_invite_code() -> str:
@@ -13,7 +209,7 @@ def _generate_invite_code() -> str:
     return secrets.token_hex(3)  # 6 chars تقريبًا
 
 
-def create_organization(payload, db: Session, current_user):
+async def create_organization(payload, db: AsyncSession, current_user):
     # 1) السماح للـ owner فقط
     if current_user.get("system_role") != "owner":
         raise HTTPException(status_code=403, detail="Only owners can create organizations")
@@ -22,50 +218,40 @@ def create_organization(payload, db: Session, current_user):
     if owner_id is None:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    # 2) توليد invite_code (مع إعادة المحاولة لو حصل collision)
-    invite_code = _generate_invite_code()
-    for _ in range(5):
-        exists = db.execute(
-            text("SELECT 1 FROM organizations WHERE invite_code = :code"),
-            {"code": invite_code},
-        ).first()
-        if not exists:
-            break
-        invite_code = _generate_invite_code()
-    else:
-        raise HTTPException(status_code=500, detail="Failed to generate invite code")
-
-    # 3) Insert organization
+    # 2) Insert organization
     # ✅ IMPORTANT:
     # لا نرسل subscription_plan_id هنا.
     # لأن DB عندك واضع DEFAULT 1 (كما في model: server_default="1")
+    # invite_code: الـ unique constraint هو اللي بيكشف الـ collision (ON CONFLICT) -> كود جديد ونعيد
+    row = None
     try:
-        row = db.execute(
-            text("""
-                INSERT INTO organizations
-                (name, description, logo_url, owner_id, invite_code, subscription_status, created_at, updated_at)
-                VALUES
-                (:name, :desc, :logo, :owner_id, :invite_code, 'active', NOW(), NOW())
-                RETURNING
-                id, name, description, logo_url, owner_id, subscription_plan_id, invite_code, subscription_status
-            """),
-            {
-                "name": payload.name,
-                "desc": payload.description,
-                "logo": payload.logo_url,
-                "owner_id": owner_id,
-                "invite_code": invite_code,
-            },
-        ).first()
+        for _ in range(5):
+            result = await run(
+                db,
+                _INSERT_ORG,
+                {
+                    "name": payload.name,
+                    "desc": payload.description,
+                    "logo": payload.logo_url,
+                    "owner_id": owner_id,
+                    "invite_code": _generate_invite_code(),
+                },
+            )
+            row = result.first()
+            if row:
+                break
 
-        db.commit()
+        await db.commit()
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"DB error: {str(e)}")
 
     if not row:
-        raise HTTPException(status_code=400, detail="something went wrong")
+        raise HTTPException(status_code=500, detail="Failed to generate invite code")
+
+    # an earlier "no such organization" for this id must not outlive its creation
+    invalidate_org_access(owner_id, row[0])
 
     return {
         "organization": {
@@ -81,15 +267,140 @@ def create_organization(payload, db: Session, current_user):
     }
 
 
-def list_join_requests(*, organization_id: int, view: str, db: Session, current_user) -> Dict[str, Any]:
-    """
-    Returns join requests for a given organization owned by the current owner.
+async def _resolve_invite_code(code: str, db: AsyncSession):
+    cached = get_invite(code)
+    if cached is not None:
+        return cached
 
-    view:
-      - "pending"  -> status IN ("pending")
-      - "accepted" -> status IN ("accepted", "suspended")
+    row = (await run(db, _ORG_BY_INVITE_CODE, {"code": code})).first()
+    if not row:
+        return None
+    set_invite(code, row[0], row[1])
+    return row[0], row[1]
+
+
+async def join_organization(*, invite_code: str, db: AsyncSession, current_user) -> Dict[str, Any]:
+    """
+    Student side of the invite code: creates a pending membership (the owner reviews it in join-requests).
+    Joining again returns the existing membership, whatever its status.
     """
 
+    # 1) Owners manage organizations, they don't join them
+    if current_user.get("system_role") == "owner":
+        raise HTTPException(status_code=403, detail="Owners cannot join organizations")
+
+    user_id = current_user.get("id")
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    # 2) Resolve the code (per-worker cache, DB on a miss)
+    code = (invite_code or "").strip()
+    org = await _resolve_invite_code(code, db)
+    if org is None:
+        raise HTTPException(status_code=404, detail="Invalid invite code")
+    org_id, org_name = org
+
+    # 3) Insert the pending membership (or find the existing one)
+    params = {"org_id": org_id, "user_id": user_id, "role": current_user.get("system_role") or "student"}
+    try:
+        row = (await run(db, _JOIN_ORG, params)).first()
+        if not row:
+            # a concurrent join of the same user committed after this statement's snapshot
+            row = (await run(db, _MEMBERSHIP, params)).first()
+        await db.commit()
+    except IntegrityError:
+        # cached code of an organization deleted since (FK)
+        await db.rollback()
+        invalidate_invite(code)
+        raise HTTPException(status_code=404, detail="Invalid invite code")
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"DB error: {str(e)}")
+
+    if not row:
+        raise HTTPException(status_code=500, detail="something went wrong")
+
+    if row[2]:
+        invalidate_org_access(user_id, org_id)
+
+    return {
+        "organization_id": org_id,
+        "organization_name": org_name,
+        "org_member_id": row[0],
+        "status": row[1],
+        "created": row[2],
+    }
+
+
+async def rotate_invite_code(*, organization_id: int, db: AsyncSession, current_user) -> Dict[str, Any]:
+    # 1) Owner-only
+    if current_user.get("system_role") != "owner":
+        raise HTTPException(status_code=403, detail="Only owners can rotate invite codes")
+
+    owner_id = current_user.get("id")
+    if owner_id is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    # 2) Update (ownership checked by the statement itself), new code on a collision
+    row = None
+    for _ in range(5):
+        try:
+            result = await run(
+                db,
+                _ROTATE_INVITE_CODE,
+                {"org_id": organization_id, "owner_id": owner_id, "invite_code": _generate_invite_code()},
+            )
+            row = result.first()
+            await db.commit()
+            break
+        except IntegrityError:
+            await db.rollback()
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=f"DB error: {str(e)}")
+    else:
+        raise HTTPException(status_code=500, detail="Failed to generate invite code")
+
+    if not row:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    # 3) The old code stops working on this worker now, on the others within INVITE_CACHE_TTL_S
+    old_code, new_code = row
+    invalidate_invite(old_code)
+
+    return {"organization_id": organization_id, "invite_code": new_code}
+
+
+def _encode_cursor(user_id: int, member_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{user_id}:{member_id}".encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str | None) -> tuple[int, int]:
+    if not cursor:
+        return 0, 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        user_id, member_id = (int(part) for part in raw.split(":"))
+    except ValueError:  # bad base64 / utf-8 / numbers all end up here
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return user_id, member_id
+
+
+def _join_request_user(r) -> Dict[str, Any]:
+    return {
+        "id": r[0],
+        "org_member_id": r[6],
+        "full_name": r[1],
+        "email": r[2],
+        "avatar_url": r[3],
+        "system_role": r[4],
+        "status": r[5],
+    }
+
+
+async def _join_request_scope(*, organization_id: int, view: str, db: AsyncSession, current_user) -> Dict[str, Any]:
+    """Owner + ownership checks shared by the listing and the stream -> params of the join-request queries."""
+
     # 1) Owner-only
     if current_user.get("system_role") != "owner":
         raise HTTPException(status_code=403, detail="Only owners can view join requests")
@@ -105,61 +416,106 @@ def list_join_requests(*, organization_id: int, view: str, db: Session, current_
 
     statuses = ("pending",) if view == "pending" else ("accepted", "suspended")
 
-    # 3) Ownership check
-    org_exists = db.execute(
-        text("""
-            SELECT 1
-            FROM organizations
-            WHERE id = :org_id AND owner_id = :owner_id
-        """),
-        {"org_id": organization_id, "owner_id": owner_id},
-    ).first()
-
-    if not org_exists:
+    # 3) Ownership check (ACL cache)
+    access = await get_org_access(db, owner_id, organization_id)
+
+    if not access.is_owner:
         raise HTTPException(status_code=403, detail="Access denied")
 
-    # 4) Fetch users
-    rows = db.execute(
-        text("""
-            SELECT
-                u.id,
-                u.full_name,
-                u.email,
-                u.avatar_url,
-                u.system_role,
-                om.status,
-                om.id
-            FROM organization_members om
-            JOIN users u ON u.id = om.user_id
-            WHERE om.organization_id = :org_id
-              AND om.status = ANY(:statuses)
-            ORDER BY u.id ASC
-        """),
-        {"org_id": organization_id, "statuses": list(statuses)},
-    ).all()
-
-    users: List[Dict[str, Any]] = [
-        {
-            "id": r[0],
-            "org_member_id": r[6],
-            "full_name": r[1],
-            "email": r[2],
-            "avatar_url": r[3],
-            "system_role": r[4],
-            "status": r[5],
-        }
-        for r in rows
-    ]
+    return {"org_id": organization_id, "statuses": list(statuses)}
+
+
+async def list_join_requests(
+    *,
+    organization_id: int,
+    view: str,
+    db: AsyncSession,
+    current_user,
+    limit: int | None = None,
+    cursor: str | None = None,) -> Dict[str, Any]:
+    """
+    Returns the join requests for a given organization owned by the current owner:
+    one page when the client sends limit and/or cursor, otherwise every row (older clients
+    don't paginate and expect the full list).
+
+    view:
+      - "pending"  -> status IN ("pending")
+      - "accepted" -> status IN ("accepted", "suspended")
+
+    count is the total over all pages; next_cursor (None on the last page) fetches the next one.
+    """
+    params = await _join_request_scope(organization_id=organization_id, view=view, db=db, current_user=current_user)
+    after_user, after_member = _decode_cursor(cursor)
+
+    # 4) Count (index only)
+    total = (await run(db, _JOIN_REQUESTS_COUNT, params)).scalar_one()
+
+    # no paging asked for -> the whole list
+    if limit is None and cursor is None:
+        result = await run(db, _JOIN_REQUESTS_STREAM, {**params, "after_user": 0, "after_member": 0})
+        users = [_join_request_user(r) for r in result.all()]
+        return {"count": total, "users": users, "next_cursor": None}
+
+    limit = min(limit or JOIN_REQUESTS_PAGE_SIZE, JOIN_REQUESTS_MAX_PAGE_SIZE)
+
+    # 5) Fetch one page (+1 row to know whether there is a next one)
+    result = await run(
+        db,
+        _JOIN_REQUESTS,
+        {**params, "after_user": after_user, "after_member": after_member, "limit": limit + 1},
+    )
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1][0], rows[-1][6])
+
+    users: List[Dict[str, Any]] = [_join_request_user(r) for r in rows]
+
+    return {"count": total, "users": users, "next_cursor": next_cursor}
+
+
+async def stream_join_requests(
+    *,
+    organization_id: int,
+    view: str,
+    db: AsyncSession,
+    current_user,
+    cursor: str | None = None,) -> Tuple[int, AsyncIterator[bytes]]:
+    """
+    Same rows as list_join_requests, all of them (from `cursor` on), as NDJSON: one user object per line.
+    Checks run before anything is sent; the rows come from a server-side cursor while the client reads,
+    so memory stays flat whatever the organization's size (the DB connection is held until the end).
+    """
+    params = await _join_request_scope(organization_id=organization_id, view=view, db=db, current_user=current_user)
+    after_user, after_member = _decode_cursor(cursor)
+
+    total = (await run(db, _JOIN_REQUESTS_COUNT, params)).scalar_one()
+
+    result = await stream(
+        db,
+        _JOIN_REQUESTS_STREAM,
+        {**params, "after_user": after_user, "after_member": after_member},
+        batch=JOIN_REQUESTS_STREAM_BATCH,
+    )
 
-    return {"count": len(users), "users": users}
+    async def lines() -> AsyncIterator[bytes]:
+        try:
+            async for rows in result.partitions():
+                yield "".join(json.dumps(_join_request_user(r)) + "\n" for r in rows).encode()
+        finally:
+            await result.close()
 
+    return total, lines()
 
-def update_member_status(
+
+async def update_member_status(
     *,
     organization_id: int,
     org_member_id: int,
     new_status: str,
-    db: Session,
+    db: AsyncSession,
     current_user,):
     
     # 1) Owner-only
@@ -175,34 +531,14 @@ def update_member_status(
     if new_status not in allowed_statuses:
         raise HTTPException(status_code=400, detail="Invalid status")
 
-    # 2) Verify organization ownership
-    org_ok = db.execute(
-        text("""
-            SELECT 1
-            FROM organizations
-            WHERE id = :org_id AND owner_id = :owner_id
-        """),
-        {"org_id": organization_id, "owner_id": owner_id},
-    ).first()
-    if not org_ok:
+    # 2) Verify organization ownership (ACL cache)
+    access = await get_org_access(db, owner_id, organization_id)
+    if not access.is_owner:
         raise HTTPException(status_code=403, detail="Access denied")
 
     # 3) Load membership row + user info
-    row = db.execute(
-        text("""
-            SELECT
-                om.id,
-                om.organization_id,
-                om.user_id,
-                om.status,
-                u.email,
-                u.full_name
-            FROM organization_members om
-            JOIN users u ON u.id = om.user_id
-            WHERE om.id = :om_id
-        """),
-        {"om_id": org_member_id},
-    ).first()
+    result = await run(db, _MEMBER_WITH_USER, {"om_id": org_member_id})
+    row = result.first()
 
     if not row:
         raise HTTPException(status_code=404, detail="Member not found")
@@ -215,12 +551,7 @@ def update_member_status(
     old_status = (old_status or "").strip().lower()
 
     # 4) Transition rules
-    allowed_transitions = {
-        "pending": {"accepted", "declinate"},
-        "accepted": {"suspended"},
-        "suspended": {"accepted"},
-        "declinate": set(),
-    }
+    allowed_transitions = _ALLOWED_TRANSITIONS
 
     if old_status not in allowed_transitions:
         raise HTTPException(status_code=500, detail="Invalid stored status")
@@ -243,186 +574,33 @@ def update_member_status(
     # 5) Update status (+ joined_at لو أول مرة accepted من pending)
     try:
         if old_status == "pending" and new_status == "accepted":
-            db.execute(
-                text("""
-                    UPDATE organization_members
-                    SET status = :new_status,
-                        joined_at = COALESCE(joined_at, NOW())
-                    WHERE id = :om_id
-                """),
-                {"new_status": new_status, "om_id": om_id},
-            )
+            await run(db, _ACCEPT_MEMBER, {"new_status": new_status, "om_id": om_id})
         else:
-            db.execute(
-                text("""
-                    UPDATE organization_members
-                    SET status = :new_status
-                    WHERE id = :om_id
-                """),
-                {"new_status": new_status, "om_id": om_id},
-            )
-
-        db.commit()
+            await run(db, _SET_MEMBER_STATUS, {"new_status": new_status, "om_id": om_id})
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"DB error: {str(e)}")
 
-    # 6) Send email
+    # 6) Queue email (committed together with the status change)
     subject = "Learnova – Membership update"
 
-    logo_url = ""  # حط لينك اللوجو هنا
-    brand_year = 2026
-    support_email = "support@learnova.com"
-
-    text_body = f"""
-    Hello {user_full_name},
-
-    Your membership status has been updated to: {new_status}
-
-    If you have any questions, contact us at {support_email}.
-    """
-
-    html_body = f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <body style="margin:0;padding:0;background:#f6f7fb;font-family:Arial,sans-serif;">
-    <!-- Preheader (hidden) -->
-    <div style="display:none;max-height:0;overflow:hidden;opacity:0;color:transparent;">
-        Your Learnova membership status was updated.
-    </div>
-
-    <table width="100%" cellpadding="0" cellspacing="0" style="background:#f6f7fb;">
-        <tr>
-        <td align="center" style="padding:28px 16px;">
-
-            <!-- Outer container -->
-            <table width="560" cellpadding="0" cellspacing="0" style="width:560px;max-width:560px;">
-
-            <!-- Brand header -->
-            <tr>
-                <td align="left" style="padding:0 8px 14px;">
-                <table cellpadding="0" cellspacing="0">
-                    <tr>
-                    <td style="vertical-align:middle;">
-                        <img src="{logo_url}" width="40" height="40" alt="Learnova"
-                        style="display:block;border:0;outline:none;border-radius:10px;" />
-                    </td>
-                    <td style="vertical-align:middle;padding-left:10px;">
-                        <div style="font-size:16px;font-weight:800;color:#111827;line-height:1;">
-                        Learnova
-                        </div>
-                        <div style="font-size:12px;color:#6b7280;margin-top:2px;">
-                        Membership Update
-                        </div>
-                    </td>
-                    </tr>
-                </table>
-                </td>
-            </tr>
-
-            <!-- Card -->
-            <tr>
-                <td style="background:#ffffff;border:1px solid #e5e7eb;border-radius:16px;overflow:hidden;">
-                <!-- Top accent -->
-                <div style="height:6px;background:#137FEC;"></div>
-
-                <table width="100%" cellpadding="0" cellspacing="0">
-                    <tr>
-                    <td style="padding:26px 26px 10px;">
-                        <h2 style="margin:0;color:#111827;font-size:22px;line-height:1.25;">
-                        Membership Updated ✅
-                        </h2>
-
-                        <p style="margin:10px 0 0;color:#374151;line-height:1.7;font-size:14px;">
-                        Hello <strong>{user_full_name}</strong>, your membership status has been updated.
-                        </p>
-
-                        <!-- Status box -->
-                        <table cellpadding="0" cellspacing="0" style="margin-top:16px;width:100%;">
-                        <tr>
-                            <td style="background:#F9FAFB;border:1px solid #E5E7EB;border-radius:12px;padding:14px 14px;">
-                            <div style="font-size:12px;color:#6b7280;">New status</div>
-                            <div style="margin-top:6px;font-size:16px;font-weight:800;color:#111827;">
-                                {new_status}
-                            </div>
-                            </td>
-                        </tr>
-                        </table>
-
-                        <!-- Info chips -->
-                        <table cellpadding="0" cellspacing="0" style="margin-top:16px;">
-                        <tr>
-                            <td style="background:#EAF3FF;border:1px solid #BBD9FF;border-radius:999px;padding:6px 10px;">
-                            <span style="font-size:12px;color:#1F4B99;">
-                                ℹ️ Membership notification
-                            </span>
-                            </td>
-                            <td style="width:10px;"></td>
-                            <td style="background:#F3F4F6;border:1px solid #E5E7EB;border-radius:999px;padding:6px 10px;">
-                            <span style="font-size:12px;color:#374151;">
-                                🛟 Support available
-                            </span>
-                            </td>
-                        </tr>
-                        </table>
-
-                    </td>
-                    </tr>
-
-                    <!-- Divider -->
-                    <tr>
-                    <td style="padding:0 26px;">
-                        <div style="height:1px;background:#E5E7EB;"></div>
-                    </td>
-                    </tr>
-
-                    <!-- Footer note -->
-                    <tr>
-                    <td style="padding:14px 26px 24px;">
-                        <p style="margin:0;color:#6b7280;font-size:12px;line-height:1.6;">
-                        If you have questions about this change, contact us at
-                        <a href="mailto:{support_email}" style="color:#137FEC;text-decoration:none;">{support_email}</a>.
-                        </p>
-                        <p style="margin:12px 0 0;color:#9ca3af;font-size:12px;line-height:1.6;">
-                        This is an automated email, please do not reply.
-                        </p>
-                    </td>
-                    </tr>
-
-                </table>
-                </td>
-            </tr>
-
-            <!-- Footer -->
-            <tr>
-                <td align="center" style="padding:14px 10px 0;">
-                <p style="margin:0;color:#9ca3af;font-size:12px;line-height:1.6;">
-                    © {brand_year} Learnova. All rights reserved.
-                </p>
-                <p style="margin:6px 0 0;color:#9ca3af;font-size:12px;line-height:1.6;">
-                    Need help? Contact us at
-                    <a href="mailto:{support_email}" style="color:#137FEC;text-decoration:none;">{support_email}</a>
-                </p>
-                </td>
-            </tr>
-
-            </table>
-        </td>
-        </tr>
-    </table>
-    </body>
-    </html>
-    """
+    text_body, html_body = render_email("membership_update", full_name=user_full_name, new_status=new_status)
 
     try:
-        send_email(
+        await enqueue_email(
+            db,
             to=user_email,
             subject=subject,
             body=text_body,
             html=html_body,
         )
-    except Exception:
-        pass
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"DB error: {str(e)}")
+
+    # 7) The member's cached permissions changed with the status
+    invalidate_org_access(user_id, om_org_id)
 
     return {
         "org_member_id": om_id,
@@ -431,3 +609,98 @@ def update_member_status(
         "old_status": old_status,
         "new_status": new_status,
     }
+
+
+async def bulk_update_member_status(
+    *,
+    organization_id: int,
+    org_member_ids: List[int],
+    new_status: str,
+    db: AsyncSession,
+    current_user,) -> Dict[str, Any]:
+    """
+    update_member_status for many members of one organization: same rules, one UPDATE, one commit,
+    one batch of queued emails. Every requested id gets an outcome:
+      updated | unchanged (already new_status) | invalid_transition | not_found (not a member of this org)
+    """
+
+    # 1) Owner-only
+    if current_user.get("system_role") != "owner":
+        raise HTTPException(status_code=403, detail="Only owners can update member status")
+
+    owner_id = current_user.get("id")
+    if owner_id is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    new_status = (new_status or "").strip().lower()
+    if new_status not in _ALLOWED_TRANSITIONS:
+        raise HTTPException(status_code=400, detail="Invalid status")
+
+    # 2) Verify organization ownership (ACL cache)
+    access = await get_org_access(db, owner_id, organization_id)
+    if not access.is_owner:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    # 3) Set-based update (ids de-duplicated, request order kept for the report)
+    om_ids = list(dict.fromkeys(org_member_ids))
+    from_statuses = [old for old, targets in _ALLOWED_TRANSITIONS.items() if new_status in targets]
+
+    try:
+        result = await run(
+            db,
+            _BULK_SET_MEMBER_STATUS,
+            {
+                "om_ids": om_ids,
+                "org_id": organization_id,
+                "new_status": new_status,
+                "accepting": new_status == "accepted",
+                "from_statuses": from_statuses,
+            },
+        )
+        rows = {r[0]: r for r in result.all()}
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"DB error: {str(e)}")
+
+    results: List[Dict[str, Any]] = []
+    emails: List[Dict[str, Any]] = []
+    updated_users: List[int] = []
+    subject = "Learnova – Membership update"
+
+    for om_id in om_ids:
+        row = rows.get(om_id)
+        if row is None:
+            results.append({"org_member_id": om_id, "outcome": "not_found"})
+            continue
+
+        _, old_status, user_id, was_updated, user_email, user_full_name = row
+        if was_updated:
+            outcome = "updated"
+            updated_users.append(user_id)
+            text_body, html_body = render_email("membership_update", full_name=user_full_name, new_status=new_status)
+            emails.append({"to": user_email, "subject": subject, "body": text_body, "html": html_body})
+        elif old_status == new_status:
+            outcome = "unchanged"
+        else:
+            outcome = "invalid_transition"
+
+        results.append({"org_member_id": om_id, "outcome": outcome, "user_id": user_id, "old_status": old_status})
+
+    # 4) Queue emails (committed together with the status changes)
+    try:
+        await enqueue_emails(db, emails)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"DB error: {str(e)}")
+
+    # 5) Cached permissions of the updated members
+    for user_id in updated_users:
+        invalidate_org_access(user_id, organization_id)
+
+    return {
+        "organization_id": organization_id,
+        "new_status": new_status,
+        "updated": len(emails),
+        "results": results,
+    }
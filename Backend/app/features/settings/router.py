@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.deps import get_current_user
-from app.db.session import get_db
+from app.db.session import get_async_db, statement_timeout
 
 from .schemas import UpdateProfileRequest
 from .schemas import UpdateProfileResponse
@@ -20,42 +20,43 @@ router = APIRouter(prefix="/settings", tags=["settings"])
 
 
 @router.patch("/profile", response_model=UpdateProfileResponse)
-def update_profile(
+async def update_profile(
     payload: UpdateProfileRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(get_current_user),):
-    return service.update_profile(
+    return await service.update_profile(
         payload=payload, 
         db=db, 
         current_user=current_user)
 
 @router.patch("/password", response_model=ChangePasswordResponse)
-def change_password(
+async def change_password(
     payload: ChangePasswordRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(get_current_user),):
-    return service.change_password(
+    return await service.change_password(
         payload=payload, 
         db=db, 
         current_user=current_user)
 
 @router.post("/delete/request", response_model=RequestDeleteAccountResponse)
-def request_delete_account(
+async def request_delete_account(
     payload: RequestDeleteAccountRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(get_current_user),):
-    return service.request_delete_account(
+    return await service.request_delete_account(
         payload=payload, 
         db=db, 
         current_user=current_user)
 
 
 @router.delete("/delete/confirm", response_model=ConfirmDeleteAccountResponse)
-def confirm_delete_account(
+@statement_timeout(30_000)  # the user delete cascades over all their data
+async def confirm_delete_account(
     payload: ConfirmDeleteAccountRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(get_current_user),):
-    return service.confirm_delete_account(
+    return await service.confirm_delete_account(
         payload=payload, 
         db=db, 
         current_user=current_user)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from typing import Optional
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 
 
 class UpdateProfileRequest(BaseModel):
@@ -25,7 +25,9 @@ class ChangePasswordRequest(BaseModel):
 
 class ChangePasswordResponse(BaseModel):
     message: str
-    email_notification_sent: bool
+    email_queued: bool
+    # old name kept for existing clients (same value: the email is queued, not sent yet)
+    email_notification_sent: bool = Field(deprecated="use email_queued")
 
 
 
@@ -34,7 +36,9 @@ class RequestDeleteAccountRequest(BaseModel):
 
 class RequestDeleteAccountResponse(BaseModel):
     message: str
-    email_sent: bool
+    email_queued: bool
+    # old name kept for existing clients (same value: the email is queued, not sent yet)
+    email_sent: bool = Field(deprecated="use email_queued")
 
 
 
@@ -1,27 +1,78 @@
 from fastapi import HTTPException
 
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 import secrets
 import os
 
-from datetime import datetime, timezone, timedelta
+from datetime import timedelta
 
 from .schemas import UpdateProfileRequest
 
-from app.core.security import hash_password
-from app.core.security import verify_password  # عدّل import حسب مكانهم عندك
-from app.core.emailer import send_email 
+from app.core.hash_pool import pooled_hash_password
+from app.core.hash_pool import pooled_verify_password
+from app.core.email_outbox import enqueue_email
+from app.core.email_templates import render_email
+from app.core.auth_cache import invalidate_user
+from app.core.token_store import consume_token, issue_user_token
+from app.db.queries import query, run
 
 # DELETE_OTP_TTL_MINUTES = 10
 # DELETE_OTP_TYPE = "delete_account_otp"
 
 
+# NULL = keep the current value, so one statement covers every combination of fields
+_UPDATE_PROFILE = query(
+    "settings.update_profile",
+    """
+    UPDATE users
+    SET full_name = COALESCE(:full_name, full_name),
+        avatar_url = COALESCE(:avatar_url, avatar_url),
+        updated_at = NOW()
+    WHERE id = :uid
+    RETURNING id, full_name, email, avatar_url, system_role
+    """,
+)
+
+_USER_CREDENTIALS = query(
+    "settings.user_credentials",
+    """
+    SELECT id, full_name, email, hashed_password
+    FROM users
+    WHERE id = :uid
+    LIMIT 1
+    """,
+)
+
+_SET_PASSWORD = query(
+    "settings.set_password",
+    """
+    UPDATE users
+    SET hashed_password = :hp,
+        updated_at = NOW(),
+        token_version = token_version + 1
+    WHERE id = :uid
+    """,
+)
+
+_REVOKE_TOKENS = query(
+    "settings.revoke_tokens",
+    """
+    UPDATE user_tokens
+    SET used_at = NOW()
+    WHERE user_id = :uid
+      AND type = :type
+      AND used_at IS NULL
+    """,
+)
+
+_DELETE_USER = query("settings.delete_user", "DELETE FROM users WHERE id = :uid")
+
+
 def _generate_otp() -> str:
     return secrets.token_hex(3)
 
-def update_profile(*, payload: UpdateProfileRequest, db: Session, current_user):
+async def update_profile(*, payload: UpdateProfileRequest, db: AsyncSession, current_user):
     user_id = current_user.get("id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -40,34 +91,23 @@ def update_profile(*, payload: UpdateProfileRequest, db: Session, current_user):
         # مفيش حاجة تتعمل
         raise HTTPException(status_code=400, detail="No updatable fields provided")
 
-    # Build dynamic SQL safely (only whitelisted columns)
-    set_clauses = []
-    params = {"uid": user_id}
-
-    if "full_name" in update_fields:
-        set_clauses.append("full_name = :full_name")
-        params["full_name"] = update_fields["full_name"]
-
-    if "avatar_url" in update_fields:
-        set_clauses.append("avatar_url = :avatar_url")
-        params["avatar_url"] = update_fields["avatar_url"]
-
-    set_clauses.append("updated_at = NOW()")
-
-    row = db.execute(
-        text(f"""
-            UPDATE users
-            SET {", ".join(set_clauses)}
-            WHERE id = :uid
-            RETURNING id, full_name, email, avatar_url, system_role
-        """),
-        params,
-    ).first()
+    # fields not provided stay NULL -> COALESCE keeps the stored value
+    result = await run(
+        db,
+        _UPDATE_PROFILE,
+        {
+            "uid": user_id,
+            "full_name": update_fields.get("full_name"),
+            "avatar_url": update_fields.get("avatar_url"),
+        },
+    )
+    row = result.first()
 
     if not row:
         raise HTTPException(status_code=404, detail="User not found")
 
-    db.commit()
+    await db.commit()
+    invalidate_user(user_id)
 
     return {
         "id": row[0],
@@ -78,7 +118,7 @@ def update_profile(*, payload: UpdateProfileRequest, db: Session, current_user):
     }
 
 
-def change_password(*, payload, db: Session, current_user):
+async def change_password(*, payload, db: AsyncSession, current_user):
     user_id = current_user.get("id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -91,15 +131,8 @@ def change_password(*, payload, db: Session, current_user):
         raise HTTPException(status_code=400, detail="New password must be different")
 
     # 2) load user hashed password + email/name (نحتاجهم للتحقق + الإيميل)
-    row = db.execute(
-        text("""
-            SELECT id, full_name, email, hashed_password
-            FROM users
-            WHERE id = :uid
-            LIMIT 1
-        """),
-        {"uid": user_id},
-    ).first()
+    result = await run(db, _USER_CREDENTIALS, {"uid": user_id})
+    row = result.first()
 
     if not row:
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -107,163 +140,95 @@ def change_password(*, payload, db: Session, current_user):
     _, full_name, email, hashed_pw = row
 
     # 3) verify current password
-    if not verify_password(payload.current_password, hashed_pw):
+    if not await pooled_verify_password(payload.current_password, hashed_pw):
         raise HTTPException(status_code=401, detail="Invalid current password")
 
     # 4) update password + bump token_version
-    new_hashed = hash_password(payload.new_password)
-
-    db.execute(
-        text("""
-            UPDATE users
-            SET hashed_password = :hp,
-                updated_at = NOW(),
-                token_version = token_version + 1
-            WHERE id = :uid
-        """),
-        {"hp": new_hashed, "uid": user_id},
-    )
+    new_hashed = await pooled_hash_password(payload.new_password)
+
+    await run(db, _SET_PASSWORD, {"hp": new_hashed, "uid": user_id})
 
     # 5) invalidate any previous reset_password tokens (زي forget-password)
-    db.execute(
-        text("""
-            UPDATE user_tokens
-            SET used_at = NOW()
-            WHERE user_id = :uid
-              AND type = 'reset_password'
-              AND used_at IS NULL
-        """),
-        {"uid": user_id},
-    )
+    await run(db, _REVOKE_TOKENS, {"uid": user_id, "type": "reset_password"})
 
     # 6) create a new reset token for "If this wasn't you" link
-    reset_token = secrets.token_urlsafe(32)
-    expires_at = datetime.now(timezone.utc) + timedelta(minutes=15)
-
-    db.execute(
-        text("""
-            INSERT INTO user_tokens (user_id, type, token, expires_at, created_at)
-            VALUES (:uid, 'reset_password', :token, :expires_at, NOW())
-        """),
-        {"uid": user_id, "token": reset_token, "expires_at": expires_at},
+    reset_token = await issue_user_token(
+        db,
+        user_id=user_id,
+        token_type="reset_password",
+        ttl=timedelta(minutes=15),
     )
 
-    db.commit()
-
-    # 7) send notification email (best-effort)
+    # 7) queue notification email (committed with the password change)
     frontend_url = os.getenv("FRONTEND_BASE_URL", "http://localhost:5173")
     reset_link = f"{frontend_url.rstrip('/')}/#/reset-password?token={reset_token}"
 
     subject = "Learnova – Password changed"
-    text_body = f"""
-        Hello {full_name or ''}
-
-        Your Learnova password was just changed.
-
-        If this wasn't you, secure your account immediately by setting a new password using this link:
-        {reset_link}
-
-        This link expires in 15 minutes.
-        """
+    text_body, _ = render_email("password_changed", full_name=full_name, reset_link=reset_link)
+
+    await enqueue_email(
+        db,
+        to=email,
+        subject=subject,
+        body=text_body,
+        html=None,
+    )
 
-    sent = False
-    try:
-        send_email(
-            to=email,
-            subject=subject,
-            body=text_body,
-            html=None,
-        )
-        sent = True
-    except Exception:
-        pass
+    await db.commit()
+    invalidate_user(user_id)
 
     return {
         "message": "Password updated successfully",
-        "email_notification_sent": sent,
+        "email_queued": True,
+        "email_notification_sent": True,
     }
 
 
-def request_delete_account(*, payload, db: Session, current_user):
+async def request_delete_account(*, payload, db: AsyncSession, current_user):
     user_id = current_user.get("id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
 
     # 1) load user credentials
-    row = db.execute(
-        text("""
-            SELECT id, full_name, email, hashed_password, is_email_verified
-            FROM users
-            WHERE id = :uid
-            LIMIT 1
-             """),
-        {"uid": user_id},
-    ).first()
+    result = await run(db, _USER_CREDENTIALS, {"uid": user_id})
+    row = result.first()
 
     if not row:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    _, full_name, email, hashed_pw, _ = row
+    _, full_name, email, hashed_pw = row
 
     # 2) verify current password
-    if not payload.current_password or not verify_password(payload.current_password, hashed_pw):
+    if not payload.current_password or not await pooled_verify_password(payload.current_password, hashed_pw):
         raise HTTPException(status_code=401, detail="Invalid current password")
 
     # 3) invalidate any previous delete OTPs (prevent multiple valid OTPs)
-    db.execute(
-        text("""
-            UPDATE user_tokens
-            SET used_at = NOW()
-            WHERE user_id = :uid
-              AND type = :type
-              AND used_at IS NULL
-             """),
-        {"uid": user_id, "type": "delete_account_otp"},
-    )
+    await run(db, _REVOKE_TOKENS, {"uid": user_id, "type": "delete_account_otp"})
 
     # 4) create OTP token
-    otp = _generate_otp()
-    expires_at = datetime.now(timezone.utc) + timedelta(minutes=10)
-
-    db.execute(
-        text("""
-            INSERT INTO user_tokens (user_id, type, token, expires_at, created_at)
-            VALUES (:uid, :type, :token, :expires_at, NOW())
-        """),
-        {"uid": user_id, "type": "delete_account_otp", "token": otp, "expires_at": expires_at},
+    otp = await issue_user_token(
+        db,
+        user_id=user_id,
+        token_type="delete_account_otp",
+        ttl=timedelta(minutes=10),
+        token=_generate_otp(),
     )
 
-    db.commit()
-
-    # 5) send OTP email (best-effort)
+    # 5) queue OTP email (committed with the OTP row)
     subject = "Learnova – Confirm account deletion (OTP)"
-    text_body = f"""
-                Hello {full_name or ""}
-
-                You requested to delete your Learnova account.
+    text_body, _ = render_email("delete_account_otp", full_name=full_name, otp=otp, ttl_minutes=10)
 
-                Your OTP code is:
-                {otp}
-
-                This code expires in {10} minutes.
-
-                If you didn't request this, you can ignore this email.
-                """
-
-    sent = False
-    try:
-        send_email(to=email, subject=subject, body=text_body, html=None)
-        sent = True
-    except Exception:
-        pass
+    await enqueue_email(db, to=email, subject=subject, body=text_body, html=None)
+    await db.commit()
 
     return {
         "message": "Deletion OTP sent to your email.",
-        "email_sent": sent,
+        "email_queued": True,
+        "email_sent": True,
     }
 
 
-def confirm_delete_account(*, payload, db: Session, current_user):
+async def confirm_delete_account(*, payload, db: AsyncSession, current_user):
     user_id = current_user.get("id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -276,51 +241,19 @@ def confirm_delete_account(*, payload, db: Session, current_user):
     if not ( len(otp) == 6): # otp.isdigit() and
         raise HTTPException(status_code=400, detail="Invalid OTP format")
 
-    # 1) find token row for this user + otp
-    row = db.execute(
-        text("""
-            SELECT id, expires_at, used_at
-            FROM user_tokens
-            WHERE user_id = :uid
-              AND type = :type
-              AND token = :token
-            LIMIT 1
-        """),
-        {"uid": user_id, "type": "delete_account_otp", "token": otp},
-    ).first()
-
-    if not row:
-        raise HTTPException(status_code=400, detail="Invalid or expired OTP")
-
-    token_id, expires_at, used_at = row
-
-    # 2) used?
-    if used_at is not None:
-        raise HTTPException(status_code=400, detail="Invalid or expired OTP")
-
-    # 3) expired?
-    now = datetime.now(timezone.utc)
-    if expires_at <= now:
-        # mark used to close it (same style as your reset_password)
-        db.execute(
-            text("UPDATE user_tokens SET used_at = NOW() WHERE id = :tid"),
-            {"tid": token_id},
-        )
-        db.commit()
-        raise HTTPException(status_code=400, detail="Invalid or expired OTP")
-
-    # 4) mark OTP used FIRST (your requirement for history correctness)
-    db.execute(
-        text("UPDATE user_tokens SET used_at = NOW() WHERE id = :tid"),
-        {"tid": token_id},
+    # 1) validate + mark the OTP used in one statement (your requirement for history correctness)
+    await consume_token(
+        db,
+        token=otp,
+        token_type="delete_account_otp",
+        user_id=user_id,
+        detail="Invalid or expired OTP",
     )
 
-    # 5) delete user (CASCADE will remove dependent rows where configured)
-    db.execute(
-        text("DELETE FROM users WHERE id = :uid"),
-        {"uid": user_id},
-    )
+    # 2) delete user (CASCADE will remove dependent rows where configured)
+    await run(db, _DELETE_USER, {"uid": user_id})
 
-    db.commit()
+    await db.commit()
+    invalidate_user(user_id)
 
     return {"message": "Account deleted successfully"}
\ No newline at end of file
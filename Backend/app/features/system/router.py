@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import PlainTextResponse
+
+from app.core.deps import require_ops_token
+
+from .schemas import ArmProfilingRequest
+
+from . import service
+
+router = APIRouter(prefix="/system", tags=["system"], dependencies=[Depends(require_ops_token)])
+
+# Prometheus scrapes /metrics at the root (same X-Ops-Token guard)
+metrics_router = APIRouter(tags=["system"], dependencies=[Depends(require_ops_token)])
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(service.metrics_text(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/stats/hash-pool")
+def hash_pool_stats():
+    return service.hash_pool_stats()
+
+
+@router.get("/stats/caches")
+def cache_stats():
+    return service.cache_stats()
+
+
+@router.get("/stats/rate-limit")
+def rate_limit_stats():
+    return service.rate_limit_stats()
+
+
+@router.get("/stats/db-pool")
+def db_pool_stats():
+    return service.db_pool_stats()
+
+
+@router.get("/stats/replicas")
+def replica_stats():
+    return service.replica_stats()
+
+
+@router.get("/stats/queries")
+def query_stats():
+    return service.query_stats()
+
+
+@router.get("/profiling")
+def profiling_state():
+    return service.profiling_state()
+
+
+@router.post("/profiling/arm")
+def arm_profiling(payload: ArmProfilingRequest, request: Request):
+    return service.arm_profiling(payload, request.app)
+
+
+@router.delete("/profiling/arm")
+def disarm_profiling():
+    return service.disarm_profiling()
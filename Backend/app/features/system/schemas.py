@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+
+
+class ArmProfilingRequest(BaseModel):
+    method: str = "GET"
+    route: str  # route template, e.g. /organizations/{organization_id}/members/{org_member_id}/status
+    count: int = Field(default=1, ge=1, le=100)
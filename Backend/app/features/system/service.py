@@ -0,0 +1,76 @@
+from fastapi import HTTPException
+
+from app.core.hash_pool import get_hash_pool_stats
+from app.core.auth_cache import get_auth_cache_stats
+from app.core.invite_cache import get_invite_cache_stats
+from app.core.org_acl import get_org_acl_cache_stats
+from app.core.jwt import get_jwt_cache_stats
+from app.core.rate_limit import get_rate_limit_stats
+from app.core.metrics import render_metrics
+from app.core import profiling
+from app.db.session import get_db_pool_stats
+from app.db.replicas import get_replica_stats
+from app.db.queries import DB_PREPARE_THRESHOLD, get_query_stats
+from app.db.slow_queries import get_slow_query_stats
+
+
+def hash_pool_stats():
+    return {"hash_pool": get_hash_pool_stats()}
+
+
+def cache_stats():
+    return {
+        "auth_state": get_auth_cache_stats(),
+        "jwt_claims": get_jwt_cache_stats(),
+        "invite_codes": get_invite_cache_stats(),
+        "org_acl": get_org_acl_cache_stats(),
+    }
+
+
+def rate_limit_stats():
+    return {"rate_limit": get_rate_limit_stats()}
+
+
+def db_pool_stats():
+    return {"db_pool": get_db_pool_stats()}
+
+
+def replica_stats():
+    return {"replicas": get_replica_stats()}
+
+
+def query_stats():
+    return {
+        "prepare_threshold": DB_PREPARE_THRESHOLD,
+        "slow_queries": get_slow_query_stats(),
+        "queries": get_query_stats(),
+    }
+
+
+def metrics_text():
+    return render_metrics()
+
+
+def profiling_state():
+    return {"profiling": profiling.get_profiling_state()}
+
+
+def arm_profiling(payload, app):
+    if not profiling.PROFILING_ENABLED:
+        raise HTTPException(status_code=400, detail="Profiling is disabled (PROFILING_ENABLED=0)")
+
+    method = payload.method.strip().upper()
+    known = any(
+        getattr(route, "path", None) == payload.route and method in (getattr(route, "methods", None) or ())
+        for route in app.routes
+    )
+    if not known:
+        raise HTTPException(status_code=404, detail="Unknown route")
+
+    profiling.arm(method, payload.route, payload.count)
+    return {"profiling": profiling.get_profiling_state()}
+
+
+def disarm_profiling():
+    profiling.disarm_all()
+    return {"profiling": profiling.get_profiling_state()}
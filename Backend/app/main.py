@@ -1,13 +1,24 @@
 from fastapi import FastAPI
+from dotenv import load_dotenv
+
+# load env before importing modules that read settings at import time
+load_dotenv("env.env")
 
 from app.features.auth.router import router as auth_router
 from app.features.organizations.router import router as organizations_router
 from app.features.settings.router import router as settings_router
+from app.features.system.router import router as system_router
+from app.features.system.router import metrics_router
+from app.core.hash_pool import shutdown_hash_pool
+from app.core.email_templates import warm_email_templates
+from app.core.metrics import MetricsMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.db.session import ReadYourWritesMiddleware, db_overload_exception_handler, dispose_async_engine
+from app.db.replicas import dispose_replica_engines
 
-from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
+from sqlalchemy import exc as sa_exc
 
-load_dotenv("env.env")
+from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI()
 origins = [
@@ -23,7 +34,22 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Last-Write"],
 )
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(ProfilingMiddleware)
+# added last = outermost: its timings include CORS and the exception handlers
+app.add_middleware(MetricsMiddleware)
 app.include_router(auth_router)
 app.include_router(organizations_router)
-app.include_router(settings_router)
\ No newline at end of file
+app.include_router(settings_router)
+app.include_router(system_router)
+app.include_router(metrics_router)
+
+app.add_exception_handler(sa_exc.TimeoutError, db_overload_exception_handler)
+app.add_exception_handler(sa_exc.OperationalError, db_overload_exception_handler)
+
+app.add_event_handler("startup", warm_email_templates)
+app.add_event_handler("shutdown", shutdown_hash_pool)
+app.add_event_handler("shutdown", dispose_async_engine)
+app.add_event_handler("shutdown", dispose_replica_engines)
@@ -21,3 +21,4 @@ from .weak_point import WeakPoint
 from .ai_chat_history import AIChatHistory
 from .analytics import Analytics
 
+from .email_outbox import EmailOutbox
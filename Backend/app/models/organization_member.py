@@ -1,4 +1,4 @@
-from sqlalchemy import String, DateTime, ForeignKey
+from sqlalchemy import String, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
 
@@ -36,4 +36,18 @@ class OrganizationMember(Base):
     last_active_at: Mapped[datetime | None] = mapped_column(
         DateTime(timezone=True),
         nullable=True
-    )
\ No newline at end of file
+    )
+
+    __table_args__ = (
+        # one membership per user and organization (join by invite code: ON CONFLICT target)
+        UniqueConstraint("organization_id", "user_id", name="uq_organization_members_org_user"),
+        # join-request listings: keyset walk in (user_id, id) order per organization,
+        # status carried in the index so the status filter and the count stay index-only
+        Index(
+            "ix_organization_members_org_user",
+            "organization_id",
+            "user_id",
+            "id",
+            postgresql_include=["status"],
+        ),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import String, DateTime, ForeignKey
+from sqlalchemy import String, DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
 
@@ -16,7 +16,9 @@ class UserToken(Base):
     )
 
     type: Mapped[str] = mapped_column(String(50), nullable=False)
-    token: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
+    # HMAC-SHA256 hex digest of the token (key: TOKEN_HASH_SECRET, see app.core.token_store.hash_token);
+    # the raw token only ever exists in the email/link
+    token_hash: Mapped[str] = mapped_column(String(64), nullable=False)
 
     expires_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
@@ -32,3 +34,11 @@ class UserToken(Base):
         DateTime(timezone=True),
         default=datetime.utcnow
     )
+
+    __table_args__ = (
+        Index("ix_user_tokens_token_hash_type", "token_hash", "type"),
+        # "invalidate previous tokens of this user" only touches unused rows
+        Index("ix_user_tokens_unused", "user_id", "type", postgresql_where=text("used_at IS NULL")),
+        # purge job
+        Index("ix_user_tokens_expires_at", "expires_at"),
+    )
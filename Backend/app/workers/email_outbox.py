@@ -0,0 +1,85 @@
+"""
+Email outbox worker: drains email_outbox and delivers through SMTP with retries/backoff.
+
+    python -m app.workers.email_outbox            # run forever
+    python -m app.workers.email_outbox --once     # drain what is due now and exit
+
+Several workers can run at the same time (rows are claimed with SKIP LOCKED).
+"""
+import argparse
+import logging
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv("env.env")
+
+from app.db.session import SessionLocal  # noqa: E402
+from app.core.emailer import build_message, close_smtp_pool, send_emails  # noqa: E402
+from app.core.email_outbox import claim_batch, mark_failed, mark_sent  # noqa: E402
+
+logger = logging.getLogger("learnova.email_outbox")
+
+
+def drain_once(batch_size: int) -> int:
+    """Send one batch. Returns how many rows were claimed."""
+    db = SessionLocal()
+    try:
+        rows = claim_batch(db, limit=batch_size)
+
+        # 1) build messages (a broken row must not block the rest of the batch)
+        messages, batch = [], []
+        for outbox_id, to_email, subject, body_text, body_html, attempts in rows:
+            try:
+                messages.append(build_message(to_email, subject, body_text, body_html))
+                batch.append((outbox_id, to_email, attempts))
+            except Exception as e:
+                mark_failed(db, outbox_id=outbox_id, attempts=attempts, error=repr(e))
+
+        # 2) send the whole batch over one pooled SMTP session
+        results = send_emails(messages) if messages else []
+
+        sent_ids = []
+        for (outbox_id, to_email, attempts), error in zip(batch, results):
+            if error is None:
+                sent_ids.append(outbox_id)
+                continue
+            logger.warning("email %s to %s failed (attempt %s): %s", outbox_id, to_email, attempts, error)
+            mark_failed(db, outbox_id=outbox_id, attempts=attempts, error=repr(error))
+
+        mark_sent(db, outbox_ids=sent_ids)
+        if rows:
+            logger.info("outbox batch: %s claimed, %s sent", len(rows), len(sent_ids))
+        return len(rows)
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Deliver queued emails from email_outbox")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=2.0, help="idle sleep between polls (seconds)")
+    parser.add_argument("--once", action="store_true", help="drain due emails and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+    try:
+        while True:
+            try:
+                claimed = drain_once(args.batch_size)
+            except Exception:
+                # DB down etc.: keep the worker alive and try again later
+                logger.exception("outbox poll failed")
+                claimed = 0
+
+            if args.once and claimed < args.batch_size:
+                break
+            if claimed < args.batch_size:
+                time.sleep(args.interval)
+    finally:
+        close_smtp_pool()
+
+
+if __name__ == "__main__":
+    main()
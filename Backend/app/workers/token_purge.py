@@ -0,0 +1,53 @@
+"""
+Periodic purge of expired/used one-time tokens (user_tokens), in bounded chunks.
+
+    python -m app.workers.token_purge            # run forever (every --interval seconds)
+    python -m app.workers.token_purge --once     # single pass (e.g. from cron)
+"""
+import argparse
+import logging
+import time
+from datetime import timedelta
+
+from dotenv import load_dotenv
+
+load_dotenv("env.env")
+
+from app.db.session import SessionLocal  # noqa: E402
+from app.core.token_store import purge_expired_tokens  # noqa: E402
+
+logger = logging.getLogger("learnova.token_purge")
+
+
+def purge_once(*, retention_hours: float, batch_size: int) -> int:
+    db = SessionLocal()
+    try:
+        return purge_expired_tokens(db, retention=timedelta(hours=retention_hours), batch_size=batch_size)
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Delete expired user_tokens rows")
+    parser.add_argument("--retention-hours", type=float, default=24.0, help="keep expired rows this long (history)")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--interval", type=float, default=3600.0, help="seconds between passes")
+    parser.add_argument("--once", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+    while True:
+        try:
+            deleted = purge_once(retention_hours=args.retention_hours, batch_size=args.batch_size)
+            logger.info("purged %s expired tokens", deleted)
+        except Exception:
+            logger.exception("token purge failed")
+
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Side-by-side load comparison: sync route (threadpool + Session) vs async route (AsyncSession).
+
+    python -m benchmarks.bench_async
+    python -m benchmarks.bench_async --concurrency 2000 --requests 4000 --idle-ms 200
+
+Both routes run one short query and then wait `--idle-ms` on "something else"
+(an upstream API, a slow client, ...): the sync route blocks its threadpool thread
+while it waits, the async route just awaits. Requests are driven in-process through
+the ASGI app, so the numbers show the worker's concurrency limit, not the network.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=500, help="requests in flight at once")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--idle-ms", type=float, default=500.0, help="non-DB wait per request")
+    return parser.parse_args()
+
+
+ARGS = _parse_args() if __name__ == "__main__" else None
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app.db.session import async_engine, engine, get_async_db, get_db, get_db_pool_stats  # noqa: E402
+
+
+def build_app(idle_s: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/sync")
+    def sync_route(db=Depends(get_db)):
+        db.execute(text("SELECT 1")).scalar()
+        db.close()  # give the connection back before idling, like the async route
+        time.sleep(idle_s)
+        return {"ok": True}
+
+    @app.get("/async")
+    async def async_route(db=Depends(get_async_db)):
+        (await db.execute(text("SELECT 1"))).scalar()
+        await db.close()
+        await asyncio.sleep(idle_s)
+        return {"ok": True}
+
+    return app
+
+
+def _pct(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def _load(app: FastAPI, path: str, *, concurrency: int, total: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    samples: list[float] = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def one():
+            nonlocal errors
+            async with sem:
+                t0 = time.perf_counter()
+                r = await client.get(path)
+                samples.append((time.perf_counter() - t0) * 1000)
+                errors += r.status_code != 200
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(samples),
+        "p99": _pct(samples, 99),
+        "errors": errors,
+    }
+
+
+async def _main(args) -> None:
+    app = build_app(args.idle_ms / 1000)
+    results = {}
+    for path in ("/sync", "/async"):
+        results[path] = await _load(app, path, concurrency=args.concurrency, total=args.requests)
+
+    pools = get_db_pool_stats()
+    await async_engine.dispose()
+    engine.dispose()
+
+    print(f"concurrency {args.concurrency}, {args.requests} requests, {args.idle_ms:.0f} ms idle each")
+    print(f"{'route':8} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for path, r in results.items():
+        print(f"{path:8} {r['rps']:9.1f} {r['p50']:9.1f} {r['p99']:9.1f} {r['errors']:7d}")
+    for kind in ("sync", "async"):
+        wait = pools[kind]
+        print(f"{kind} pool: checkouts={wait.get('checkouts', 0)} max wait={wait.get('wait_seconds_max', 0) * 1000:.1f} ms")
+
+
+def main(args) -> None:
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main(ARGS))
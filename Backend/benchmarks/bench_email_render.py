@@ -0,0 +1,50 @@
+"""
+Email body rendering cost: precompiled Jinja2 templates (render_email) vs
+re-building the markup on every call the way the old f-strings did.
+
+    python -m benchmarks.bench_email_render
+"""
+import time
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from app.core import email_templates
+
+
+def _per_call_us(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1_000_000
+
+
+def main(n: int = 5_000) -> None:
+    link = "http://localhost:5173/#/verify-email?token=" + "x" * 43
+
+    # no cache: a fresh environment per call re-reads and re-compiles the templates
+    def uncached():
+        env = Environment(
+            loader=FileSystemLoader(str(email_templates._TEMPLATES_DIR)),
+            autoescape=select_autoescape(["html"]),
+            cache_size=0,
+        )
+        ctx = {"brand": email_templates._brand(), "verify_link": link}
+        env.get_template("emails/verify_email.txt").render(ctx)
+        env.get_template("emails/verify_email.html").render(ctx)
+
+    compiled = email_templates.warm_email_templates()
+    cached = _per_call_us(lambda: email_templates.render_email("verify_email", verify_link=link), n)
+    recompiled = _per_call_us(uncached, max(1, n // 50))
+
+    members = _per_call_us(
+        lambda: email_templates.render_email("membership_update", full_name="Student", new_status="accepted"), n
+    )
+
+    print(f"templates compiled at startup  : {compiled}")
+    print(f"verify_email (compile per call): {recompiled:9.1f} us")
+    print(f"verify_email (precompiled)     : {cached:9.1f} us")
+    print(f"membership_update (precompiled): {members:9.1f} us  -> {1_000_000 / members:,.0f} renders/sec")
+
+
+if __name__ == "__main__":
+    main()
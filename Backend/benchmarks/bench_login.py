@@ -0,0 +1,144 @@
+"""
+Login latency regression benchmark against a seeded local Postgres.
+
+    python -m benchmarks.bench_login --database-url postgresql+psycopg://postgres@localhost/learnova_bench
+    python -m benchmarks.bench_login --database-url ... --fast-hash   # cheap PBKDF2 -> isolates the DB part
+
+Seeds (idempotently) owners with organizations and students with memberships,
+then calls login_user directly and reports p50/p95/p99 and statements per login.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from benchmarks.target_db import add_database_args, use_database
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--owners", type=int, default=50)
+    parser.add_argument("--orgs-per-owner", type=int, default=3)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--fast-hash", action="store_true", help="use 1000 PBKDF2 iterations")
+    add_database_args(parser)
+    return parser.parse_args()
+
+
+ARGS = _parse_args() if __name__ == "__main__" else None
+if ARGS:
+    use_database(ARGS)
+if ARGS and ARGS.fast_hash:
+    os.environ["PBKDF2_ITERATIONS"] = "1000"
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from sqlalchemy import event, text  # noqa: E402
+
+from app.core.security import hash_password  # noqa: E402
+from app.db.session import AsyncSessionLocal, SessionLocal, async_engine  # noqa: E402
+from app.features.auth.schemas import LoginRequest  # noqa: E402
+from app.features.auth.service import login_user  # noqa: E402
+
+PASSWORD = "bench-password"
+
+
+def seed(db, *, owners: int, orgs_per_owner: int, students: int) -> None:
+    hashed = hash_password(PASSWORD)
+
+    db.execute(text("""
+        INSERT INTO subscription_plans
+        (id, name, description, max_teachers, max_students, max_courses, max_storage_mb,
+         allow_ai_chat, allow_ai_question_gen, allow_video_analysis, allow_advanced_analytics,
+         monthly_credits, price_per_month, is_active, created_at)
+        VALUES (1, 'FREE', 'Free plan', 5, 200, 10, 500, true, false, false, false, 50, 0, true, NOW())
+        ON CONFLICT DO NOTHING
+    """))
+
+    db.execute(
+        text("""
+            INSERT INTO users (full_name, email, hashed_password, system_role, is_email_verified, created_at, updated_at)
+            SELECT 'Bench Owner ' || g, 'bench-owner-' || g || '@learnova.bench', :hp, 'owner', true, NOW(), NOW()
+            FROM generate_series(1, :owners) g
+            ON CONFLICT (email) DO UPDATE SET hashed_password = EXCLUDED.hashed_password
+        """),
+        {"hp": hashed, "owners": owners},
+    )
+    db.execute(
+        text("""
+            INSERT INTO organizations (name, description, owner_id, invite_code, subscription_status, created_at, updated_at)
+            SELECT 'Bench Org ' || u.id || '-' || g, 'bench', u.id, 'bench-' || u.id || '-' || g, 'active', NOW(), NOW()
+            FROM users u, generate_series(1, :per_owner) g
+            WHERE u.email LIKE 'bench-owner-%@learnova.bench'
+            ON CONFLICT (invite_code) DO NOTHING
+        """),
+        {"per_owner": orgs_per_owner},
+    )
+    db.execute(
+        text("""
+            INSERT INTO users (full_name, email, hashed_password, system_role, is_email_verified, created_at, updated_at)
+            SELECT 'Bench Student ' || g, 'bench-student-' || g || '@learnova.bench', :hp, 'student', true, NOW(), NOW()
+            FROM generate_series(1, :students) g
+            ON CONFLICT (email) DO UPDATE SET hashed_password = EXCLUDED.hashed_password
+        """),
+        {"hp": hashed, "students": students},
+    )
+    db.execute(text("""
+        INSERT INTO organization_members (organization_id, user_id, role, status, joined_at)
+        SELECT o.id, s.id, 'student', 'accepted', NOW()
+        FROM users s
+        JOIN LATERAL (
+            SELECT id FROM organizations WHERE invite_code LIKE 'bench-%' ORDER BY id
+            OFFSET (s.id % 10) LIMIT 1
+        ) o ON true
+        WHERE s.email LIKE 'bench-student-%@learnova.bench'
+          AND NOT EXISTS (SELECT 1 FROM organization_members m WHERE m.user_id = s.id)
+    """))
+    db.commit()
+
+
+def _pct(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def _run_logins(args) -> tuple[list[float], int]:
+    statements = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute", lambda *a, **k: statements.append(1))
+
+    emails = [f"bench-owner-{i}@learnova.bench" for i in range(1, args.owners + 1)]
+    emails += [f"bench-student-{i}@learnova.bench" for i in range(1, args.students + 1)]
+
+    samples = []
+    async with AsyncSessionLocal() as db:
+        for i in range(args.iterations):
+            payload = LoginRequest(email=emails[i % len(emails)], password=PASSWORD)
+            t0 = time.perf_counter()
+            await login_user(payload, db)
+            samples.append((time.perf_counter() - t0) * 1000)
+            await db.rollback()
+
+    await async_engine.dispose()
+    return samples, len(statements)
+
+
+def main(args) -> None:
+    db = SessionLocal()
+    try:
+        seed(db, owners=args.owners, orgs_per_owner=args.orgs_per_owner, students=args.students)
+    finally:
+        db.close()
+
+    samples, statements = asyncio.run(_run_logins(args))
+
+    print(f"logins            : {len(samples)}")
+    print(f"statements/login  : {statements / len(samples):.2f}")
+    print(f"p50               : {statistics.median(samples):8.2f} ms")
+    print(f"p95               : {_pct(samples, 95):8.2f} ms")
+    print(f"p99               : {_pct(samples, 99):8.2f} ms")
+
+
+if __name__ == "__main__":
+    sys.exit(main(ARGS))
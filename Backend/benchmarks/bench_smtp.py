@@ -0,0 +1,74 @@
+"""
+SMTP throughput: one connection per message (old send_email) vs pooled sessions vs batch send.
+Runs against an in-process aiosmtpd server, so it measures our client overhead, not Gmail.
+
+    pip install aiosmtpd
+    python -m benchmarks.bench_smtp
+"""
+import os
+import smtplib
+import time
+
+try:
+    from aiosmtpd.controller import Controller
+    from aiosmtpd.handlers import Sink
+except ImportError:  # pragma: no cover
+    raise SystemExit("aiosmtpd is required: pip install aiosmtpd")
+
+PORT = 8026
+
+os.environ.update({
+    "SMTP_HOST": "127.0.0.1",
+    "SMTP_PORT": str(PORT),
+    "SMTP_FROM": "bench@learnova.local",
+    "SMTP_STARTTLS": "0",
+    "SMTP_AUTH": "0",
+})
+
+from app.core import emailer  # noqa: E402
+
+
+def _messages(n: int):
+    return [
+        emailer.build_message(f"user{i}@learnova.local", "Learnova – benchmark", "hello", "<p>hello</p>")
+        for i in range(n)
+    ]
+
+
+def _rate(label: str, n: int, fn) -> None:
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<28}: {n / elapsed:8.1f} msg/s  ({elapsed * 1000 / n:.2f} ms/msg)")
+
+
+def main(n: int = 500) -> None:
+    controller = Controller(Sink(), hostname="127.0.0.1", port=PORT)
+    controller.start()
+    try:
+        msgs = _messages(n)
+
+        def connect_per_message():
+            # what send_email used to do: new session for every message
+            for msg in msgs:
+                with smtplib.SMTP("127.0.0.1", PORT) as smtp:
+                    smtp.send_message(msg)
+
+        def pooled_single_sends():
+            for msg in msgs:
+                emailer.send_emails([msg])
+
+        def pooled_batch():
+            emailer.send_emails(msgs)
+
+        _rate("connect per message", n, connect_per_message)
+        _rate("pooled, one call per msg", n, pooled_single_sends)
+        _rate("pooled, batch", n, pooled_batch)
+        print(f"pool stats                  : {emailer.get_smtp_pool_stats()}")
+    finally:
+        emailer.close_smtp_pool()
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,467 @@
+"""
+Bulk synthetic data generator: streams millions of rows straight into Postgres with COPY.
+
+    python -m benchmarks.datagen --database-url postgresql+psycopg://postgres@localhost/learnova_bench
+    python -m benchmarks.datagen --database-url ... --orgs 2000 --seed 7   # ~10M answers (default ~1M)
+    python -m benchmarks.datagen --database-url ... --org-size lognormal:400:1.2:20000 --ability beta:2:2
+    python -m benchmarks.datagen --database-url ... --purge   # delete everything generated before
+
+The target database is never taken from DATABASE_URL / env.env, and non-local hosts need --force
+(see benchmarks/target_db.py): the generator COPYs, DELETEs and, as superuser, skips FK checks.
+
+Follows app/models: users -> organizations -> organization_members, courses -> topics /
+question_banks -> questions -> question_options, exams -> exam_questions, and
+student_exams -> student_answers (plus the parent tables those foreign keys need).
+
+Distributions are "kind:args" specs:
+    fixed:N                     always N
+    uniform:A:B                 integer in [A, B]
+    lognormal:MEDIAN:SIGMA[:MAX] heavy tailed integer >= 1 (org sizes)
+    beta:A:B                    float in [0, 1] (student ability = probability of a correct answer)
+
+Same --seed -> same data (row contents and relations; ids start at the tables' current sequence values).
+IDs are assigned by the generator and the sequences moved past them afterwards, so run it
+against a database nobody else is writing to. Every generated user can log in with --password.
+"""
+import argparse
+import array
+import itertools
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import psycopg
+
+from benchmarks.target_db import add_database_args, use_database
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orgs", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--org-size", default="lognormal:100:1.0:5000", help="members per organization")
+    parser.add_argument("--pending", type=float, default=0.08, help="fraction of members still pending")
+    parser.add_argument("--suspended", type=float, default=0.02, help="fraction of members suspended")
+    parser.add_argument("--courses", default="uniform:1:5", help="courses per organization")
+    parser.add_argument("--topics", default="uniform:2:6", help="topics per course")
+    parser.add_argument("--questions", default="uniform:20:60", help="questions per course")
+    parser.add_argument("--mcq", type=float, default=0.7, help="share of MCQ questions (4 options)")
+    parser.add_argument("--tf", type=float, default=0.2, help="share of TF questions (rest: SHORT)")
+    parser.add_argument("--exams", default="uniform:1:4", help="exams per course")
+    parser.add_argument("--exam-questions", default="uniform:10:20", help="questions per exam")
+    parser.add_argument("--exams-per-student", default="uniform:0:4", help="exams taken per accepted member")
+    parser.add_argument("--ability", default="beta:5:3", help="per-student probability of a correct answer")
+    parser.add_argument("--password", default="datagen-password", help="password of every generated user")
+    parser.add_argument("--check-fks", action="store_true", help="keep the per-row foreign key checks on")
+    parser.add_argument("--no-analyze", action="store_true", help="skip ANALYZE of the filled tables")
+    parser.add_argument("--purge", action="store_true", help="delete previously generated data and exit")
+    add_database_args(parser)
+    return parser.parse_args()
+
+
+ARGS = _parse_args() if __name__ == "__main__" else None
+if ARGS:
+    use_database(ARGS)
+
+from app.core.security import hash_password  # noqa: E402
+from app.db.session import engine  # noqa: E402
+
+
+GEN_DOMAIN = "@learnova.gen"
+QTYPE_MCQ, QTYPE_TF, QTYPE_SHORT = 0, 1, 2
+_QTYPE_NAMES = ("MCQ", "TF", "SHORT")
+_DIFFICULTIES = ("easy", "medium", "hard")
+_DIFFICULTY_SHIFT = (0.15, 0.0, -0.15)  # added to the student's ability
+ANALYZED_TABLES = (
+    "users", "organizations", "organization_members", "courses", "topics", "question_banks", "questions",
+    "question_options", "exams", "exam_questions", "student_exams", "student_answers",
+)
+
+
+class Dist:
+    """A "kind:args" distribution spec (see the module docstring)."""
+
+    def __init__(self, spec: str):
+        kind, *args = spec.split(":")
+        self.spec = spec
+        self.kind = kind
+        self.args = [float(a) for a in args]
+        expected = {"fixed": (1,), "uniform": (2,), "lognormal": (2, 3), "beta": (2,)}
+        if kind not in expected or len(self.args) not in expected[kind]:
+            raise SystemExit(f"invalid distribution {spec!r}")
+
+    def sample(self, rng: random.Random):
+        a = self.args
+        if self.kind == "fixed":
+            return int(a[0])
+        if self.kind == "uniform":
+            return rng.randint(int(a[0]), int(a[1]))
+        if self.kind == "lognormal":
+            value = max(1, int(rng.lognormvariate(math.log(a[0]), a[1])))
+            return min(value, int(a[2])) if len(a) == 3 else value
+        return rng.betavariate(a[0], a[1])
+
+
+class Plan:
+    """Everything but the per-student rows, built up front (small: organizations, courses, questions, exams)."""
+
+    def __init__(self):
+        self.orgs: list[tuple] = []  # (org_id, owner_id, first_member_id, member_count)
+        self.courses: list[tuple] = []  # (course_id, org_id, owner_id, first_topic_id, topic_count, bank_id)
+        self.org_exams: dict[int, list[int]] = {}  # org_id -> exam ids
+        self.exams: list[tuple] = []  # (exam_id, course_id, owner_id)
+        self.exam_questions: dict[int, list[int]] = {}  # exam_id -> question ids
+        # per question, indexed by question_id - first_question_id
+        self.question_course = array.array("l")
+        self.question_topic = array.array("l")
+        self.question_type = array.array("b")
+        self.question_difficulty = array.array("b")
+        self.question_first_option = array.array("l")  # 0 for SHORT
+        self.question_correct_option = array.array("l")  # 0 for SHORT
+        self.first_question_id = 0
+        self.option_count = 0
+
+
+def _connect_kwargs() -> dict:
+    url = engine.url
+    kwargs = {"dbname": url.database, "user": url.username, "password": url.password,
+              "host": url.host, "port": url.port, **url.query}
+    return {k: v for k, v in kwargs.items() if v is not None}
+
+
+def _skip_fk_triggers(conn) -> bool:
+    # rows reference ids the generator assigned itself, so the per-row FK triggers only cost time
+    # (they are most of the COPY time); needs superuser, otherwise the checks stay on
+    try:
+        conn.execute("SET session_replication_role = replica")
+        return True
+    except psycopg.errors.InsufficientPrivilege:
+        conn.rollback()
+        print("not a superuser: foreign keys are checked row by row (slower)", file=sys.stderr)
+        return False
+
+
+def _next_id(cur, table: str) -> int:
+    cur.execute(f"SELECT nextval(pg_get_serial_sequence('{table}', 'id'))")
+    return cur.fetchone()[0]
+
+
+def _move_sequence(cur, table: str, last_id: int) -> None:
+    cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), GREATEST(%s, 1))", (last_id,))
+
+
+def build_plan(cur, args, rng: random.Random) -> Plan:
+    org_size, courses, topics = Dist(args.org_size), Dist(args.courses), Dist(args.topics)
+    questions, exams, exam_questions = Dist(args.questions), Dist(args.exams), Dist(args.exam_questions)
+    plan = Plan()
+
+    user_id = _next_id(cur, "users")
+    org_id = _next_id(cur, "organizations")
+    course_id = _next_id(cur, "courses")
+    topic_id = _next_id(cur, "topics")
+    bank_id = _next_id(cur, "question_banks")
+    question_id = plan.first_question_id = _next_id(cur, "questions")
+    option_id = _next_id(cur, "question_options")
+    exam_id = _next_id(cur, "exams")
+    plan.first_option_id = option_id
+
+    for _ in range(args.orgs):
+        owner_id, members = user_id, org_size.sample(rng)
+        plan.orgs.append((org_id, owner_id, owner_id + 1, members))
+        user_id += 1 + members
+        plan.org_exams[org_id] = []
+
+        for _ in range(courses.sample(rng)):
+            n_topics = topics.sample(rng)
+            plan.courses.append((course_id, org_id, owner_id, topic_id, n_topics, bank_id))
+
+            course_questions = range(question_id, question_id + questions.sample(rng))
+            for _ in course_questions:
+                roll = rng.random()
+                qtype = QTYPE_MCQ if roll < args.mcq else QTYPE_TF if roll < args.mcq + args.tf else QTYPE_SHORT
+                plan.question_course.append(course_id)
+                plan.question_topic.append(topic_id + rng.randrange(n_topics))
+                plan.question_type.append(qtype)
+                plan.question_difficulty.append(rng.randrange(3))
+                n_options = (4, 2, 0)[qtype]
+                plan.question_first_option.append(option_id if n_options else 0)
+                plan.question_correct_option.append(option_id + rng.randrange(n_options) if n_options else 0)
+                option_id += n_options
+            question_id += len(course_questions)
+
+            for _ in range(exams.sample(rng)):
+                k = min(exam_questions.sample(rng), len(course_questions))
+                plan.exams.append((exam_id, course_id, owner_id))
+                plan.exam_questions[exam_id] = sorted(rng.sample(course_questions, k))
+                plan.org_exams[org_id].append(exam_id)
+                exam_id += 1
+
+            course_id += 1
+            topic_id += n_topics
+            bank_id += 1
+        org_id += 1
+
+    plan.option_count = option_id - plan.first_option_id
+    plan.last_ids = {
+        "users": user_id - 1, "organizations": org_id - 1, "courses": course_id - 1, "topics": topic_id - 1,
+        "question_banks": bank_id - 1, "questions": question_id - 1, "question_options": option_id - 1,
+        "exams": exam_id - 1,
+    }
+    return plan
+
+
+class Stats:
+    def __init__(self):
+        self.rows: dict[str, int] = {}
+        self.seconds: dict[str, float] = {}
+
+    def report(self) -> None:
+        total_rows = sum(self.rows.values())
+        total_s = sum(self.seconds.values())
+        print(f"\n{'table':22} {'rows':>12} {'seconds':>9} {'rows/s':>12}")
+        for table, rows in self.rows.items():
+            s = self.seconds[table]
+            print(f"{table:22} {rows:12,} {s:9.2f} {rows / s if s else 0:12,.0f}")
+        print(f"{'total':22} {total_rows:12,} {total_s:9.2f} {total_rows / total_s if total_s else 0:12,.0f}")
+
+
+def copy_rows(cur, stats: Stats, table: str, columns: str, rows) -> None:
+    t0 = time.perf_counter()
+    count = 0
+    # binary COPY: no text round trip of timestamps / numbers (~3x the rows/s of the text format)
+    names = [c.strip() for c in columns.split(",")]
+    cur.execute(
+        "SELECT column_name, udt_name FROM information_schema.columns WHERE table_name = %s", (table,)
+    )
+    types = dict(cur.fetchall())
+    with cur.copy(f"COPY {table} ({columns}) FROM STDIN (FORMAT BINARY)") as copy:
+        copy.set_types([types[name] for name in names])
+        for row in rows:
+            copy.write_row(row)
+            count += 1
+    stats.rows[table] = stats.rows.get(table, 0) + count
+    stats.seconds[table] = stats.seconds.get(table, 0.0) + time.perf_counter() - t0
+    print(f"  {table:22} {count:12,} rows", file=sys.stderr)
+
+
+def _member_statuses(args, rng: random.Random, first_id: int, count: int):
+    for user_id in range(first_id, first_id + count):
+        roll = rng.random()
+        status = "pending" if roll < args.pending else "suspended" if roll < args.pending + args.suspended else "accepted"
+        yield user_id, status
+
+
+def _student_exams(args, plan: Plan, seed: int):
+    """
+    Yields (student_id, exam_id, answers) for every exam taken; answers are (question_id, option_id, correct).
+    Seeded per organization so organization_members, student_exams and student_answers (separate COPY
+    passes) see the same data.
+    """
+    exams_per_student, ability = Dist(args.exams_per_student), Dist(args.ability)
+    q0 = plan.first_question_id
+    for n, (org_id, _, first_member, members) in enumerate(plan.orgs):
+        rng = random.Random(f"{seed}-exams-{n}")
+        org_exams = plan.org_exams[org_id]
+        statuses = _member_statuses(args, random.Random(f"{seed}-members-{n}"), first_member, members)
+        for user_id, status in statuses:
+            if status != "accepted" or not org_exams:
+                continue
+            skill = ability.sample(rng)
+            taken = exams_per_student.sample(rng)
+            for exam_id in rng.sample(org_exams, min(taken, len(org_exams))):
+                answers = []
+                for question_id in plan.exam_questions[exam_id]:
+                    i = question_id - q0
+                    correct = rng.random() < skill + _DIFFICULTY_SHIFT[plan.question_difficulty[i]]
+                    qtype = plan.question_type[i]
+                    if qtype == QTYPE_SHORT:
+                        option = None
+                    elif correct:
+                        option = plan.question_correct_option[i]
+                    else:
+                        # any option but the correct one
+                        first, n_options = plan.question_first_option[i], 4 if qtype == QTYPE_MCQ else 2
+                        offset = plan.question_correct_option[i] - first
+                        option = first + (offset + 1 + int(rng.random() * (n_options - 1))) % n_options
+                    answers.append((question_id, option, correct))
+                yield user_id, exam_id, answers
+
+
+def _score(answers) -> float | None:
+    return round(100 * sum(a[2] for a in answers) / len(answers), 2) if answers else None
+
+
+def _copy_student_exams(cur, conn, stats: Stats, args, plan: Plan, taken_at) -> None:
+    # student_exams is committed before its answers (FK) -> two passes over the same seeded stream;
+    # explicit ids, a nextval() per row is a good part of the COPY time
+    first_exam = _next_id(cur, "student_exams")
+    copy_rows(cur, stats, "student_exams", "id, student_id, exam_id, score, taken_at",
+              ((first_exam + n, student_id, exam_id, _score(answers), taken_at())
+               for n, (student_id, exam_id, answers) in enumerate(_student_exams(args, plan, args.seed))))
+    _move_sequence(cur, "student_exams", first_exam + stats.rows["student_exams"] - 1)
+    conn.commit()
+
+    first_answer = _next_id(cur, "student_answers")
+    answer_ids = itertools.count(first_answer)
+    copy_rows(cur, stats, "student_answers",
+              "id, student_exam_id, question_id, selected_option, answer_text, is_correct",
+              ((next(answer_ids), first_exam + n, question_id, option,
+                None if option is not None else "generated answer", correct)
+               for n, (_, _, answers) in enumerate(_student_exams(args, plan, args.seed))
+               for question_id, option, correct in answers))
+    _move_sequence(cur, "student_answers", first_answer + stats.rows["student_answers"] - 1)
+    conn.commit()
+
+
+def generate(args) -> None:
+    rng = random.Random(args.seed)
+    stats = Stats()
+    now = datetime.now(timezone.utc)
+    hashed = hash_password(args.password)
+
+    def created(r: random.Random) -> datetime:
+        return now - timedelta(seconds=r.randrange(365 * 24 * 3600))
+
+    # a connection of its own: the session settings below must not go back to the pool
+    conn = psycopg.connect(**_connect_kwargs())
+    try:
+        with conn.cursor() as cur:
+            check_fks = args.check_fks or not _skip_fk_triggers(conn)
+            cur.execute("SET statement_timeout = 0")
+            cur.execute("""
+                INSERT INTO subscription_plans
+                (id, name, description, max_teachers, max_students, max_courses, max_storage_mb,
+                 allow_ai_chat, allow_ai_question_gen, allow_video_analysis, allow_advanced_analytics,
+                 monthly_credits, price_per_month, is_active, created_at)
+                VALUES (1, 'FREE', 'Free plan', 5, 200, 10, 500, true, false, false, false, 50, 0, true, NOW())
+                ON CONFLICT DO NOTHING
+            """)
+            plan = build_plan(cur, args, rng)
+            total_members = sum(org[3] for org in plan.orgs)
+            print(f"plan: {len(plan.orgs):,} orgs, {total_members:,} members, {len(plan.courses):,} courses, "
+                  f"{len(plan.question_type):,} questions, {len(plan.exams):,} exams"
+                  f"{'' if not check_fks else ', foreign keys checked'}", file=sys.stderr)
+
+            def users():
+                r = random.Random(args.seed + 1)
+                for org_id, owner_id, first_member, members in plan.orgs:
+                    ts = created(r)
+                    yield (owner_id, f"Owner {owner_id}", f"gen{owner_id}{GEN_DOMAIN}", hashed, "owner", True, ts, ts, 1)
+                    for user_id in range(first_member, first_member + members):
+                        ts = created(r)
+                        yield (user_id, f"Student {user_id}", f"gen{user_id}{GEN_DOMAIN}", hashed, "student", True, ts, ts, 1)
+
+            copy_rows(cur, stats, "users",
+                      "id, full_name, email, hashed_password, system_role, is_email_verified, created_at, updated_at, token_version",
+                      users())
+
+            copy_rows(cur, stats, "organizations",
+                      "id, name, description, owner_id, subscription_plan_id, invite_code, subscription_status, created_at, updated_at",
+                      ((org_id, f"Generated Org {org_id}", "generated", owner_id, 1, f"gen-{org_id}", "active", now, now)
+                       for org_id, owner_id, _, _ in plan.orgs))
+
+            def members():
+                for n, (org_id, _, first_member, count) in enumerate(plan.orgs):
+                    r = random.Random(f"{args.seed}-members-{n}")  # same stream as _student_exams
+                    for user_id, status in _member_statuses(args, r, first_member, count):
+                        yield (org_id, user_id, "student", status, now, None if status == "pending" else now)
+
+            copy_rows(cur, stats, "organization_members",
+                      "organization_id, user_id, role, status, invited_at, joined_at", members())
+
+            copy_rows(cur, stats, "courses", "id, organization_id, title, description, created_by, created_at",
+                      ((cid, org_id, f"Course {cid}", "generated course", owner, now)
+                       for cid, org_id, owner, _, _, _ in plan.courses))
+            copy_rows(cur, stats, "topics", "id, course_id, title",
+                      ((tid, cid, f"Topic {tid}")
+                       for cid, _, _, first, n, _ in plan.courses for tid in range(first, first + n)))
+            copy_rows(cur, stats, "question_banks", "id, course_id, created_by, created_at",
+                      ((bank, cid, owner, now) for cid, _, owner, _, _, bank in plan.courses))
+
+            bank_of_course = {cid: bank for cid, _, _, _, _, bank in plan.courses}
+            q0 = plan.first_question_id
+            copy_rows(cur, stats, "questions", "id, bank_id, topic_id, question_text, type, difficulty, source",
+                      ((q0 + i, bank_of_course[plan.question_course[i]], plan.question_topic[i],
+                        f"Generated question {q0 + i}?", _QTYPE_NAMES[plan.question_type[i]],
+                        _DIFFICULTIES[plan.question_difficulty[i]], "manual")
+                       for i in range(len(plan.question_type))))
+
+            def options():
+                for i, qtype in enumerate(plan.question_type):
+                    first = plan.question_first_option[i]
+                    correct = plan.question_correct_option[i]
+                    if qtype == QTYPE_MCQ:
+                        for k, oid in enumerate(range(first, first + 4)):
+                            yield (oid, q0 + i, f"Option {'ABCD'[k]}", oid == correct)
+                    elif qtype == QTYPE_TF:
+                        yield (first, q0 + i, "True", first == correct)
+                        yield (first + 1, q0 + i, "False", first + 1 == correct)
+
+            copy_rows(cur, stats, "question_options", "id, question_id, option_text, is_correct", options())
+
+            copy_rows(cur, stats, "exams", "id, course_id, title, created_by, created_at",
+                      ((eid, cid, f"Exam {eid}", owner, now) for eid, cid, owner in plan.exams))
+            copy_rows(cur, stats, "exam_questions", "exam_id, question_id",
+                      ((eid, qid) for eid, qids in plan.exam_questions.items() for qid in qids))
+
+            for table, last_id in plan.last_ids.items():
+                _move_sequence(cur, table, last_id)
+            conn.commit()
+
+            student_exam_rng = random.Random(args.seed + 2)
+            _copy_student_exams(cur, conn, stats, args, plan, lambda: created(student_exam_rng))
+
+            if not args.no_analyze:
+                t0 = time.perf_counter()
+                for table in ANALYZED_TABLES:
+                    cur.execute(f"ANALYZE {table}")
+                conn.commit()
+                print(f"  ANALYZE {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    finally:
+        conn.close()
+
+    stats.report()
+
+
+def purge() -> None:
+    # children first; everything hangs off the generated organizations (invite_code gen-*) and users
+    statements = [
+        "DELETE FROM student_answers WHERE student_exam_id IN (SELECT se.id FROM student_exams se JOIN exams e ON e.id = se.exam_id JOIN courses c ON c.id = e.course_id JOIN organizations o ON o.id = c.organization_id WHERE o.invite_code LIKE 'gen-%')",
+        "DELETE FROM student_exams WHERE exam_id IN (SELECT e.id FROM exams e JOIN courses c ON c.id = e.course_id JOIN organizations o ON o.id = c.organization_id WHERE o.invite_code LIKE 'gen-%')",
+        "DELETE FROM exam_questions WHERE exam_id IN (SELECT e.id FROM exams e JOIN courses c ON c.id = e.course_id JOIN organizations o ON o.id = c.organization_id WHERE o.invite_code LIKE 'gen-%')",
+        "DELETE FROM exams WHERE course_id IN (SELECT c.id FROM courses c JOIN organizations o ON o.id = c.organization_id WHERE o.invite_code LIKE 'gen-%')",
+        "DELETE FROM question_options WHERE question_id IN (SELECT q.id FROM questions q JOIN question_banks b ON b.id = q.bank_id JOIN courses c ON c.id = b.course_id JOIN organizations o ON o.id = c.organization_id WHERE o.invite_code LIKE 'gen-%')",
+        "DELETE FROM questions WHERE bank_id IN (SELECT b.id FROM question_banks b JOIN courses c ON c.id = b.course_id JOIN organizations o ON o.id = c.organization_id WHERE o.invite_code LIKE 'gen-%')",
+        "DELETE FROM question_banks WHERE course_id IN (SELECT c.id FROM courses c JOIN organizations o ON o.id = c.organization_id WHERE o.invite_code LIKE 'gen-%')",
+        "DELETE FROM topics WHERE course_id IN (SELECT c.id FROM courses c JOIN organizations o ON o.id = c.organization_id WHERE o.invite_code LIKE 'gen-%')",
+        "DELETE FROM courses WHERE organization_id IN (SELECT id FROM organizations WHERE invite_code LIKE 'gen-%')",
+        f"DELETE FROM organization_members WHERE organization_id IN (SELECT id FROM organizations WHERE invite_code LIKE 'gen-%') OR user_id IN (SELECT id FROM users WHERE email LIKE '%{GEN_DOMAIN}')",
+        "DELETE FROM organizations WHERE invite_code LIKE 'gen-%'",
+        f"DELETE FROM users WHERE email LIKE '%{GEN_DOMAIN}'",
+    ]
+    conn = psycopg.connect(**_connect_kwargs())
+    try:
+        # children go first, so the FK triggers (a scan of the unindexed child per deleted row) can be skipped
+        _skip_fk_triggers(conn)
+        with conn.cursor() as cur:
+            cur.execute("SET statement_timeout = 0")
+            for sql in statements:
+                cur.execute(sql)
+                print(f"  {cur.rowcount:12,} rows  {sql.split(' WHERE')[0]}", file=sys.stderr)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def main(args) -> int:
+    if args.purge:
+        purge()
+    else:
+        generate(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(ARGS))
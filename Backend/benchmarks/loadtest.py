@@ -0,0 +1,479 @@
+"""
+End-to-end load test: boots the API with uvicorn against a local Postgres (--database-url),
+seeds tenants, then drives a mix of scenarios at a target arrival rate and reports
+p50 / p95 / p99 and error rate per scenario. Headless, one Linux box, for capacity planning.
+
+    python -m benchmarks.loadtest --database-url postgresql+psycopg://postgres@localhost/learnova_bench
+    python -m benchmarks.loadtest --database-url ... --rate 300 --duration 120 --workers 4
+    python -m benchmarks.loadtest --database-url ... --mix login=50,me=30,review=20    # only these scenarios
+    python -m benchmarks.loadtest --database-url ...@10.0.0.5/learnova --force --url http://10.0.0.5:8000 --no-seed
+
+Scenarios (weights with --mix):
+  register  POST /auth/register (new student)
+  verify    GET /auth/verify-email with the token taken from a registered user's queued email
+  login     POST /auth/login as a seeded member
+  me        GET /auth/me with a seeded member's token
+  review    owner: GET /organizations/{id}/join-requests, then PATCH a pending member to accepted
+
+Arrivals are open-loop (a new scenario starts every 1/rate seconds whatever the latency),
+so an overloaded server shows up as growing latency / errors, not as a lower offered load.
+At most --max-in-flight scenarios run at once; arrivals beyond that are counted as dropped.
+
+The booted server runs with RATE_LIMIT_ENABLED=0 (every request comes from 127.0.0.1)
+unless --keep-rate-limits is given. Seeded rows use the @learnova.load domain; --reset removes them.
+The database is never taken from DATABASE_URL / env.env; non-local hosts need --force (benchmarks/target_db.py).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict, deque
+from pathlib import Path
+
+from benchmarks.target_db import add_database_args, use_database
+
+
+SCENARIOS = ("register", "verify", "login", "me", "review")
+DEFAULT_MIX = "register=5,verify=5,login=35,me=40,review=15"
+LOAD_DOMAIN = "@learnova.load"
+PASSWORD = "load-password"
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=50, help="scenario arrivals per second")
+    parser.add_argument("--duration", type=float, default=60, help="seconds of load")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of load before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario=weight,...")
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--orgs", type=int, default=20, help="seeded organizations (one owner each)")
+    parser.add_argument("--members", type=int, default=100, help="seeded members per organization")
+    parser.add_argument("--pending", type=float, default=0.5, help="fraction of seeded members left pending")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (scenario choice, users)")
+    parser.add_argument("--url", help="target an already running server instead of booting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers of the booted server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--keep-rate-limits", action="store_true")
+    parser.add_argument("--no-seed", action="store_true", help="reuse the tenants of a previous run")
+    parser.add_argument("--reset", action="store_true", help="delete every @learnova.load row first")
+    parser.add_argument("--json", type=Path, help="also write the report to this file")
+    add_database_args(parser)
+    return parser.parse_args()
+
+
+ARGS = _parse_args() if __name__ == "__main__" else None
+if ARGS:
+    use_database(ARGS)
+
+import httpx  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app.core.security import hash_password  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+_TOKEN_RE = re.compile(r"token=([\w-]+)")
+
+
+# ---------------------------------------------------------------- seeding
+
+def reset() -> None:
+    with SessionLocal() as db:
+        db.execute(text("DELETE FROM email_outbox WHERE to_email LIKE '%' || :d"), {"d": LOAD_DOMAIN})
+        db.execute(text("DELETE FROM organizations WHERE invite_code LIKE 'load-%'"))
+        db.execute(text("DELETE FROM users WHERE email LIKE '%' || :d"), {"d": LOAD_DOMAIN})
+        db.commit()
+
+
+def seed(*, orgs: int, members: int, pending: float) -> None:
+    """N owners with one organization each, `members` students per organization (a fraction pending)."""
+    hashed = hash_password(PASSWORD)
+    with SessionLocal() as db:
+        db.execute(text("""
+            INSERT INTO subscription_plans
+            (id, name, description, max_teachers, max_students, max_courses, max_storage_mb,
+             allow_ai_chat, allow_ai_question_gen, allow_video_analysis, allow_advanced_analytics,
+             monthly_credits, price_per_month, is_active, created_at)
+            VALUES (1, 'FREE', 'Free plan', 5, 200, 10, 500, true, false, false, false, 50, 0, true, NOW())
+            ON CONFLICT DO NOTHING
+        """))
+        db.execute(
+            text("""
+                INSERT INTO users (full_name, email, hashed_password, system_role, is_email_verified, created_at, updated_at)
+                SELECT 'Load Owner ' || g, 'load-owner-' || g || :d, :hp, 'owner', true, NOW(), NOW()
+                FROM generate_series(1, :orgs) g
+                ON CONFLICT (email) DO NOTHING
+            """),
+            {"d": LOAD_DOMAIN, "hp": hashed, "orgs": orgs},
+        )
+        db.execute(
+            text("""
+                INSERT INTO organizations (name, description, owner_id, invite_code, subscription_status, created_at, updated_at)
+                SELECT 'Load Org ' || u.id, 'load test', u.id, 'load-' || u.id, 'active', NOW(), NOW()
+                FROM users u
+                WHERE u.email LIKE 'load-owner-%' || :d
+                ON CONFLICT (invite_code) DO NOTHING
+            """),
+            {"d": LOAD_DOMAIN},
+        )
+        db.execute(
+            text("""
+                INSERT INTO users (full_name, email, hashed_password, system_role, is_email_verified, created_at, updated_at)
+                SELECT 'Load Member ' || o || '-' || m, 'load-member-' || o || '-' || m || :d, :hp, 'student', true, NOW(), NOW()
+                FROM generate_series(1, :orgs) o, generate_series(1, :members) m
+                ON CONFLICT (email) DO NOTHING
+            """),
+            {"d": LOAD_DOMAIN, "hp": hashed, "orgs": orgs, "members": members},
+        )
+        # member o-m joins the organization of owner o; the first `pending` fraction stays pending
+        db.execute(
+            text("""
+                INSERT INTO organization_members (organization_id, user_id, role, status, joined_at)
+                SELECT org.id, u.id, 'student',
+                       CASE WHEN split_part(split_part(u.email, '@', 1), '-', 4)::int <= :pending_n
+                            THEN 'pending' ELSE 'accepted' END,
+                       NOW()
+                FROM users u
+                JOIN users owner ON owner.email = 'load-owner-' || split_part(split_part(u.email, '@', 1), '-', 3) || :d
+                JOIN organizations org ON org.owner_id = owner.id
+                WHERE u.email LIKE 'load-member-%' || :d
+                  AND NOT EXISTS (SELECT 1 FROM organization_members om WHERE om.user_id = u.id)
+            """),
+            {"d": LOAD_DOMAIN, "pending_n": int(members * pending)},
+        )
+        db.commit()
+
+
+def load_tenants() -> dict:
+    with SessionLocal() as db:
+        orgs = db.execute(
+            text("""
+                SELECT o.id, u.email
+                FROM organizations o JOIN users u ON u.id = o.owner_id
+                WHERE o.invite_code LIKE 'load-%'
+                ORDER BY o.id
+            """)
+        ).all()
+        pending = db.execute(
+            text("""
+                SELECT om.organization_id, om.id
+                FROM organization_members om JOIN organizations o ON o.id = om.organization_id
+                WHERE o.invite_code LIKE 'load-%' AND om.status = 'pending'
+            """)
+        ).all()
+        members = db.execute(
+            text("SELECT email FROM users WHERE email LIKE 'load-member-%' || :d ORDER BY id"), {"d": LOAD_DOMAIN}
+        ).scalars().all()
+
+    pending_by_org = defaultdict(deque)
+    for org_id, member_id in pending:
+        pending_by_org[org_id].append(member_id)
+    return {"orgs": [(org_id, email) for org_id, email in orgs], "pending": pending_by_org, "members": members}
+
+
+def _verification_token(email: str) -> str | None:
+    # the raw token only exists in the queued email (user_tokens stores its hash)
+    with SessionLocal() as db:
+        body = db.execute(
+            text("SELECT body_text FROM email_outbox WHERE to_email = :e ORDER BY id DESC LIMIT 1"), {"e": email}
+        ).scalar()
+    match = _TOKEN_RE.search(body or "")
+    return match.group(1) if match else None
+
+
+# ---------------------------------------------------------------- scenarios
+
+class LoadContext:
+    def __init__(self, client: httpx.AsyncClient, tenants: dict, rng: random.Random):
+        self.client = client
+        self.rng = rng
+        self.orgs = tenants["orgs"]
+        self.pending = tenants["pending"]
+        self.members = tenants["members"]
+        self.tokens: dict[str, str] = {}  # email -> access token
+        self.unverified: deque[str] = deque()
+        self.registered = 0
+        self.run_id = f"{int(time.time())}-{os.getpid()}"
+
+    async def token_for(self, email: str) -> str:
+        token = self.tokens.get(email)
+        if token is None:
+            r = await self.client.post("/auth/login", json={"email": email, "password": PASSWORD})
+            r.raise_for_status()
+            token = self.tokens[email] = r.json()["access_token"]
+        return token
+
+
+class Skip(Exception):
+    """Nothing to do for this scenario right now (e.g. no unverified user yet)."""
+
+
+def _check(r: httpx.Response, *expected: int) -> None:
+    if r.status_code not in expected:
+        raise httpx.HTTPStatusError(f"{r.request.method} {r.request.url.path} -> {r.status_code}", request=r.request, response=r)
+
+
+async def scenario_register(ctx: LoadContext) -> None:
+    ctx.registered += 1
+    email = f"load-new-{ctx.run_id}-{ctx.registered}{LOAD_DOMAIN}"
+    r = await ctx.client.post(
+        "/auth/register",
+        json={"full_name": "Load New", "email": email, "password": PASSWORD, "system_role": "student"},
+    )
+    _check(r, 201)
+    ctx.unverified.append(email)
+
+
+async def scenario_verify(ctx: LoadContext) -> None:
+    if not ctx.unverified:
+        raise Skip
+    email = ctx.unverified.popleft()
+    token = await asyncio.to_thread(_verification_token, email)
+    if token is None:
+        raise Skip
+    r = await ctx.client.get("/auth/verify-email", params={"token": token})
+    _check(r, 200)
+
+
+async def scenario_login(ctx: LoadContext) -> None:
+    email = ctx.rng.choice(ctx.members)
+    r = await ctx.client.post("/auth/login", json={"email": email, "password": PASSWORD})
+    _check(r, 200)
+    ctx.tokens[email] = r.json()["access_token"]
+
+
+async def scenario_me(ctx: LoadContext) -> None:
+    email = ctx.rng.choice(ctx.members)
+    token = await ctx.token_for(email)
+    r = await ctx.client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+    _check(r, 200)
+
+
+async def scenario_review(ctx: LoadContext) -> None:
+    org_id, owner_email = ctx.rng.choice(ctx.orgs)
+    headers = {"Authorization": f"Bearer {await ctx.token_for(owner_email)}"}
+    r = await ctx.client.get(f"/organizations/{org_id}/join-requests", params={"view": "pending"}, headers=headers)
+    _check(r, 200)
+
+    queue = ctx.pending.get(org_id)
+    if queue:
+        member_id = queue.popleft()
+        r = await ctx.client.patch(
+            f"/organizations/{org_id}/members/{member_id}/status", json={"new_status": "accepted"}, headers=headers
+        )
+        _check(r, 200)
+
+
+_SCENARIO_FUNCS = {
+    "register": scenario_register,
+    "verify": scenario_verify,
+    "login": scenario_login,
+    "me": scenario_me,
+    "review": scenario_review,
+}
+
+
+# ---------------------------------------------------------------- driver
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in _SCENARIO_FUNCS:
+            raise SystemExit(f"unknown scenario {name!r} (choose from {', '.join(SCENARIOS)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+class Results:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, Counter] = defaultdict(Counter)
+        self.skipped: Counter = Counter()
+        self.dropped = 0
+
+    def report(self, elapsed: float) -> dict:
+        out = {}
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            samples = self.latencies[name]
+            errors = sum(self.errors[name].values())
+            total = len(samples) + errors
+            out[name] = {
+                "ok": len(samples),
+                "errors": errors,
+                "error_rate": errors / total if total else 0.0,
+                "per_s": total / elapsed if elapsed else 0.0,
+                "p50_ms": statistics.median(samples) if samples else None,
+                "p95_ms": _pct(samples, 95) if samples else None,
+                "p99_ms": _pct(samples, 99) if samples else None,
+                "error_kinds": dict(self.errors[name]),
+                "skipped": self.skipped[name],
+            }
+        return out
+
+
+def _pct(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def _error_kind(exc: Exception) -> str:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return str(exc.response.status_code)
+    return type(exc).__name__
+
+
+async def _one(ctx: LoadContext, name: str, results: Results, measure: bool) -> None:
+    t0 = time.perf_counter()
+    try:
+        await _SCENARIO_FUNCS[name](ctx)
+    except Skip:
+        if measure:
+            results.skipped[name] += 1
+        return
+    except Exception as e:
+        if measure:
+            results.errors[name][_error_kind(e)] += 1
+        return
+    if measure:
+        results.latencies[name].append((time.perf_counter() - t0) * 1000)
+
+
+async def drive(ctx: LoadContext, *, weights: dict[str, float], rate: float, duration: float,
+                warmup: float, max_in_flight: int) -> tuple[Results, float]:
+    results = Results()
+    names, name_weights = list(weights), list(weights.values())
+    in_flight: set[asyncio.Task] = set()
+    interval = 1 / rate
+
+    started = time.perf_counter()
+    measure_from = started + warmup
+    end = measure_from + duration
+    next_at = started
+    while next_at < end:
+        now = time.perf_counter()
+        if next_at > now:
+            await asyncio.sleep(next_at - now)
+        measure = next_at >= measure_from
+        if len(in_flight) >= max_in_flight:
+            results.dropped += int(measure)
+        else:
+            name = ctx.rng.choices(names, name_weights)[0]
+            task = asyncio.create_task(_one(ctx, name, results, measure))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        next_at += interval
+
+    if in_flight:
+        await asyncio.wait(in_flight)
+    return results, time.perf_counter() - measure_from
+
+
+# ---------------------------------------------------------------- server
+
+def boot_server(args) -> subprocess.Popen:
+    env = dict(os.environ)
+    if not args.keep_rate_limits:
+        env["RATE_LIMIT_ENABLED"] = "0"
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(args.port),
+            "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+
+
+async def wait_ready(base_url: str, server: subprocess.Popen | None, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url, timeout=2) as client:
+        while time.monotonic() < deadline:
+            if server is not None and server.poll() is not None:
+                raise SystemExit(f"server exited with code {server.returncode}")
+            try:
+                if (await client.get("/openapi.json")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit(f"server at {base_url} not ready after {timeout:.0f}s")
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.send_signal(signal.SIGINT)
+    try:
+        server.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+# ---------------------------------------------------------------- main
+
+def _print_report(args, report: dict, results: Results, elapsed: float) -> None:
+    print(f"\n{args.rate:g} scenarios/s offered for {elapsed:.0f}s (+{args.warmup:g}s warm-up), "
+          f"target {args.url or f'booted server, {args.workers} worker(s)'}")
+    print(f"{'scenario':10} {'ok':>7} {'err':>6} {'err %':>7} {'/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  errors")
+    for name, r in report.items():
+        fmt = lambda v: f"{v:9.1f}" if v is not None else f"{'-':>9}"  # noqa: E731
+        kinds = ", ".join(f"{k}x{v}" for k, v in r["error_kinds"].items())
+        if r["skipped"]:
+            kinds = (kinds + ", " if kinds else "") + f"skipped x{r['skipped']}"
+        print(f"{name:10} {r['ok']:7d} {r['errors']:6d} {r['error_rate']:7.1%} {r['per_s']:8.1f} "
+              f"{fmt(r['p50_ms'])} {fmt(r['p95_ms'])} {fmt(r['p99_ms'])}  {kinds}")
+    if results.dropped:
+        print(f"dropped arrivals (over --max-in-flight {args.max_in_flight}): {results.dropped}")
+
+
+async def _main(args) -> int:
+    weights = parse_mix(args.mix)
+
+    if args.reset:
+        reset()
+    if not args.no_seed:
+        seed(orgs=args.orgs, members=args.members, pending=args.pending)
+    tenants = load_tenants()
+    engine.dispose()  # the harness itself only needs the DB for token lookups
+    if not tenants["orgs"] or not tenants["members"]:
+        raise SystemExit("no seeded tenants (run without --no-seed)")
+
+    server = None if args.url else boot_server(args)
+    base_url = args.url or f"http://127.0.0.1:{args.port}"
+    try:
+        await wait_ready(base_url, server)
+        limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+        async with httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits) as client:
+            ctx = LoadContext(client, tenants, random.Random(args.seed))
+            results, elapsed = await drive(
+                ctx, weights=weights, rate=args.rate, duration=args.duration,
+                warmup=args.warmup, max_in_flight=args.max_in_flight,
+            )
+    finally:
+        if server is not None:
+            stop_server(server)
+
+    report = results.report(elapsed)
+    _print_report(args, report, results, elapsed)
+    if args.json:
+        args.json.write_text(json.dumps(
+            {"rate": args.rate, "duration": elapsed, "mix": weights, "dropped": results.dropped, "scenarios": report},
+            indent=2,
+        ))
+    return 0
+
+
+def main(args) -> int:
+    return asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main(ARGS))
@@ -0,0 +1,562 @@
+"""
+Benchmark suite for the backend hot paths, with saved baselines and a comparison report.
+
+    python -m benchmarks.suite --database-url postgresql+psycopg://postgres@localhost/learnova_bench   # everything
+    python -m benchmarks.suite --no-db                 # CPU-only cases (no Postgres needed)
+    python -m benchmarks.suite --only jwt --only auth  # cases whose name contains "jwt" or "auth"
+    python -m benchmarks.suite --save                  # run + write the baseline
+    python -m benchmarks.suite --compare               # run + compare with the baseline (exit 1 on regression)
+
+Cases:
+  cpu  hash_password / verify_password, JWT create / decode (cached and uncached),
+       email rendering, JoinRequestsResponse validation + JSON serialization
+  db   every auth / organizations / settings service function and the current-user
+       lookup, called directly against a seeded local Postgres (--database-url, never DATABASE_URL;
+       non-local hosts need --force, see benchmarks/target_db.py)
+
+A baseline is only meaningful on the machine (and settings) it was recorded on:
+record it on the release / CI box, compare on the same box. Metadata (Python, CPU count,
+hasher settings, git commit) is stored with it and printed next to the comparison.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.target_db import add_database_args, use_database
+
+
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "baseline.json"
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", action="append", default=[], help="substring of the case names to run (repeatable)")
+    parser.add_argument("--no-db", action="store_true", help="skip the cases that need Postgres")
+    parser.add_argument("--iterations", type=int, default=200, help="timed calls per DB case")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds spent per CPU case")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="compare with the baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown of the median (0.15 = 15%%)")
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    add_database_args(parser)
+    return parser.parse_args()
+
+
+ARGS = _parse_args() if __name__ == "__main__" else None
+if ARGS:
+    use_database(ARGS, required=not ARGS.no_db)
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from jose import jwt as jose_jwt  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app.core import jwt as app_jwt  # noqa: E402
+from app.core import security  # noqa: E402
+from app.core.email_templates import render_email, warm_email_templates  # noqa: E402
+from app.core.hash_pool import shutdown_hash_pool  # noqa: E402
+from app.core.token_store import hash_token  # noqa: E402
+from app.db.session import AsyncSessionLocal, SessionLocal, async_engine, engine  # noqa: E402
+from app.features.auth import service as auth_service  # noqa: E402
+from app.features.auth.schemas import ForgetPasswordRequest, LoginRequest, RegisterRequest, ResetPasswordRequest  # noqa: E402
+from app.features.organizations import service as org_service  # noqa: E402
+from app.features.organizations.schemas import CreateOrganizationRequest, JoinRequestsResponse  # noqa: E402
+from app.features.settings import service as settings_service  # noqa: E402
+from app.features.settings.schemas import (  # noqa: E402
+    ChangePasswordRequest,
+    ConfirmDeleteAccountRequest,
+    RequestDeleteAccountRequest,
+    UpdateProfileRequest,
+)
+from app.core.deps import _load_auth_state  # noqa: E402
+from benchmarks.bench_login import PASSWORD, seed  # noqa: E402
+
+# every row the DB cases create ends with this domain (cleaned up after the run)
+BENCH_DOMAIN = "@learnova.bench"
+
+CASES: list[tuple[str, str, object]] = []  # (name, group, setup)
+
+
+def case(name: str, group: str):
+    """
+    Register a case. The decorated setup(n) prepares whatever n calls need and returns op(i)
+    (sync for "cpu" cases, async for "db" cases).
+    """
+    def decorator(setup):
+        CASES.append((name, group, setup))
+        return setup
+    return decorator
+
+
+# ---------------------------------------------------------------- cpu
+
+@case("security.hash_password", "cpu")
+def _hash_password(n):
+    return lambda i: security.hash_password(PASSWORD)
+
+
+@case("security.verify_password", "cpu")
+def _verify_password(n):
+    stored = security.hash_password(PASSWORD)
+    return lambda i: security.verify_password(PASSWORD, stored)
+
+
+_CLAIMS = {"email": "student@learnova.local", "full_name": "Bench User", "tv": 1, "system_role": "student"}
+
+
+@case("jwt.create_access_token", "cpu")
+def _jwt_create(n):
+    return lambda i: app_jwt.create_access_token(subject="42", extra=_CLAIMS)
+
+
+@case("jwt.decode_access_token (cached)", "cpu")
+def _jwt_decode_cached(n):
+    token = app_jwt.create_access_token(subject="42", extra=_CLAIMS)
+    app_jwt.decode_access_token(token)
+    return lambda i: app_jwt.decode_access_token(token)
+
+
+@case("jwt.decode (uncached)", "cpu")
+def _jwt_decode_uncached(n):
+    token = app_jwt.create_access_token(subject="42", extra=_CLAIMS)
+    return lambda i: jose_jwt.decode(token, app_jwt.JWT_SECRET, algorithms=[app_jwt.JWT_ALG])
+
+
+@case("email.render verify_email", "cpu")
+def _render_verify(n):
+    warm_email_templates()
+    link = "http://localhost:5173/#/verify-email?token=" + "x" * 43
+    return lambda i: render_email("verify_email", verify_link=link)
+
+
+@case("email.render membership_update", "cpu")
+def _render_membership(n):
+    warm_email_templates()
+    return lambda i: render_email("membership_update", full_name="Student", new_status="accepted")
+
+
+@case("schemas.JoinRequestsResponse (200 users)", "cpu")
+def _join_requests_serialization(n):
+    # what FastAPI does with the service's dict: validate against response_model, dump to JSON
+    payload = {
+        "count": 200,
+        "users": [
+            {
+                "id": i,
+                "org_member_id": 10_000 + i,
+                "full_name": f"Student {i}",
+                "email": f"student-{i}@learnova.io",
+                "avatar_url": None,
+                "system_role": "student",
+                "status": "pending",
+            }
+            for i in range(200)
+        ],
+    }
+    return lambda i: JoinRequestsResponse.model_validate(payload).model_dump_json()
+
+
+# ---------------------------------------------------------------- db
+
+_STAMP = str(int(time.time()))
+
+
+def _scalar(sql: str, params: dict | None = None):
+    with SessionLocal() as db:
+        value = db.execute(text(sql), params or {}).scalar()
+        db.commit()
+        return value
+
+
+def _execute(sql: str, params: dict | None = None) -> None:
+    with SessionLocal() as db:
+        db.execute(text(sql), params or {})
+        db.commit()
+
+
+@functools.cache
+def _password_hash() -> str:
+    # one hash for every bench user (confirm_delete_account needs hundreds of them)
+    return security.hash_password(PASSWORD)
+
+
+def _user(email: str, role: str = "student") -> dict:
+    uid = _scalar(
+        """
+        INSERT INTO users (full_name, email, hashed_password, system_role, is_email_verified, created_at, updated_at)
+        VALUES ('Bench Suite', :email, :hp, :role, true, NOW(), NOW())
+        ON CONFLICT (email) DO UPDATE SET hashed_password = EXCLUDED.hashed_password
+        RETURNING id
+        """,
+        {"email": email, "hp": _password_hash(), "role": role},
+    )
+    return {"id": uid, "email": email, "full_name": "Bench Suite", "system_role": role}
+
+
+def _issue_tokens(user_ids: list[int], token_type: str, tokens: list[str]) -> None:
+    with SessionLocal() as db:
+        db.execute(
+            text("""
+                INSERT INTO user_tokens (user_id, type, token_hash, expires_at, created_at)
+                VALUES (:uid, :type, :hash, NOW() + INTERVAL '1 hour', NOW())
+            """),
+            [{"uid": uid, "type": token_type, "hash": hash_token(t)} for uid, t in zip(user_ids, tokens)],
+        )
+        db.commit()
+
+
+def _largest_bench_org() -> tuple[int, dict]:
+    with SessionLocal() as db:
+        org_id, owner_id, owner_email = db.execute(text("""
+            SELECT o.id, o.owner_id, u.email
+            FROM organizations o
+            JOIN users u ON u.id = o.owner_id
+            WHERE o.invite_code LIKE 'bench-%'
+            ORDER BY (SELECT count(*) FROM organization_members m WHERE m.organization_id = o.id) DESC, o.id
+            LIMIT 1
+        """)).one()
+    return org_id, {"id": owner_id, "email": owner_email, "full_name": "Bench Owner", "system_role": "owner"}
+
+
+async def _call(fn, **kwargs):
+    # one session per call, like one request
+    async with AsyncSessionLocal() as db:
+        return await fn(db=db, **kwargs)
+
+
+_BENCH_STUDENTS = 400
+
+
+@case("auth.register_user", "db")
+def _register(n):
+    async def op(i):
+        payload = RegisterRequest(
+            full_name="Bench Register", email=f"bench-reg-{_STAMP}-{i}{BENCH_DOMAIN}",
+            password=PASSWORD, system_role="student",
+        )
+        await _call(auth_service.register_user, payload=payload)
+    return op
+
+
+@case("auth.verify_email_token", "db")
+def _verify_email(n):
+    user = _user(f"bench-suite-verify{BENCH_DOMAIN}")
+    tokens = [f"bench-verify-{_STAMP}-{i}" for i in range(n)]
+    _issue_tokens([user["id"]] * n, "verify_email", tokens)
+
+    async def op(i):
+        await _call(auth_service.verify_email_token, token=tokens[i])
+    return op
+
+
+@case("auth.login_user", "db")
+def _login(n):
+    async def op(i):
+        payload = LoginRequest(email=f"bench-student-{i % _BENCH_STUDENTS + 1}{BENCH_DOMAIN}", password=PASSWORD)
+        async with AsyncSessionLocal() as db:
+            await auth_service.login_user(payload, db)
+    return op
+
+
+@case("auth.forget_password_request", "db")
+def _forgot(n):
+    user = _user(f"bench-suite-forgot{BENCH_DOMAIN}")
+
+    async def op(i):
+        async with AsyncSessionLocal() as db:
+            await auth_service.forget_password_request(ForgetPasswordRequest(email=user["email"]), db)
+    return op
+
+
+@case("auth.reset_password", "db")
+def _reset(n):
+    user = _user(f"bench-suite-reset{BENCH_DOMAIN}")
+    tokens = [f"bench-reset-{_STAMP}-{i}" for i in range(n)]
+    _issue_tokens([user["id"]] * n, "reset_password", tokens)
+
+    async def op(i):
+        async with AsyncSessionLocal() as db:
+            await auth_service.reset_password(ResetPasswordRequest(token=tokens[i], new_password=PASSWORD), db)
+    return op
+
+
+@case("deps.load_auth_state", "db")
+def _auth_state(n):
+    user = _user(f"bench-suite-me{BENCH_DOMAIN}")
+
+    async def op(i):
+        async with AsyncSessionLocal() as db:
+            await _load_auth_state(db, user["id"])
+    return op
+
+
+@case("organizations.create_organization", "db")
+def _create_org(n):
+    owner = _user(f"bench-suite-owner{BENCH_DOMAIN}", role="owner")
+    payload = CreateOrganizationRequest(name=f"Bench Suite Org {_STAMP}", description="bench")
+
+    async def op(i):
+        await _call(org_service.create_organization, payload=payload, current_user=owner)
+    return op
+
+
+@case("organizations.list_join_requests", "db")
+def _join_requests(n):
+    org_id, owner = _largest_bench_org()
+
+    async def op(i):
+        await _call(org_service.list_join_requests, organization_id=org_id, view="accepted", current_user=owner)
+    return op
+
+
+@case("organizations.update_member_status", "db")
+def _member_status(n):
+    org_id, owner = _largest_bench_org()
+    member_id = _scalar(
+        "SELECT id FROM organization_members WHERE organization_id = :org AND status = 'accepted' ORDER BY id LIMIT 1",
+        {"org": org_id},
+    )
+
+    async def op(i):
+        # accepted -> suspended -> accepted ...
+        await _call(
+            org_service.update_member_status, organization_id=org_id, org_member_id=member_id,
+            new_status="suspended" if i % 2 == 0 else "accepted", current_user=owner,
+        )
+
+    op.teardown = lambda: _execute("UPDATE organization_members SET status = 'accepted' WHERE id = :id", {"id": member_id})
+    return op
+
+
+@case("settings.update_profile", "db")
+def _update_profile(n):
+    user = _user(f"bench-suite-profile{BENCH_DOMAIN}")
+
+    async def op(i):
+        payload = UpdateProfileRequest(full_name=f"Bench Suite {i}")
+        await _call(settings_service.update_profile, payload=payload, current_user=user)
+    return op
+
+
+@case("settings.change_password", "db")
+def _change_password(n):
+    user = _user(f"bench-suite-chpw{BENCH_DOMAIN}")
+    passwords = (PASSWORD, PASSWORD + "-2")
+
+    async def op(i):
+        payload = ChangePasswordRequest(current_password=passwords[i % 2], new_password=passwords[(i + 1) % 2])
+        await _call(settings_service.change_password, payload=payload, current_user=user)
+    return op
+
+
+@case("settings.request_delete_account", "db")
+def _request_delete(n):
+    user = _user(f"bench-suite-delreq{BENCH_DOMAIN}")
+
+    async def op(i):
+        payload = RequestDeleteAccountRequest(current_password=PASSWORD)
+        await _call(settings_service.request_delete_account, payload=payload, current_user=user)
+    return op
+
+
+@case("settings.confirm_delete_account", "db")
+def _confirm_delete(n):
+    users = [_user(f"bench-del-{_STAMP}-{i}{BENCH_DOMAIN}") for i in range(n)]
+    otps = [f"{i:06x}"[-6:] for i in range(n)]
+    _issue_tokens([u["id"] for u in users], "delete_account_otp", otps)
+
+    async def op(i):
+        payload = ConfirmDeleteAccountRequest(otp=otps[i])
+        await _call(settings_service.confirm_delete_account, payload=payload, current_user=users[i])
+    return op
+
+
+def _cleanup() -> None:
+    # bench-login seed rows (bench-owner-* / bench-student-*) are kept for the next run
+    with SessionLocal() as db:
+        db.execute(text("DELETE FROM email_outbox WHERE to_email LIKE '%' || :domain"), {"domain": BENCH_DOMAIN})
+        db.execute(text("DELETE FROM organizations WHERE name LIKE 'Bench Suite Org %'"))
+        db.execute(
+            text("DELETE FROM users WHERE email LIKE 'bench-reg-%' || :domain OR email LIKE 'bench-del-%' || :domain"),
+            {"domain": BENCH_DOMAIN},
+        )
+        db.commit()
+
+
+# ---------------------------------------------------------------- runner
+
+def _pct(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def _summary(samples_us: list[float]) -> dict:
+    median = statistics.median(samples_us)
+    return {
+        "median_us": median,
+        "p95_us": _pct(samples_us, 95),
+        "min_us": min(samples_us),
+        "ops_per_s": 1_000_000 / median if median else 0.0,
+        "samples": len(samples_us),
+    }
+
+
+def _run_cpu(setup, min_time: float) -> dict:
+    op = setup(0)
+    op(0)  # warm-up (caches, lazy imports)
+
+    # batch size so one batch takes ~10 ms: timer overhead stays negligible for microsecond ops
+    t0 = time.perf_counter()
+    op(0)
+    batch = max(1, int(0.01 / max(time.perf_counter() - t0, 1e-7)))
+
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while time.perf_counter() < deadline or len(samples) < 5:
+        t0 = time.perf_counter()
+        for i in range(batch):
+            op(i)
+        samples.append((time.perf_counter() - t0) / batch * 1_000_000)
+    return _summary(samples)
+
+
+async def _run_db(setup, iterations: int) -> dict:
+    warmup = max(5, iterations // 10)
+    op = setup(warmup + iterations)
+    try:
+        for i in range(warmup):
+            await op(i)
+
+        samples = []
+        for i in range(warmup, warmup + iterations):
+            t0 = time.perf_counter()
+            await op(i)
+            samples.append((time.perf_counter() - t0) * 1_000_000)
+        return _summary(samples)
+    finally:
+        teardown = getattr(op, "teardown", None)
+        if teardown is not None:
+            teardown()
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _metadata() -> dict:
+    return {
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "password_hasher": security.PASSWORD_HASHER,
+        "pbkdf2_iterations": security.PBKDF2_ITERATIONS,
+    }
+
+
+async def _run_all(args) -> dict:
+    selected = [
+        (name, group, setup)
+        for name, group, setup in CASES
+        if (not args.only or any(part in name for part in args.only)) and not (args.no_db and group == "db")
+    ]
+
+    if any(group == "db" for _, group, _ in selected):
+        with SessionLocal() as db:
+            seed(db, owners=20, orgs_per_owner=2, students=_BENCH_STUDENTS)
+
+    results = {}
+    try:
+        for name, group, setup in selected:
+            if group == "cpu":
+                results[name] = _run_cpu(setup, args.min_time)
+            else:
+                results[name] = await _run_db(setup, args.iterations)
+            results[name]["group"] = group
+            print(f"  {name:45} {results[name]['median_us']:12.1f} us", file=sys.stderr)
+    finally:
+        if any(group == "db" for _, group, _ in selected):
+            _cleanup()
+        await async_engine.dispose()
+        engine.dispose()
+        shutdown_hash_pool()
+    return results
+
+
+def _print_results(results: dict) -> None:
+    print(f"\n{'case':45} {'median us':>12} {'p95 us':>12} {'ops/s':>12}")
+    for name, r in results.items():
+        print(f"{name:45} {r['median_us']:12.1f} {r['p95_us']:12.1f} {r['ops_per_s']:12,.0f}")
+
+
+def _compare(results: dict, baseline: dict, threshold: float) -> int:
+    """Prints the comparison table, returns the number of regressions."""
+    base_cases = baseline.get("cases", {})
+    meta = baseline.get("metadata", {})
+    print(f"\nbaseline: {meta.get('recorded_at')} commit {meta.get('git_commit')} "
+          f"(python {meta.get('python')}, {meta.get('cpu_count')} CPUs, pbkdf2 {meta.get('pbkdf2_iterations')})")
+    if meta.get("pbkdf2_iterations") != security.PBKDF2_ITERATIONS or meta.get("password_hasher") != security.PASSWORD_HASHER:
+        print("warning: hasher settings differ from the baseline, hashing cases are not comparable")
+
+    print(f"{'case':45} {'baseline us':>12} {'now us':>12} {'change':>9}  status")
+    regressions = 0
+    for name, r in results.items():
+        base = base_cases.get(name)
+        if base is None:
+            print(f"{name:45} {'-':>12} {r['median_us']:12.1f} {'':>9}  new")
+            continue
+        change = r["median_us"] / base["median_us"] - 1
+        if change > threshold:
+            status = "REGRESSION"
+            regressions += 1
+        elif change < -threshold:
+            status = "faster"
+        else:
+            status = "ok"
+        print(f"{name:45} {base['median_us']:12.1f} {r['median_us']:12.1f} {change:+9.1%}  {status}")
+    return regressions
+
+
+def main(args) -> int:
+    results = asyncio.run(_run_all(args))
+    _print_results(results)
+
+    report = {"metadata": _metadata(), "cases": results}
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+    regressions = 0
+    if args.compare:
+        if not args.baseline.exists():
+            print(f"\nno baseline at {args.baseline} (record one with --save)")
+        else:
+            regressions = _compare(results, json.loads(args.baseline.read_text()), args.threshold)
+            print(f"\n{regressions} regression(s) over {args.threshold:.0%}")
+
+    if args.save:
+        # keep baseline entries of cases not run this time (--only / --no-db)
+        previous = json.loads(args.baseline.read_text()).get("cases", {}) if args.baseline.exists() else {}
+        report["cases"] = {**previous, **results}
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"\nbaseline saved to {args.baseline}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(ARGS))
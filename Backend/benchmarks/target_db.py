@@ -0,0 +1,49 @@
+"""
+Which database the seeding / bulk-loading benchmarks write to.
+
+They COPY into, DELETE from and (datagen, as superuser) turn foreign key checks off on the target,
+so it is never taken implicitly from DATABASE_URL / env.env:
+
+    python -m benchmarks.datagen --database-url postgresql+psycopg://postgres@localhost:5432/learnova_bench
+    python -m benchmarks.loadtest --database-url postgresql+psycopg://...@10.0.0.7:5432/learnova_bench --force
+
+Hosts other than localhost / 127.0.0.1 / ::1 / a unix socket are refused unless --force is given.
+Call use_database(args) BEFORE importing app.db.session (the engines read DATABASE_URL at import time).
+"""
+import os
+
+from sqlalchemy.engine import make_url
+
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+
+def add_database_args(parser) -> None:
+    parser.add_argument("--database-url", help="database the benchmark writes to (required, DATABASE_URL is ignored)")
+    parser.add_argument("--force", action="store_true", help="allow a --database-url on a non-local host")
+
+
+def _is_local(url) -> bool:
+    host = url.host or url.query.get("host")
+    if isinstance(host, tuple):  # ?host=a&host=b
+        return all(h.startswith("/") or h in LOCAL_HOSTS for h in host)
+    return not host or host.startswith("/") or host in LOCAL_HOSTS
+
+
+def use_database(args, *, required: bool = True) -> None:
+    """Validate --database-url / --force and point DATABASE_URL at it (exits on refusal)."""
+    if not required:
+        return
+    if not args.database_url:
+        raise SystemExit("refusing to run without --database-url (this benchmark writes to the database)")
+
+    try:
+        url = make_url(args.database_url)
+    except Exception as e:
+        raise SystemExit(f"invalid --database-url: {e}")
+
+    if not _is_local(url) and not args.force:
+        raise SystemExit(
+            f"refusing to write to non-local database {url.render_as_string(hide_password=True)} (add --force)"
+        )
+
+    os.environ["DATABASE_URL"] = args.database_url